@@ -75,6 +75,8 @@ Real ALS JSON structure (verified against v3.2 spec):
 import json, logging, time, urllib.parse, urllib.request, xml.etree.ElementTree as ET
 from typing import Optional
 
+from extractor.cache import CacheMiss
+
 log = logging.getLogger(__name__)
 ALS_BASE = "https://www.als.gov.hk/lookup"
 
@@ -114,31 +116,60 @@ REGION_CODE_TO_EN = {
 
 
 class ALSClient:
-    def __init__(self, n_results=20, delay=0.5, use_json=True):
+    def __init__(self, n_results=20, delay=0.5, use_json=True, base_url=ALS_BASE, timeout=10,
+                 cache=None, offline=False):
         self.n_results = n_results
         self.delay     = delay
         self.use_json  = use_json
+        self.base_url  = base_url      # point at a local stub server in tests
+        self.timeout   = timeout
+        self.cache     = cache         # extractor.cache.ResponseCache, optional
+        self.offline   = offline       # serve only from cache (stale entries included)
+
+    @property
+    def fmt(self) -> str:
+        return "json" if self.use_json else "xml"
 
     def query(self, term: str) -> list:
+        raw = self.cached(term)
+        if raw is None:
+            try:
+                raw = self.fetch(term)
+            except Exception as e:
+                log.error(f"HTTP error for '{term}': {e}")
+                return []
+            time.sleep(self.delay)
+        try:
+            return self.parse(raw)
+        except Exception as e:
+            log.warning(f"Parse error for '{term}': {e}")
+            return []
+
+    def cached(self, term: str) -> Optional[bytes]:
+        """Cached raw response for term, or None."""
+        if self.cache is None:
+            return None
+        return self.cache.get(term, self.n_results, self.fmt, allow_stale=self.offline)
+
+    def fetch(self, term: str) -> bytes:
+        """Raw response body for one term from the network (cached on success); raises on HTTP and network errors."""
+        if self.offline:
+            raise CacheMiss(f"'{term}' is not cached (offline mode)")
         params = urllib.parse.urlencode({"q": term, "n": self.n_results})
-        url    = f"{ALS_BASE}?{params}"
+        url    = f"{self.base_url}?{params}"
         req    = urllib.request.Request(url, headers={
             "Accept":          "application/json",
             "Accept-Language": "zh-Hant,en",
             "User-Agent":      "HKAddressPipeline/2.0 (research)",
         })
-        try:
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                raw = resp.read()
-        except Exception as e:
-            log.error(f"HTTP error for '{term}': {e}")
-            return []
-        time.sleep(self.delay)
-        try:
-            return self._parse_json(raw) if self.use_json else self._parse_xml(raw)
-        except Exception as e:
-            log.warning(f"Parse error for '{term}': {e}")
-            return []
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            raw = resp.read()
+        if self.cache is not None:
+            self.cache.put(term, self.n_results, self.fmt, raw)
+        return raw
+
+    def parse(self, raw: bytes) -> list:
+        return self._parse_json(raw) if self.use_json else self._parse_xml(raw)
 
     # ── JSON parsing ───────────────────────────────────────────────────────
 
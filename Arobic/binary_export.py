@@ -0,0 +1,316 @@
+"""
+binary_export.py
+=================
+Binary, sharded export of the labeled dataset and a memory-mapped reader.
+
+The NER JSONL spells every character out as a one-char JSON string and
+every label as a label name, and the LLM JSONL re-serializes `parsed` per
+example; both are large and slow to parse back. The binary format keeps the
+same content in flat little-endian sections, in shards of at most
+`examples_per_shard` examples:
+
+  <dir>/ner-00000.bin, ner-00001.bin, ...   shard files
+  <dir>/index.json                          shard list, example counts, sha256s
+
+Shard layout (every section starts on an 8-byte boundary):
+
+  header        magic "HKNERB1\\n", u64 examples, u64 parsed entries,
+                u64 offset of each section below
+  addr_index    (n + 1) × u64   byte offset of each address record in `text`
+  label_index   (n + 1) × u64   offset of each example's labels in `labels`
+  parsed_ids    n × u32         row of each example's `parsed` in the table
+  noisy         n × u8          1 for noise-injected examples
+  text          per example: u32 byte length + UTF-8 address
+  labels        uint8 label IDs (validator.label_aligner.LABEL2ID), one per char
+  parsed_index  (p + 1) × u64   offsets into `parsed`
+  parsed        UTF-8 JSON of each distinct parsed dict in the shard, exactly as
+                the LLM JSONL writes it (variants of one record share rows)
+
+Shard files are written to a temp file and renamed into place, so a reader
+never sees a half-written shard. A rebuild first removes the old index.json and
+writes the new one the same way once every shard is in place; only then are
+shards it no longer lists deleted. A failed rebuild leaves no index behind
+rather than one pointing at missing or mixed shards.
+
+BinaryDataset maps every shard and reads examples without copying: label_ids()
+is a memoryview into the mapping (np.frombuffer() views it as uint8 without a
+copy), addresses are decoded straight from it. It supports random access,
+shuffled batches (shard order and example order within each shard are both
+permuted, so a batch touches one mapping) and write_jsonl(), which renders
+the usual JSONL files byte for byte as the JSONL exporter does.
+"""
+
+import hashlib, json, logging, mmap, os, random, struct, sys, tempfile
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator
+
+from validator.label_aligner import decode_labels, encode_labels
+from exporter                import ner_line, llm_line, _write_atomic
+
+log = logging.getLogger(__name__)
+
+MAGIC    = b"HKNERB1\n"
+_HEADER  = struct.Struct("<8s2Q8Q")
+_LENGTH  = struct.Struct("<I")
+SECTIONS = ("addr_index", "label_index", "parsed_ids", "noisy", "text", "labels", "parsed_index", "parsed")
+
+
+def _pad(buf: bytearray):
+    buf += bytes(-len(buf) % 8)
+
+
+def pack_shard(examples: list) -> bytes:
+    """Serialize [(address, label_ids, parsed_json, noisy)] as one shard file."""
+    addr_index, label_index = [0], [0]
+    parsed_rows, parsed_ids = {}, []
+    text, labels, noisy = bytearray(), bytearray(), bytearray()
+    for address, label_ids, parsed_json, is_noisy in examples:
+        raw = address.encode("utf-8")
+        text += _LENGTH.pack(len(raw)) + raw
+        addr_index.append(len(text))
+        labels += label_ids
+        label_index.append(len(labels))
+        parsed_ids.append(parsed_rows.setdefault(parsed_json, len(parsed_rows)))
+        noisy.append(1 if is_noisy else 0)
+    parsed = bytearray()
+    parsed_index = [0]
+    for row in parsed_rows:
+        parsed += row.encode("utf-8")
+        parsed_index.append(len(parsed))
+
+    sections = {
+        "addr_index":   struct.pack(f"<{len(addr_index)}Q", *addr_index),
+        "label_index":  struct.pack(f"<{len(label_index)}Q", *label_index),
+        "parsed_ids":   struct.pack(f"<{len(parsed_ids)}I", *parsed_ids),
+        "noisy":        noisy,
+        "text":         text,
+        "labels":       labels,
+        "parsed_index": struct.pack(f"<{len(parsed_index)}Q", *parsed_index),
+        "parsed":       parsed,
+    }
+    body, offsets = bytearray(_HEADER.size), []
+    _pad(body)
+    for name in SECTIONS:
+        offsets.append(len(body))
+        body += sections[name]
+        _pad(body)
+    _HEADER.pack_into(body, 0, MAGIC, len(examples), len(parsed_rows), *offsets)
+    return bytes(body)
+
+
+class BinaryDatasetWriter:
+    """
+    Appends labeled examples and cuts them into shard files:
+
+        with BinaryDatasetWriter(out_dir / "binary") as writer:
+            for batch in batches:             # examples.ExampleBatch
+                writer.write_batch(batch)
+    """
+
+    def __init__(self, directory, examples_per_shard: int = 65536):
+        self.directory          = Path(directory)
+        self.examples_per_shard = examples_per_shard
+        self.count              = 0
+        self.shards             = []              # index.json entries
+        self._pending           = []
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # The old index must not outlive the shards about to be overwritten
+        (self.directory / "index.json").unlink(missing_ok=True)
+
+    def write(self, ex: dict):
+        label_ids = ex["label_ids"] if "label_ids" in ex else encode_labels(ex["bio_labels"])
+        self._append(ex["address"], label_ids, json.dumps(ex["parsed"], ensure_ascii=False), ex.get("_noisy", False))
+
+    def write_batch(self, batch):
+        for i in range(len(batch)):
+            self._append(batch.address(i), batch.label_ids(i),
+                         json.dumps(batch.parsed[i], ensure_ascii=False), batch.noisy[i])
+
+    def _append(self, address, label_ids, parsed_json, noisy):
+        self._pending.append((address, bytes(label_ids), parsed_json, noisy))
+        self.count += 1
+        if len(self._pending) >= self.examples_per_shard:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        blob = pack_shard(self._pending)
+        path = self.directory / f"ner-{len(self.shards):05d}.bin"
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self.shards.append({"file": path.name, "examples": len(self._pending), "bytes": len(blob),
+                            "sha256": hashlib.sha256(blob).hexdigest()})
+        self._pending = []
+
+    def close(self):
+        self._flush()
+        index = {"format": MAGIC.decode().strip(), "examples": self.count, "shards": self.shards}
+        _write_atomic(self.directory / "index.json", json.dumps(index, indent=2) + "\n")
+        current = {shard["file"] for shard in self.shards}
+        for stale in self.directory.glob("ner-*.bin"):
+            if stale.name not in current:
+                stale.unlink()
+        log.info(f"Wrote {self.count} binary examples in {len(self.shards)} shard(s) → {self.directory}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pending = []                     # no index.json for a failed build
+
+
+class BinaryShard:
+    """One memory-mapped shard file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mmap)
+        magic, self.count, parsed_count, *offsets = _HEADER.unpack_from(self._buf)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a binary dataset shard")
+        if sys.byteorder != "little":              # the index views below are native-endian casts
+            raise ValueError("Binary dataset shards can only be mapped on little-endian hosts")
+        n, p   = self.count, parsed_count
+        bounds = dict(zip(SECTIONS, offsets))
+        ends   = dict(zip(SECTIONS, offsets[1:] + [len(self._buf)]))
+
+        def section(name, fmt=None, length=None):
+            view = self._buf[bounds[name]:ends[name]]
+            if fmt is None:
+                return view
+            size = struct.calcsize(fmt)
+            return view[:length * size].cast(fmt)
+        self.addr_index   = section("addr_index", "Q", n + 1)
+        self.label_index  = section("label_index", "Q", n + 1)
+        self.parsed_ids   = section("parsed_ids", "I", n)
+        self.noisy        = section("noisy")[:n]
+        self.text         = section("text")
+        self.labels       = section("labels")[:self.label_index[n]]
+        self.parsed_index = section("parsed_index", "Q", p + 1)
+        self.parsed_bytes = section("parsed")
+        self._parsed      = lru_cache(maxsize=1024)(self._load_parsed)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def address(self, i: int) -> str:
+        start = self.addr_index[i] + _LENGTH.size
+        return str(self.text[start:self.addr_index[i + 1]], "utf-8")
+
+    def label_ids(self, i: int) -> memoryview:
+        return self.labels[self.label_index[i]:self.label_index[i + 1]]
+
+    def parsed_json(self, i: int) -> str:
+        row = self.parsed_ids[i]
+        return str(self.parsed_bytes[self.parsed_index[row]:self.parsed_index[row + 1]], "utf-8")
+
+    def parsed(self, i: int) -> dict:
+        return self._parsed(self.parsed_ids[i])
+
+    def _load_parsed(self, row: int) -> dict:
+        return json.loads(str(self.parsed_bytes[self.parsed_index[row]:self.parsed_index[row + 1]], "utf-8"))
+
+    def __getitem__(self, i: int) -> dict:
+        ex = {"address":    self.address(i),
+              "parsed":     dict(self.parsed(i)),
+              "bio_labels": decode_labels(self.label_ids(i))}
+        if self.noisy[i]:
+            ex["_noisy"] = True
+        return ex
+
+    def close(self):
+        """Release the mapping; label_ids() views handed out must be released first."""
+        for view in (self.addr_index, self.label_index, self.parsed_ids, self.noisy, self.text,
+                     self.labels, self.parsed_index, self.parsed_bytes, self._buf):
+            view.release()
+        self._mmap.close()
+
+
+class BinaryDataset:
+    """All shards of a binary export, indexed as one sequence."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        index = json.loads((self.directory / "index.json").read_text(encoding="utf-8"))
+        self.shards = [BinaryShard(self.directory / s["file"]) for s in index["shards"]]
+        self._starts = [0]
+        for shard in self.shards:
+            self._starts.append(self._starts[-1] + len(shard))
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def locate(self, i: int) -> tuple:
+        """(shard, index within shard) of example i."""
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        s = bisect_right(self._starts, i) - 1
+        return self.shards[s], i - self._starts[s]
+
+    def __getitem__(self, i: int) -> dict:
+        shard, j = self.locate(i)
+        return shard[j]
+
+    def address(self, i: int) -> str:
+        shard, j = self.locate(i)
+        return shard.address(j)
+
+    def label_ids(self, i: int) -> memoryview:
+        shard, j = self.locate(i)
+        return shard.label_ids(j)
+
+    def __iter__(self):
+        return (shard[j] for shard in self.shards for j in range(len(shard)))
+
+    def batches(self, batch_size: int, shuffle: bool = False, seed=None) -> Iterator[list]:
+        """
+        Lists of (address, label_ids) pairs. With shuffle, shard order and the
+        order within each shard are permuted (reproducibly for a given seed);
+        a batch never spans shards.
+        """
+        rng   = random.Random(seed)
+        order = list(range(len(self.shards)))
+        if shuffle:
+            rng.shuffle(order)
+        for s in order:
+            shard = self.shards[s]
+            rows  = list(range(len(shard)))
+            if shuffle:
+                rng.shuffle(rows)
+            for k in range(0, len(rows), batch_size):
+                yield [(shard.address(j), shard.label_ids(j)) for j in rows[k:k + batch_size]]
+
+    def write_jsonl(self, ner_path: Path, llm_path: Path) -> int:
+        """Render the NER/LLM JSONL views; identical to what the JSONL exporter writes."""
+        count = 0
+        with open(ner_path, "w", encoding="utf-8") as ner, open(llm_path, "w", encoding="utf-8") as llm:
+            for ex in self:
+                ner.write(ner_line(ex))
+                llm.write(llm_line(ex))
+                count += 1
+        return count
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
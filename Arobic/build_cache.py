@@ -0,0 +1,110 @@
+"""
+build_cache.py
+===============
+Per-record build cache for incremental dataset builds.
+
+Every canonical record's output (its rendered NER/LLM lines, label counts,
+progress counts and array-backed examples) is stored under
+  sha256(record content hash, stage versions)
+where the stage versions hash the augment/label/export code and the
+augmentation config (stages.stage_versions). The index is a single SQLite
+file, so a lookup stays cheap at millions of records and a crashed build
+never leaves a half-written entry. A rebuild only sends records without an
+entry through augment + label; everything else is read back and written out.
+
+  Generations  Each build bumps a generation counter and stamps every entry
+               it reads or writes. prune() deletes entries the current build
+               did not use (records that were dropped or whose key changed).
+"""
+
+import hashlib, json, logging, sqlite3, zlib
+from collections import Counter
+from pathlib import Path
+
+from build_spec import canonical_json
+from examples   import ExampleBatch
+from stages     import RecordOutput
+
+log = logging.getLogger(__name__)
+
+_BATCH = 500                                      # keys per SELECT (SQLite variable limit)
+
+
+class BuildCache:
+    def __init__(self, path, level: int = 6):
+        self.path  = Path(path)
+        self.level = level
+        self.hits = self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS outputs (
+                key        TEXT PRIMARY KEY,
+                body       BLOB NOT NULL,
+                generation INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO meta VALUES ('generation', 0);
+        """)
+        with self._db:
+            self._db.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+        (self.generation,) = self._db.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+
+    @staticmethod
+    def key(rhash: str, versions: dict) -> str:
+        return hashlib.sha256(f"{rhash}:{canonical_json(versions)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list) -> dict:
+        """{key: RecordOutput} for the keys that are cached."""
+        found = {}
+        for i in range(0, len(keys), _BATCH):
+            batch = keys[i:i + _BATCH]
+            marks = ",".join("?" * len(batch))
+            for key, body in self._db.execute(f"SELECT key, body FROM outputs WHERE key IN ({marks})", batch):
+                found[key] = _decode(body)
+            with self._db:
+                self._db.execute(f"UPDATE outputs SET generation = ? WHERE key IN ({marks})",
+                                 [self.generation, *batch])
+        self.hits   += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: list):
+        """Store (key, RecordOutput) pairs in one transaction."""
+        rows = [(key, zlib.compress(_encode(output), self.level), self.generation) for key, output in items]
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?)", rows)
+
+    def prune(self) -> int:
+        """Delete entries this build did not use; returns how many."""
+        with self._db:
+            deleted = self._db.execute("DELETE FROM outputs WHERE generation < ?", (self.generation,)).rowcount
+        self._db.execute("VACUUM")
+        return deleted
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM outputs").fetchone()[0]
+
+    def summary(self) -> str:
+        return (f"{self.hits} reused, {self.misses} rebuilt, {len(self)} entries, "
+                f"{self.path.stat().st_size / 1024:.0f} KiB on disk")
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _encode(output: RecordOutput) -> bytes:
+    return json.dumps([output.ner_text, output.llm_text, output.count, output.label_counts,
+                       output.progress, output.examples.to_dict()], ensure_ascii=False).encode("utf-8")
+
+
+def _decode(body: bytes) -> RecordOutput:
+    ner_text, llm_text, count, labels, progress, examples = json.loads(zlib.decompress(body))
+    return RecordOutput(ner_text, llm_text, count, Counter(labels), Counter(progress),
+                        ExampleBatch.from_dict(examples))
@@ -0,0 +1,133 @@
+"""
+build_spec.py
+==============
+Reproducible dataset builds.
+
+A BuildSpec pins everything that decides the dataset's content: the seed
+terms, the RNG seed, limits and the augmentation settings. Given the same
+spec and the same ALS responses (e.g. --offline from the response cache),
+a build writes byte-identical shards and output files.
+
+  Per-record RNG   Every canonical record augments with its own random.Random
+                   seeded from (spec seed, record content hash), so a record's
+                   examples depend on nothing else: not its position, its shard
+                   or the worker count.
+  Manifest         <out>/manifest.json records the spec, a hash of the raw ALS
+                   records, per-shard hashes and the output files' hashes. It has
+                   no timestamps, so two identical builds write identical manifests.
+                   A manifest can be passed back as --spec to rebuild the same
+                   dataset. It also records the stage versions the records were
+                   built with (stages.stage_versions).
+"""
+
+import hashlib, json, random
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class BuildSpec:
+    seeds:               list = field(default_factory=list)
+    seed:                Optional[int] = None    # RNG seed; drawn (and recorded) if not set
+    limit:               int   = 200             # max canonical records augmented
+    n_per_query:         int   = 20              # ALS results per seed term
+    variants_per_record: int   = 6
+    noise_rate:          float = 0.2
+    shard_size:          int   = 256             # canonical records per shard
+    dedup:               str   = "exact"         # "near": also merge near-duplicates (MinHash/LSH)
+    near_dup_threshold:  float = 0.8
+    minhash_perm:        int   = 128
+    lsh_bands:           int   = 16              # must divide minhash_perm
+
+    def __post_init__(self):
+        if self.dedup not in ("exact", "near"):
+            raise ValueError(f"Unknown dedup mode {self.dedup!r} (expected exact or near)")
+        if self.minhash_perm < 1 or self.lsh_bands < 1 or self.minhash_perm % self.lsh_bands:
+            raise ValueError(f"lsh_bands ({self.lsh_bands}) must be a positive divisor of "
+                             f"minhash_perm ({self.minhash_perm})")
+
+    @classmethod
+    def load(cls, path) -> "BuildSpec":
+        """Read a spec file, or the spec recorded in a build's manifest.json."""
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        data = data.get("spec", data)
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown build spec keys in {path}: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    def resolved(self) -> "BuildSpec":
+        """Copy with a concrete RNG seed."""
+        if self.seed is not None:
+            return self
+        return BuildSpec(**{**asdict(self), "seed": random.randrange(2**32)})
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def sha256(self) -> str:
+        return sha256_json(self.to_dict())
+
+
+def sha256_json(obj) -> str:
+    return hashlib.sha256(canonical_json(obj).encode("utf-8")).hexdigest()
+
+
+def canonical_json(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def record_hash(record: dict) -> str:
+    """Content hash of a canonical record (all fields, key order ignored)."""
+    return sha256_json(record)
+
+
+def record_rng(seed: int, rhash: str) -> random.Random:
+    # str seeds hash with SHA-512, so this is stable across processes and PYTHONHASHSEED
+    return random.Random(f"{seed}:{rhash}")
+
+
+class Manifest:
+    """Collects build facts as they stream past and writes them as manifest.json."""
+
+    def __init__(self, spec: BuildSpec, stages: Optional[dict] = None):
+        self.spec      = spec
+        self.stages    = stages or {}
+        self.raw_hash  = hashlib.sha256()
+        self.raw_count = 0
+        self.shards    = []
+        self.outputs   = {}
+
+    def hash_raw(self, records):
+        """Pass raw records through, folding each into the input hash."""
+        for r in records:
+            self.raw_hash.update(canonical_json(r).encode("utf-8") + b"\n")
+            self.raw_count += 1
+            yield r
+
+    def add_shard(self, shard):
+        self.shards.append({
+            "index":      shard.index,
+            "records":    shard.records,
+            "examples":   shard.count,
+            "ner_sha256": shard.ner_sha256,
+            "llm_sha256": shard.llm_sha256,
+        })
+
+    def add_output(self, path: Path, sha256: str, size: int, examples: int):
+        self.outputs[path.name] = {"sha256": sha256, "bytes": size, "examples": examples}
+
+    def to_dict(self) -> dict:
+        return {
+            "spec":        self.spec.to_dict(),
+            "spec_sha256": self.spec.sha256(),
+            "stages":      self.stages,
+            "inputs":      {"raw_records": self.raw_count, "raw_sha256": self.raw_hash.hexdigest()},
+            "shards":      self.shards,
+            "outputs":     self.outputs,
+        }
+
+    def write(self, path: Path):
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
@@ -0,0 +1,121 @@
+"""
+extractor/cache.py
+===================
+Content-addressed on-disk cache of raw ALS responses.
+
+Entries are keyed on sha256 of (term, n_results, format) and stored as
+  <dir>/<key[:2]>/<key>.z  =  8-byte created-at (float64 LE) + zlib(raw body)
+Writes go to a temp file and are renamed into place, so a crash never leaves
+a half-written entry behind.
+
+  TTL       Entries older than ttl_seconds are misses (allow_stale=True still
+            serves them; offline mode uses that).
+  LRU       A hit bumps the file's mtime; when the cache grows past max_bytes
+            the least recently used entries are deleted until it fits.
+
+Raw bodies are cached rather than parsed records, so parser, normalizer and
+augmentor changes are picked up on the next run without refetching.
+"""
+
+import hashlib, json, logging, os, struct, tempfile, threading, time, zlib
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+_CREATED = struct.Struct("<d")
+
+
+class CacheMiss(LookupError):
+    """Raised in offline mode when a response is not cached."""
+
+
+class ResponseCache:
+    def __init__(self, directory, ttl_seconds: float = 7 * 86400, max_bytes: int = 200 * 1024 * 1024,
+                 level: int = 6):
+        self.directory   = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes   = max_bytes
+        self.level       = level
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._size = sum(p.stat().st_size for p in self._entries())
+
+    @staticmethod
+    def key(term: str, n_results: int, fmt: str) -> str:
+        return hashlib.sha256(json.dumps([term, n_results, fmt], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.z"
+
+    def _entries(self):
+        return self.directory.glob("*/*.z")
+
+    def get(self, term: str, n_results: int, fmt: str, allow_stale: bool = False) -> Optional[bytes]:
+        path = self._path(self.key(term, n_results, fmt))
+        try:
+            blob = path.read_bytes()
+            (created,) = _CREATED.unpack_from(blob)
+            if not allow_stale and time.time() - created > self.ttl_seconds:
+                raise LookupError("expired")
+            raw = zlib.decompress(blob[_CREATED.size:])
+            os.utime(path)                          # LRU: last use = mtime
+        except (OSError, LookupError, struct.error, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return raw
+
+    def put(self, term: str, n_results: int, fmt: str, raw: bytes):
+        path = self._path(self.key(term, n_results, fmt))
+        blob = _CREATED.pack(time.time()) + zlib.compress(raw, self.level)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            with self._lock:
+                old = path.stat().st_size if path.exists() else 0
+                os.replace(tmp, path)
+                self._size += len(blob) - old
+        except OSError as e:
+            log.warning(f"Cannot cache response for '{term}': {e}")
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for p in self._entries():
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+            entries.sort()
+            self._size = sum(size for _, size, _ in entries)
+            for _, size, p in entries:
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    p.unlink()
+                except OSError:
+                    continue
+                self._size -= size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for p in self._entries():
+                p.unlink()
+            self._size = 0
+
+    def summary(self) -> str:
+        return (f"{self.hits} hits, {self.misses} misses, {self.evictions} evicted, "
+                f"{self._size / 1024:.0f} KiB on disk")
@@ -8,31 +8,192 @@ Two records are duplicates if they share the same:
 
 Keeps the first occurrence (which has the most complete geo data
 since ALS returns best matches first).
+
+Near-duplicate mode (Deduplicator(mode="near"))
+  Records that differ only in whitespace, full-width digits or a trailing
+  大廈 are the same address too. In near mode the key fields are first
+  normalized (NFKC, whitespace removed, casefolded, building suffix
+  stripped) and deduplicated exactly; the remaining records are compared
+  by MinHash signatures of their character shingles, with LSH banding so
+  each record is only compared with the few earlier records that share a
+  band bucket (no pairwise pass: time and memory grow linearly).
+
+    threshold   estimated Jaccard similarity of the shingle sets at which a
+                record joins an earlier one
+    num_perm    MinHash signature length
+    bands       LSH bands (num_perm / bands rows each); more bands find
+                lower-similarity candidates at the cost of more comparisons
+
+  Street numbers must match exactly after normalization: 100號 and 102號
+  are different buildings however similar the rest of the text is.
+
+  Every merge is recorded in `clusters` ({kept key: [(merged key, similarity)]})
+  for the dedup report.
 """
 
-import hashlib, json, logging
+import hashlib, json, logging, random, re, unicodedata, zlib
+from array import array
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python MinHash; same signatures, just slower
+    np = None
 
 log = logging.getLogger(__name__)
 
+_PRIME    = (1 << 31) - 1                        # hash coefficients and shingle hashes stay below 2^31,
+_SPACE    = re.compile(r"\s+")                   # so a*x + b fits in a uint64 for the numpy path
+_SUFFIXES = ("大廈", "大厦")
+
 
 class Deduplicator:
+    def __init__(self, mode: str = "exact", threshold: float = 0.8, num_perm: int = 128, bands: int = 16,
+                 shingle_size: int = 3, seed: int = 1):
+        if mode not in ("exact", "near"):
+            raise ValueError(f"Unknown dedup mode {mode!r} (expected exact or near)")
+        self.mode     = mode
+        self.clusters = defaultdict(list)
+        self._near    = NearDuplicateIndex(threshold, num_perm, bands, shingle_size, seed) if mode == "near" else None
+
     def run(self, records: list) -> list:
+        return list(self.stream(records))
+
+    def stream(self, records):
+        """Lazily yield first occurrences; only the key set (and in near mode the LSH index) is held in memory."""
         seen = set()
-        unique = []
-        for r in records:
-            key = self._key(r)
-            if key not in seen:
+        total = kept = 0
+        try:
+            for r in records:
+                total += 1
+                key = self._key(r)
+                if key in seen:
+                    continue
                 seen.add(key)
-                unique.append(r)
-        log.info(f"Dedup: {len(records)} → {len(unique)} records ({len(records)-len(unique)} removed)")
-        return unique
+                if self._near is not None:
+                    match = self._near.add(_key_fields(r))
+                    if match is not None:
+                        kept_key, similarity = match
+                        self.clusters[kept_key].append((_key_text(_key_fields(r)), similarity))
+                        continue
+                kept += 1
+                yield r
+        finally:                                 # also when the consumer stops early (--limit)
+            merged = sum(len(m) for m in self.clusters.values())
+            log.info(f"Dedup: {total} → {kept} records ({total-kept} removed"
+                     + (f", {merged} near-duplicates in {len(self.clusters)} clusters)" if self._near else ")"))
+
+    def report(self) -> list:
+        """Merged clusters, largest first: [{"kept": key, "merged": [{"key":, "similarity":}]}]."""
+        clusters = sorted(self.clusters.items(), key=lambda kv: -len(kv[1]))
+        return [{"kept": kept, "merged": [{"key": k, "similarity": round(s, 3)} for k, s in merged]}
+                for kept, merged in clusters]
+
+    def write_report(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for cluster in self.report():
+                f.write(json.dumps(cluster, ensure_ascii=False) + "\n")
 
     def _key(self, r: dict) -> str:
-        parts = (
-            r.get("region",   {}).get("zh",""),
-            r.get("district", {}).get("zh",""),
-            r.get("street",   {}).get("zh",""),
-            r.get("street_no",""),
-            r.get("building", {}).get("zh",""),
-        )
+        parts = _key_fields(r)
         return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def _key_fields(r: dict) -> tuple:
+    return (
+        r.get("region",   {}).get("zh",""),
+        r.get("district", {}).get("zh",""),
+        r.get("street",   {}).get("zh",""),
+        r.get("street_no",""),
+        r.get("building", {}).get("zh",""),
+    )
+
+
+def _key_text(parts: tuple) -> str:
+    return "|".join(parts)
+
+
+def normalize_key(parts: tuple) -> tuple:
+    """Key fields with width, case and whitespace folded and a trailing 大廈 dropped."""
+    folded = [_SPACE.sub("", unicodedata.normalize("NFKC", p)).casefold() for p in parts]
+    building = folded[4]
+    for suffix in _SUFFIXES:
+        if building.endswith(suffix) and len(building) > len(suffix):
+            building = building[:-len(suffix)]
+            break
+    folded[4] = building
+    return tuple(folded)
+
+
+class NearDuplicateIndex:
+    """MinHash + LSH index over normalized record keys; see the module docstring."""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 16,
+                 shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold    = threshold
+        self.num_perm     = num_perm
+        self.bands        = bands
+        self.rows         = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._a = [rng.randrange(1, _PRIME) for _ in range(num_perm)]
+        self._b = [rng.randrange(0, _PRIME) for _ in range(num_perm)]
+        if np is not None:
+            self._a_np = np.array(self._a, dtype=np.uint64)
+            self._b_np = np.array(self._b, dtype=np.uint64)
+        self._normalized = {}                      # normalized key → kept key text
+        self._buckets    = {}                      # band hash → [kept id, ...]
+        self._signatures = array("I")              # num_perm per kept record
+        self._street_nos = []
+        self._keys       = []
+
+    def add(self, parts: tuple):
+        """None if the record is new (and now indexed), else (kept key text, similarity) it duplicates."""
+        norm = normalize_key(parts)
+        if norm in self._normalized:
+            return self._normalized[norm], 1.0
+
+        sig   = self.signature("|".join(norm))
+        bands = self._band_keys(sig)
+        best, best_sim = None, self.threshold
+        for rid in sorted({rid for key in bands for rid in self._buckets.get(key, ())}):
+            if self._street_nos[rid] != norm[3]:
+                continue
+            sim = self._similarity(sig, rid)
+            if sim >= best_sim and (best is None or sim > best_sim):
+                best, best_sim = rid, sim
+        if best is not None:
+            return self._keys[best], best_sim
+
+        rid = len(self._keys)
+        self._keys.append(_key_text(parts))
+        self._street_nos.append(norm[3])
+        self._signatures.extend(sig)
+        self._normalized[norm] = self._keys[rid]
+        for key in bands:
+            self._buckets.setdefault(key, []).append(rid)
+        return None
+
+    def shingles(self, text: str) -> list:
+        k = self.shingle_size
+        grams = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+        return [zlib.crc32(g.encode("utf-8")) % _PRIME for g in grams]
+
+    def signature(self, text: str) -> list:
+        xs = self.shingles(text)
+        if np is not None:
+            x = np.array(xs, dtype=np.uint64)[:, None]
+            return ((x * self._a_np + self._b_np) % _PRIME).min(axis=0).tolist()
+        return [min((a * x + b) % _PRIME for x in xs) for a, b in zip(self._a, self._b)]
+
+    def _band_keys(self, sig: list) -> list:
+        r = self.rows
+        return [int.from_bytes(hashlib.blake2b(array("I", sig[i * r:(i + 1) * r]).tobytes(),
+                                               digest_size=8, person=i.to_bytes(8, "little")).digest(), "little")
+                for i in range(self.bands)]
+
+    def _similarity(self, sig: list, rid: int) -> float:
+        other = self._signatures[rid * self.num_perm:(rid + 1) * self.num_perm]
+        return sum(1 for x, y in zip(sig, other) if x == y) / self.num_perm
@@ -0,0 +1,90 @@
+"""
+examples.py
+============
+Array-backed store for labeled examples.
+
+A labeled example as a dict holds its address as its own str and its labels
+as a list of label strings: one 8-byte pointer per character plus list and
+str headers. ExampleBatch keeps a batch of examples in three flat buffers
+instead:
+
+  text      every address appended to one shared str; example i is
+            text[offsets[i]:offsets[i + 1]]
+  labels    uint8 label IDs (validator.label_aligner.LABEL2ID), one byte per
+            character, at the same offsets
+  parsed    the parsed dicts (shared with the canonical record's variants
+            where the augmentor reuses them) and a noisy flag per example
+
+Label statistics are one bincount over the whole label buffer
+(validator.stats.label_counts). Indexing or iterating yields the usual
+example dicts, with bio_labels decoded, for the exporters.
+"""
+
+from array import array
+from collections import Counter
+
+from validator.label_aligner import decode_labels
+from validator.stats         import label_counts
+
+
+class ExampleBatch:
+    def __init__(self):
+        self.offsets = array("Q", [0])
+        self.labels  = bytearray()
+        self.parsed  = []
+        self.noisy   = bytearray()
+        self._text   = ""
+        self._parts  = []                          # appended since the last join
+
+    def append(self, address: str, label_ids, parsed: dict, noisy: bool = False):
+        if len(label_ids) != len(address):
+            raise ValueError(f"{len(label_ids)} labels for a {len(address)}-character address")
+        self._parts.append(address)
+        self.offsets.append(self.offsets[-1] + len(address))
+        self.labels += label_ids
+        self.parsed.append(parsed)
+        self.noisy.append(bool(noisy))
+
+    @property
+    def text(self) -> str:
+        if self._parts:
+            self._text += "".join(self._parts)
+            self._parts = []
+        return self._text
+
+    def __len__(self) -> int:
+        return len(self.parsed)
+
+    def address(self, i: int) -> str:
+        return self.text[self.offsets[i]:self.offsets[i + 1]]
+
+    def label_ids(self, i: int) -> memoryview:
+        return memoryview(self.labels)[self.offsets[i]:self.offsets[i + 1]]
+
+    def __getitem__(self, i: int) -> dict:
+        ex = {"address":    self.address(i),
+              "parsed":     self.parsed[i],
+              "bio_labels": decode_labels(self.label_ids(i))}
+        if self.noisy[i]:
+            ex["_noisy"] = True
+        return ex
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def label_counts(self) -> Counter:
+        return label_counts(self.labels)
+
+    def to_dict(self) -> dict:
+        return {"text": self.text, "offsets": self.offsets.tolist(), "labels": self.labels.hex(),
+                "parsed": self.parsed, "noisy": self.noisy.hex()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ExampleBatch":
+        batch = cls()
+        batch._text   = d["text"]
+        batch.offsets = array("Q", d["offsets"])
+        batch.labels  = bytearray.fromhex(d["labels"])
+        batch.parsed  = d["parsed"]
+        batch.noisy   = bytearray.fromhex(d["noisy"])
+        return batch
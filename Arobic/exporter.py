@@ -18,43 +18,349 @@ Writes the final labeled dataset in two formats:
      "input":       "九龍旺角彌敦道100號始創中心23樓2301室",
      "output":      "{...}"   ← JSON string of parsed fields
    }
+
+Sharding, compression, atomic commit (JSONLWriter)
+  shard_examples / shard_bytes  cut the output into <stem>-00000.jsonl, ... at
+                                line boundaries; 0 = one file
+  compression                   "gzip" or "zstd" (needs the zstandard package);
+                                the stream is cut into block_bytes blocks and
+                                each block is compressed on a thread pool as its
+                                own gzip member / zstd frame (zlib and zstd
+                                release the GIL), then written in order. Both
+                                formats decode concatenated members/frames as
+                                one stream, and output is byte-reproducible.
+  atomic commit                 every file is written to a temp file, fsynced and
+                                renamed into place when complete; a sharded
+                                output's <stem>.shards.json index (shards, counts,
+                                sha256s) is renamed in last, so a crash never
+                                leaves a truncated file under a final name.
+The JSON itself is rendered in the augment/label worker processes (stages.py);
+the writers only encode, compress and write.
 """
 
+import gzip
+import hashlib
 import json
 import logging
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
+try:
+    import zstandard
+except ImportError:  # zstd output unavailable; plain and gzip still work
+    zstandard = None
+
 log = logging.getLogger(__name__)
 
+COMPRESSION_SUFFIX = {None: "", "gzip": ".gz", "zstd": ".zst"}
 
-def export_ner_jsonl(labeled: list, path: Path):
-    with open(path, "w", encoding="utf-8") as f:
-        for ex in labeled:
-            record = {
-                "tokens":  list(ex["address"]),      # character-level tokens
-                "labels":  ex["bio_labels"],
-                "address": ex["address"],
-                "parsed":  ex["parsed"],
-            }
-            if ex.get("_noisy"):
-                record["_noisy"] = True
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
-    log.info(f"Wrote {len(labeled)} NER examples → {path}")
-
-
-def export_llm_jsonl(labeled: list, path: Path):
-    INSTRUCTION = (
-        "Parse the following Hong Kong address into its structural components. "
-        "Return a JSON object with keys: region_zh, region_en, district_zh, district_en, "
-        "street_zh, street_en, street_no, building_zh, building_en, floor, unit. "
-        "Leave fields empty string if not present in the address."
-    )
-    with open(path, "w", encoding="utf-8") as f:
+
+INSTRUCTION = (
+    "Parse the following Hong Kong address into its structural components. "
+    "Return a JSON object with keys: region_zh, region_en, district_zh, district_en, "
+    "street_zh, street_en, street_no, building_zh, building_en, floor, unit. "
+    "Leave fields empty string if not present in the address."
+)
+
+
+def ner_record(ex: dict) -> dict:
+    record = {
+        "tokens":  list(ex["address"]),      # character-level tokens
+        "labels":  ex["bio_labels"],
+        "address": ex["address"],
+        "parsed":  ex["parsed"],
+    }
+    if ex.get("_noisy"):
+        record["_noisy"] = True
+    return record
+
+
+def llm_record(ex: dict) -> dict:
+    return {
+        "instruction": INSTRUCTION,
+        "input":       ex["address"],
+        "output":      json.dumps(ex["parsed"], ensure_ascii=False),
+    }
+
+
+def ner_line(ex: dict) -> str:
+    return json.dumps(ner_record(ex), ensure_ascii=False) + "\n"
+
+
+def llm_line(ex: dict) -> str:
+    return json.dumps(llm_record(ex), ensure_ascii=False) + "\n"
+
+
+def _gzip_block(level: int, data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _zstd_block(level: int, data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)   # compressors are not thread-safe
+
+
+def _compressor(compression, level):
+    if compression is None:
+        return None
+    if compression == "gzip":
+        return partial(_gzip_block, 6 if level is None else level)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+        return partial(_zstd_block, 3 if level is None else level)
+    raise ValueError(f"Unknown compression {compression!r} (expected gzip or zstd)")
+
+
+def _cut(data: bytes, max_lines, max_bytes, at_least_one: bool) -> tuple[int, int]:
+    """(end, lines) of the longest prefix of whole lines within the limits (None = no limit)."""
+    lines = data.count(b"\n")
+    if (max_lines is None or lines <= max_lines) and (max_bytes is None or len(data) <= max_bytes):
+        return len(data), lines
+    end = taken = 0
+    while taken != max_lines:
+        nxt = data.find(b"\n", end) + 1 or len(data)     # an unterminated last line counts as a line
+        if max_bytes is not None and nxt > max_bytes and not (at_least_one and taken == 0):
+            break
+        end, taken = nxt, taken + 1
+        if max_bytes is not None and end >= max_bytes:
+            break
+    return end, taken
+
+
+class JSONLWriter:
+    """
+    One JSONL output, optionally sharded and compressed (see module docstring).
+    `files` lists (path, sha256, bytes, examples) of every committed file.
+    """
+
+    def __init__(self, path: Path, shard_examples: int = 0, shard_bytes: int = 0, compression=None,
+                 level=None, pool=None, window: int = 8, block_bytes: int = 4 << 20):
+        self.path           = Path(path)
+        self.shard_examples = shard_examples
+        self.shard_bytes    = shard_bytes
+        self.suffix         = COMPRESSION_SUFFIX[compression]
+        self.block_bytes    = block_bytes
+        self.count          = 0
+        self.sha256         = hashlib.sha256()     # of the uncompressed stream
+        self.files          = []
+        self._compress      = _compressor(compression, level)
+        self._pool          = pool if self._compress else None
+        self._window        = window               # blocks in flight before writing waits
+        self._blocks        = deque()              # compressed blocks (or futures) of the open file
+        self._buf, self._buffered = [], 0
+        self._file = self._tmp = None
+        self._lines = self._bytes = 0
+
+    @property
+    def sharded(self) -> bool:
+        return bool(self.shard_examples or self.shard_bytes)
+
+    def _final_path(self, index: int) -> Path:
+        if not self.sharded:
+            return self.path.with_name(self.path.name + self.suffix)
+        return self.path.with_name(f"{self.path.stem}-{index:05d}{self.path.suffix}{self.suffix}")
+
+    def write_serialized(self, text: str, count: int):
+        """Append `count` already rendered lines."""
+        data = text.encode("utf-8")
+        self.sha256.update(data)
+        self.count += count
+        while data:
+            end, lines = _cut(data,
+                              self.shard_examples - self._lines if self.shard_examples else None,
+                              self.shard_bytes - self._bytes if self.shard_bytes else None,
+                              at_least_one=self._lines == 0)
+            if end:
+                self._append(data[:end])
+                self._lines += lines
+                self._bytes += end
+            data = data[end:]
+            if data:
+                self._commit_file()
+
+    def _append(self, data: bytes):
+        if self._file is None:
+            fd, self._tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.stem}-", suffix=".tmp")
+            self._file = os.fdopen(fd, "wb")
+            self._file_sha, self._file_size = hashlib.sha256(), 0
+        self._buf.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.block_bytes:
+            self._submit()
+
+    def _submit(self):
+        if not self._buf:
+            return
+        block = b"".join(self._buf)
+        self._buf, self._buffered = [], 0
+        if self._pool is not None:
+            self._blocks.append(self._pool.submit(self._compress, block))
+        else:
+            self._blocks.append(self._compress(block) if self._compress else block)
+        self._drain(keep=self._window)
+
+    def _drain(self, keep: int = 0):
+        """Write finished blocks in order, waiting for any beyond the last `keep` in flight."""
+        while self._blocks and (len(self._blocks) > keep or isinstance(self._blocks[0], bytes)
+                                or self._blocks[0].done()):
+            block = self._blocks.popleft()
+            block = block if isinstance(block, bytes) else block.result()
+            self._file.write(block)
+            self._file_sha.update(block)
+            self._file_size += len(block)
+
+    def _commit_file(self):
+        if self._file is None:
+            self._append(b"")                      # an empty dataset still gets its (empty) file
+        self._submit()
+        self._drain()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        path = self._final_path(len(self.files))
+        os.replace(self._tmp, path)
+        self.files.append((path, self._file_sha.hexdigest(), self._file_size, self._lines))
+        self._file = self._tmp = None
+        self._lines = self._bytes = 0
+
+    def close(self):
+        if self._file is not None or not self.files:
+            self._commit_file()
+        if self.sharded:
+            index = {"examples": self.count, "sha256": self.sha256.hexdigest(),
+                     "shards": [{"file": p.name, "examples": n, "bytes": size, "sha256": sha}
+                                for p, sha, size, n in self.files]}
+            _write_atomic(self.path.with_name(f"{self.path.stem}.shards.json"),
+                          json.dumps(index, indent=2) + "\n")
+            self._remove_stale()
+
+    def abort(self):
+        """Drop the file in progress; files already committed stay."""
+        for block in self._blocks:
+            if not isinstance(block, bytes):
+                block.cancel()
+        self._blocks.clear()
+        if self._file is not None:
+            self._file.close()
+            os.unlink(self._tmp)
+            self._file = self._tmp = None
+
+    def _remove_stale(self):
+        """Delete shards of an earlier, longer run of this output."""
+        current = {p.name for p, *_ in self.files}
+        pattern = f"{self.path.stem}-[0-9][0-9][0-9][0-9][0-9]{self.path.suffix}{self.suffix}"
+        for stale in self.path.parent.glob(pattern):
+            if stale.name not in current:
+                stale.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _write_atomic(path: Path, text: str):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _export(labeled, path: Path, to_line, **options) -> int:
+    with JSONLWriter(path, **options) as writer:
         for ex in labeled:
-            record = {
-                "instruction": INSTRUCTION,
-                "input":       ex["address"],
-                "output":      json.dumps(ex["parsed"], ensure_ascii=False),
-            }
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
-    log.info(f"Wrote {len(labeled)} LLM examples → {path}")
+            writer.write_serialized(to_line(ex), 1)
+    return writer.count
+
+
+def export_ner_jsonl(labeled, path: Path, **options):
+    """options: JSONLWriter's sharding/compression arguments."""
+    count = _export(labeled, path, ner_line, **options)
+    log.info(f"Wrote {count} NER examples → {path}")
+
+
+def export_llm_jsonl(labeled, path: Path, **options):
+    """options: JSONLWriter's sharding/compression arguments."""
+    count = _export(labeled, path, llm_line, **options)
+    log.info(f"Wrote {count} LLM examples → {path}")
+
+
+class DatasetWriter:
+    """
+    Writes each labeled example to both JSONL outputs as it arrives, so a
+    streamed dataset never has to be held in memory:
+
+        with DatasetWriter(ner_path, llm_path) as writer:
+            for ex in labeled_stream:
+                writer.write(ex)
+
+    Sharding/compression options go to both JSONLWriters; with compression,
+    `threads` compress blocks of both outputs in parallel.
+    """
+
+    def __init__(self, ner_path: Path, llm_path: Path, shard_examples: int = 0, shard_bytes: int = 0,
+                 compression=None, level=None, threads=None):
+        self.ner_path = ner_path
+        self.llm_path = llm_path
+        threads       = threads or os.cpu_count() or 1
+        self._pool    = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix="jsonl-compress") if compression else None
+        options       = dict(shard_examples=shard_examples, shard_bytes=shard_bytes, compression=compression,
+                             level=level, pool=self._pool, window=2 * threads)
+        self._ner     = JSONLWriter(ner_path, **options)
+        self._llm     = JSONLWriter(llm_path, **options)
+        # Running content hashes of the uncompressed streams, so the build manifest needs no second read
+        self.ner_sha256 = self._ner.sha256
+        self.llm_sha256 = self._llm.sha256
+
+    @property
+    def count(self) -> int:
+        return self._ner.count
+
+    @property
+    def files(self) -> list:
+        """(path, sha256, bytes, examples) of every committed output file."""
+        return self._ner.files + self._llm.files
+
+    def write(self, ex: dict):
+        self.write_serialized(ner_line(ex), llm_line(ex), 1)
+
+    def write_serialized(self, ner_text: str, llm_text: str, count: int):
+        """Append JSONL already rendered with ner_line/llm_line (e.g. by a shard worker)."""
+        self._ner.write_serialized(ner_text, count)
+        self._llm.write_serialized(llm_text, count)
+
+    def close(self):
+        try:
+            self._ner.close()
+            self._llm.close()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+        log.info(f"Wrote {self.count} NER examples → {self.ner_path}")
+        log.info(f"Wrote {self.count} LLM examples → {self.llm_path}")
+
+    def abort(self):
+        self._ner.abort()
+        self._llm.abort()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
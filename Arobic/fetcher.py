@@ -0,0 +1,176 @@
+"""
+extractor/fetcher.py
+=====================
+Parallel, resumable ALS extraction.
+
+ALSClient.query fetches one term at a time and sleeps a fixed delay after
+each call. ParallelFetcher runs up to `concurrency` fetches on a thread pool
+instead, and paces them with a shared token bucket, so the request rate stays
+polite while the network waits overlap.
+
+  Rate limit   TokenBucket(rate, burst): every HTTP attempt, retries included,
+               takes one token. Responses served from the client's cache
+               take none.
+  Retries      Network errors and 408/429/5xx are retried with exponential
+               backoff and full jitter (Retry-After is honoured when sent).
+               Other HTTP errors fail the term straight away.
+  Checkpoint   Each completed term is appended to a JSONL file as
+               {"term": ..., "n_per_query": ..., "records": [...]}. A rerun
+               loads it and only fetches terms not in it; failed terms are
+               never written, so they are retried. Entries fetched with a
+               different n_per_query are ignored (and fetched again).
+
+Point ALSClient(base_url=...) at a local HTTP server that serves recorded ALS
+JSON to run the whole thing offline.
+"""
+
+import json, logging, os, random, threading, time, urllib.error
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills `rate` tokens per second, holds at most `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate     = rate
+        self.burst    = max(1, burst)
+        self._tokens  = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it. rate <= 0 means unlimited."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens  = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """Append-only JSONL of completed terms and their parsed records."""
+
+    def __init__(self, path, n_per_query: Optional[int] = None):
+        self.path        = Path(path)
+        self.n_per_query = n_per_query
+        self._lock       = threading.Lock()
+
+    def load(self) -> dict:
+        done, stale = {}, set()
+        if not self.path.exists():
+            return done
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue                  # torn last line from a crash
+                if entry.get("n_per_query") != self.n_per_query:
+                    stale.add(entry["term"])
+                    continue
+                done[entry["term"]] = entry["records"]
+        stale -= done.keys()
+        if stale:
+            log.warning(f"Checkpoint: ignoring {len(stale)} term(s) fetched with a different "
+                        f"n_per_query (now {self.n_per_query}); they will be fetched again")
+        return done
+
+    def add(self, term: str, records: list):
+        line = json.dumps({"term": term, "n_per_query": self.n_per_query, "records": records}, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+
+class ParallelFetcher:
+    def __init__(self, client, concurrency: int = 4, rate: float = 2.0, burst: Optional[int] = None,
+                 retries: int = 3, backoff: float = 0.5, checkpoint=None):
+        self.client      = client
+        self.concurrency = max(1, concurrency)
+        self.bucket      = TokenBucket(rate, burst or self.concurrency)
+        self.retries     = retries
+        self.backoff     = backoff
+        self.checkpoint  = Checkpoint(checkpoint, client.n_results) if checkpoint else None
+        self.failed: list[str] = []
+        self._rng        = random.Random()
+
+    def fetch_all(self, terms: list[str]) -> dict:
+        """{term: records} for every term that succeeded (resumed ones included); failures go to self.failed."""
+        results = self.checkpoint.load() if self.checkpoint else {}
+        pending = [t for t in dict.fromkeys(terms) if t not in results]
+        if results:
+            log.info(f"Resuming: {len(terms) - len(pending)} of {len(terms)} terms already in checkpoint")
+        self.failed = []
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="als-fetch") as pool:
+            futures = {pool.submit(self._fetch_one, term): term for term in pending}
+            for future in as_completed(futures):
+                term = futures[future]
+                try:
+                    records = future.result()
+                except Exception as e:
+                    log.error(f"Giving up on '{term}': {e}")
+                    self.failed.append(term)
+                    continue
+                results[term] = records
+                if self.checkpoint:
+                    self.checkpoint.add(term, records)
+                log.info(f"  '{term}' → {len(records)} records")
+        return results
+
+    def _fetch_one(self, term: str) -> list:
+        raw = self.client.cached(term)
+        if raw is None:
+            raw = self._download(term)
+        return self.client.parse(raw)
+
+    def _download(self, term: str) -> bytes:
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                raw = self.client.fetch(term)
+                break
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRYABLE_STATUS or attempt == self.retries:
+                    raise
+                wait = _retry_after(e)
+                if wait is None:
+                    wait = self._backoff(attempt)
+                log.warning(f"HTTP {e.code} for '{term}', retry {attempt + 1}/{self.retries} in {wait:.2f}s")
+            except OSError as e:                  # URLError, timeouts, resets
+                if attempt == self.retries:
+                    raise
+                wait = self._backoff(attempt)
+                log.warning(f"{e} for '{term}', retry {attempt + 1}/{self.retries} in {wait:.2f}s")
+            time.sleep(wait)
+        return raw
+
+    def _backoff(self, attempt: int) -> float:
+        return self._rng.uniform(0, self.backoff * (2 ** attempt))
+
+
+def _retry_after(error: urllib.error.HTTPError) -> Optional[float]:
+    value = error.headers.get("Retry-After") if error.headers else None
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None                               # HTTP-date form; fall back to backoff
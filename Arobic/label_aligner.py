@@ -26,9 +26,26 @@ Key design choices:
   - Processing order: longest/most-specific fields first to avoid overlap
   - Both zh and en values for each field are searched; whichever appears
     in the address string gets tagged (handles mixed-script variants)
+
+Matching engine:
+  - All field values of a record go into one Aho–Corasick automaton, so
+    every occurrence of every value is found in a single pass over the
+    address. Automata are cached by their value set, so the variants of a
+    canonical record (which share most values) reuse one.
+  - Tagged spans are kept in a sorted interval set; "is this span still
+    untagged" is one bisect instead of a scan over its characters.
+  - align_and_validate() shares one scan between labeling and validation.
+
+Label IDs:
+  - Internally labels are uint8 IDs (LABEL2ID) in a bytearray, one byte per
+    character; align_label_ids() returns them, align_labels() decodes them
+    to strings. validate_alignment() accepts either form.
 """
 
 import logging
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
 from typing import Optional
 
 log = logging.getLogger(__name__)
@@ -45,6 +62,15 @@ LABELS = [
 ]
 LABEL2ID = {l: i for i, l in enumerate(LABELS)}
 ID2LABEL = {i: l for l, i in LABEL2ID.items()}
+O_ID     = LABEL2ID["O"]
+
+
+def encode_labels(labels: list) -> bytes:
+    return bytes(LABEL2ID[l] for l in labels)
+
+
+def decode_labels(ids) -> list:
+    return [LABELS[i] for i in ids]
 
 # Field name → (parsed key zh, parsed key en, B-tag, I-tag)
 # Processed in this order — longer fields first to avoid shorter ones
@@ -60,9 +86,97 @@ FIELD_SPEC = [
 ]
 
 
-def align_labels(address: str, parsed: dict) -> list:
+class Automaton:
+    """Aho–Corasick automaton over a fixed set of non-empty strings."""
+
+    __slots__ = ("goto", "fail", "out")
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.out  = [()]
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.out.append(())
+                    self.goto[state][ch] = nxt
+                state = nxt
+            self.out[state] += (pattern,)
+
+        # Breadth-first, so a state's fail target (always shallower) is complete first
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def find_all(self, text: str) -> dict:
+        """{pattern: [start, ...]} for every occurrence, starts ascending."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = {}
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern in out[state]:
+                found.setdefault(pattern, []).append(i - len(pattern) + 1)
+        return found
+
+
+@lru_cache(maxsize=4096)
+def _automaton(patterns: frozenset) -> Automaton:
+    return Automaton(sorted(patterns))
+
+
+class _Spans:
+    """Disjoint half-open intervals, sorted; ends are sorted too since they never overlap."""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self):
+        self.starts = []
+        self.ends   = []
+
+    def is_free(self, start: int, end: int) -> bool:
+        j = bisect_left(self.starts, end) - 1      # last interval starting before `end`
+        return j < 0 or self.ends[j] <= start
+
+    def add(self, start: int, end: int):
+        j = bisect_left(self.starts, start)
+        self.starts.insert(j, start)
+        self.ends.insert(j, end)
+
+
+def _field_values(parsed: dict) -> list:
+    """[(zh value, en value, B-tag ID, I-tag ID)] in FIELD_SPEC order; empty string = absent."""
+    return [(parsed.get(zh_key, "").strip() if zh_key else "",
+             parsed.get(en_key, "").strip() if en_key else "",
+             LABEL2ID[b_tag], LABEL2ID[i_tag])
+            for zh_key, en_key, b_tag, i_tag in FIELD_SPEC]
+
+
+def find_fields(address: str, parsed: dict) -> dict:
+    """{value: [start, ...]} for every non-empty field value in `parsed` found in `address`."""
+    patterns = frozenset(v for zh, en, _, _ in _field_values(parsed) for v in (zh, en) if v)
+    if not patterns:
+        return {}
+    return _automaton(patterns).find_all(address)
+
+
+def align_labels(address: str, parsed: dict, occurrences: Optional[dict] = None) -> list:
     """
     Returns a list of label strings, one per character, same length as address.
+    `occurrences` is find_fields(address, parsed), if the caller already has it.
 
     Example
     -------
@@ -77,48 +191,42 @@ def align_labels(address: str, parsed: dict) -> list:
        "B-FLOOR","I-FLOOR","O",
        "B-UNIT","I-UNIT","I-UNIT","I-UNIT","O"]
     """
-    labels = ["O"] * len(address)
-
-    for zh_key, en_key, b_tag, i_tag in FIELD_SPEC:
-        # Try both scripts; tag whichever appears first in the address
-        candidates = []
-        v_zh = parsed.get(zh_key, "").strip() if zh_key else ""
-        v_en = parsed.get(en_key, "").strip() if en_key else ""
-
-        for value in [v_zh, v_en]:
-            if not value:
-                continue
-            # Find ALL occurrences
-            start = 0
-            while True:
-                idx = address.find(value, start)
-                if idx == -1:
-                    break
-                candidates.append((idx, value))
-                start = idx + 1
-
-        if not candidates:
-            continue
+    return decode_labels(align_label_ids(address, parsed, occurrences))
+
 
-        # Pick the leftmost occurrence that is still untagged
+def align_label_ids(address: str, parsed: dict, occurrences: Optional[dict] = None) -> bytearray:
+    """align_labels() as uint8 label IDs, one byte per character."""
+    if occurrences is None:
+        occurrences = find_fields(address, parsed)
+    labels = bytearray((O_ID,)) * len(address)
+    tagged = _Spans()
+
+    for v_zh, v_en, b_tag, i_tag in _field_values(parsed):
+        # Both scripts' occurrences, leftmost first (zh before en at the same index)
+        candidates = [(idx, value) for value in (v_zh, v_en) if value for idx in occurrences.get(value, ())]
         candidates.sort(key=lambda x: x[0])
+
+        # Tag the leftmost occurrence that is still untagged — one per field
         for idx, value in candidates:
-            span = range(idx, idx + len(value))
-            if all(labels[i] == "O" for i in span):
+            end = idx + len(value)
+            if tagged.is_free(idx, end):
+                tagged.add(idx, end)
                 labels[idx] = b_tag
-                for i in range(idx + 1, idx + len(value)):
-                    labels[i] = i_tag
-                break  # Tag only one occurrence per field
+                labels[idx + 1:end] = bytes((i_tag,)) * (end - idx - 1)
+                break
 
     return labels
 
 
-def validate_alignment(address: str, labels: list, parsed: dict) -> list:
+def validate_alignment(address: str, labels: list, parsed: dict, occurrences: Optional[dict] = None) -> list:
     """
     Returns a list of error strings (empty = all good).
     Checks that every non-empty parsed field value is tagged correctly.
+    `labels` may be label strings or uint8 label IDs.
     """
     errors = []
+    as_ids = isinstance(labels, (bytes, bytearray))
+    name   = ID2LABEL.__getitem__ if as_ids else str
 
     FIELD_CHECK = [
         ("region_zh",   "REGION"),
@@ -129,38 +237,49 @@ def validate_alignment(address: str, labels: list, parsed: dict) -> list:
         ("floor",       "FLOOR"),
         ("unit",        "UNIT"),
     ]
+    if occurrences is None:
+        occurrences = find_fields(address, parsed)
 
     for key, tag in FIELD_CHECK:
         value = parsed.get(key, "").strip()
         if not value:
             continue
 
-        idx = address.find(value)
-        if idx == -1:
+        if value not in occurrences:
             # Not found — could be English variant was used; not an error
             continue
+        idx = occurrences[value][0]
 
         expected_b = f"B-{tag}"
         expected_i = f"I-{tag}"
+        want_b = LABEL2ID[expected_b] if as_ids else expected_b
+        want_i = LABEL2ID[expected_i] if as_ids else expected_i
 
-        if labels[idx] != expected_b:
+        if labels[idx] != want_b:
             errors.append(
                 f"Field {key!r}: char {idx} ({address[idx]!r}) "
-                f"expected {expected_b}, got {labels[idx]!r}"
+                f"expected {expected_b}, got {name(labels[idx])!r}"
             )
             continue
 
         for j in range(idx + 1, idx + len(value)):
-            if labels[j] != expected_i:
+            if labels[j] != want_i:
                 errors.append(
                     f"Field {key!r}: char {j} ({address[j]!r}) "
-                    f"expected {expected_i}, got {labels[j]!r}"
+                    f"expected {expected_i}, got {name(labels[j])!r}"
                 )
                 break
 
     return errors
 
 
+def align_and_validate(address: str, parsed: dict) -> tuple[bytearray, list]:
+    """(label IDs, errors) from a single scan of the address."""
+    occurrences = find_fields(address, parsed)
+    labels = align_label_ids(address, parsed, occurrences)
+    return labels, validate_alignment(address, labels, parsed, occurrences)
+
+
 def visualize(address: str, labels: list):
     """Debug helper — pretty-prints char/label table."""
     print(f"\nAddress ({len(address)} chars): {address}")
@@ -13,6 +13,7 @@ Noise types modelled on real-world HK address problems:
   7. Truncation               Drop floor+unit entirely
 
 noise_rate: probability any given example gets noise applied.
+rng:        random.Random to draw from (module-level random if not given).
 Only ONE noise type is applied per example to keep labels valid.
 """
 
@@ -29,18 +30,19 @@ REGION_ABBREVS = {
 
 
 class NoiseInjector:
-    def __init__(self, noise_rate: float = 0.2):
+    def __init__(self, noise_rate: float = 0.2, rng: random.Random = None):
         self.noise_rate = noise_rate
+        self.rng = rng if rng is not None else random
 
     def inject(self, example: dict) -> Optional[dict]:
         """Return a noisy copy, or None if noise_rate not triggered."""
-        if random.random() > self.noise_rate:
+        if self.rng.random() > self.noise_rate:
             return None
 
         address = example["address"]
         parsed  = dict(example["parsed"])  # shallow copy
 
-        transform = random.choice([
+        transform = self.rng.choice([
             self._abbrev_region,
             self._abbrev_floor,
             self._abbrev_unit,
@@ -68,7 +70,7 @@ class NoiseInjector:
     def _abbrev_region(self, addr: str, parsed: dict) -> str:
         for zh, alts in REGION_ABBREVS.items():
             if zh in addr:
-                replacement = random.choice(alts)
+                replacement = self.rng.choice(alts)
                 new_addr = addr.replace(zh, replacement, 1)
                 # Update parsed to match
                 parsed["region_zh"] = "" if replacement != zh else zh
@@ -79,7 +81,7 @@ class NoiseInjector:
     def _abbrev_floor(self, addr: str, parsed: dict) -> str:
         # 23樓 → 23/F   or   23/F → 23F
         addr = re.sub(r"(\d+)樓", r"/F", addr)
-        addr = re.sub(r"(\d+)/F", r"F", addr) if random.random() > 0.5 else addr
+        addr = re.sub(r"(\d+)/F", r"F", addr) if self.rng.random() > 0.5 else addr
         return addr
 
     def _abbrev_unit(self, addr: str, parsed: dict) -> str:
@@ -110,7 +112,7 @@ class NoiseInjector:
         # Insert a double space at a random word boundary
         words = addr.split(" ")
         if len(words) > 2:
-            i = random.randint(1, len(words)-1)
+            i = self.rng.randint(1, len(words)-1)
             words.insert(i, "")
         return " ".join(words)
 
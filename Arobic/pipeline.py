@@ -9,24 +9,53 @@ End-to-end pipeline:
   5. Validate     — alignment checks, distribution report
   6. Export       — JSONL for LLM fine-tuning + NER token format
 
+Stages 2–6 are chained generators: records stream from normalize to the
+exporters one at a time, so memory does not grow with the dataset size.
+Augment + label run in shards, optionally on a process pool (see stages.py).
+Each build writes <out>/manifest.json with its spec and content hashes (see build_spec.py).
+Per-record outputs are kept in a build cache (default <out>/build_cache.sqlite), so
+a rebuild only augments and labels records that are new or changed (see build_cache.py).
+--shard-examples/--shard-mb split the JSONL outputs into shards and --compress gzip|zstd
+compresses them on every core; files appear under their final names only when complete.
+--format binary (or both) writes <out>/binary/: sharded uint8-label files with an
+mmap reader for training (see binary_export.py).
+
 Usage:
     python pipeline.py --seeds seeds.txt --out ./output --limit 200
+    python pipeline.py --concurrency 8 --rate 4        # faster extraction, still rate-limited
+    python pipeline.py --offline                       # ALS responses from the cache only
+    python pipeline.py --workers 0 --seed 42           # augment + label on every core, reproducibly
+    python pipeline.py --spec output/manifest.json --offline   # rebuild a previous dataset byte for byte
+    python pipeline.py --seed 42 --no-build-cache      # recompute every record from scratch
+    python pipeline.py --dedup near                    # merge near-duplicates, report in <out>/dedup_clusters.jsonl
+
+Extraction checkpoints each finished seed to <out>/als_checkpoint.jsonl;
+rerunning after a crash only fetches the seeds that are missing. The
+checkpoint is removed once a run completes with every seed fetched.
+Raw ALS responses are cached in --cache-dir (default <out>/als_cache) for
+--cache-ttl-days, so reruns while iterating on later stages cost no network time.
 """
 
 import argparse
+import contextlib
+import itertools
 import json
 import logging
+import os
 import sys
+from collections import Counter
 from pathlib import Path
 
-from extractor.als_client    import ALSClient
-from processor.normalizer    import normalize_record
+from extractor.als_client    import ALSClient, ALS_BASE
+from extractor.fetcher       import ParallelFetcher
+from extractor.cache         import ResponseCache
 from processor.deduplicator  import Deduplicator
-from augmentor.variants      import VariantGenerator
-from augmentor.noise         import NoiseInjector
-from validator.label_aligner import align_labels, validate_alignment
 from validator.stats         import print_distribution_report
-from exporter                import export_ner_jsonl, export_llm_jsonl
+from stages                  import normalized, run_shards, stage_versions
+from build_cache             import BuildCache
+from build_spec              import BuildSpec, Manifest
+from exporter                import DatasetWriter
+from binary_export           import BinaryDatasetWriter
 
 logging.basicConfig(
     level=logging.INFO,
@@ -36,86 +65,135 @@ logging.basicConfig(
 log = logging.getLogger("pipeline")
 
 
-def run(seeds: list[str], out_dir: Path, limit: int, n_per_query: int = 20):
+def run(spec: BuildSpec, out_dir: Path,
+        concurrency: int = 4, rate: float = 2.0, base_url: str = ALS_BASE,
+        cache_dir: Path | None = None, cache_ttl_days: float = 7, offline: bool = False,
+        workers: int = 1, build_cache: Path | None = None, prune_build_cache: bool = False,
+        formats: tuple = ("jsonl",), jsonl_options: dict | None = None):
     out_dir.mkdir(parents=True, exist_ok=True)
+    spec  = spec.resolved()
+    seeds = spec.seeds
+    log.info(f"Build spec {spec.sha256()[:12]} · seed {spec.seed}")
 
     # ── Stage 1: Extract ───────────────────────────────────────────────────
-    log.info(f"Stage 1 · Extracting from ALS API ({len(seeds)} seeds, {n_per_query} results each)")
-    client = ALSClient(n_results=n_per_query, delay=0.5)
-    raw_records = []
-    for seed in seeds:
-        records = client.query(seed)
-        raw_records.extend(records)
-        log.info(f"  '{seed}' → {len(records)} records  (total {len(raw_records)})")
-
-    log.info(f"Stage 1 done · {len(raw_records)} raw records")
-
-    # ── Stage 2: Normalize + Deduplicate ───────────────────────────────────
-    log.info("Stage 2 · Normalizing and deduplicating")
-    normalized = [normalize_record(r) for r in raw_records]
-    normalized = [r for r in normalized if r is not None]
-
-    dedup = Deduplicator()
-    canonical = dedup.run(normalized)
-    log.info(f"Stage 2 done · {len(canonical)} canonical records after dedup")
-
-    # ── Stage 3: Augment ───────────────────────────────────────────────────
-    log.info("Stage 3 · Generating variants")
-    gen     = VariantGenerator()
-    noise   = NoiseInjector(noise_rate=0.2)  # 20% of examples get noise
-    dataset = []
-
-    for record in canonical[:limit]:
-        variants = gen.generate(record)           # pure structural variants
-        for v in variants:
-            dataset.append(v)
-            noisy = noise.inject(v)               # optionally add noise
-            if noisy is not None:
-                dataset.append(noisy)
-
-    log.info(f"Stage 3 done · {len(dataset)} examples after augmentation")
-
-    # ── Stage 4: Label ─────────────────────────────────────────────────────
-    log.info("Stage 4 · Aligning BIO labels")
-    labeled, skipped = [], 0
-    for ex in dataset:
-        labels = align_labels(ex["address"], ex["parsed"])
-        errors = validate_alignment(ex["address"], labels, ex["parsed"])
-        if errors:
-            skipped += 1
-            continue
-        labeled.append({**ex, "bio_labels": labels})
-
-    log.info(f"Stage 4 done · {len(labeled)} labeled, {skipped} skipped (alignment errors)")
-
-    # ── Stage 5: Validate ──────────────────────────────────────────────────
-    log.info("Stage 5 · Validation report")
-    all_labels = [l for ex in labeled for l in ex["bio_labels"]]
-    print_distribution_report(all_labels)
+    log.info(f"Stage 1 · Extracting from ALS API ({len(seeds)} seeds, {spec.n_per_query} results each, "
+             f"{concurrency} parallel, ≤{rate:g} req/s)")
+    cache   = ResponseCache(cache_dir or out_dir / "als_cache", ttl_seconds=cache_ttl_days * 86400)
+    client  = ALSClient(n_results=spec.n_per_query, base_url=base_url, cache=cache, offline=offline)
+    fetcher = ParallelFetcher(client, concurrency=concurrency, rate=rate,
+                              checkpoint=out_dir / "als_checkpoint.jsonl")
+    fetched = fetcher.fetch_all(seeds)
+    # Keep seed order so downstream dedup sees records in the same order every run
+    raw_count   = sum(len(fetched.get(seed, [])) for seed in seeds)
+    raw_records = (r for seed in seeds for r in fetched.get(seed, []))
+
+    if fetcher.failed:
+        log.warning(f"Stage 1 · {len(fetcher.failed)} seed(s) failed and will be retried on the next run: "
+                    f"{', '.join(fetcher.failed)}")
+    log.info(f"Stage 1 done · {raw_count} raw records  (cache: {cache.summary()})")
+
+    # ── Stages 2–6: streamed ──────────────────────────────────────────────
+    # Every stage below is a generator; one record at a time flows from
+    # normalize through export. Only the dedup key set and the label counts
+    # grow with the dataset, so memory stays flat at any --limit.
+    # Augment + label run in shards (across `workers` processes if > 1);
+    # output depends only on the spec, not on the worker count.
+    log.info(f"Stages 2–6 · Normalize → dedup → augment → label → export (streaming, {workers} worker(s))")
+    manifest     = Manifest(spec, stage_versions(spec))
+    records      = BuildCache(build_cache) if build_cache else None
+    progress     = Counter()
+    label_counts = Counter()
+    dedup        = Deduplicator(mode=spec.dedup, threshold=spec.near_dup_threshold,
+                                num_perm=spec.minhash_perm, bands=spec.lsh_bands)
+    canonical    = itertools.islice(
+        dedup.stream(normalized(manifest.hash_raw(raw_records), progress)), spec.limit)
 
-    # ── Stage 6: Export ────────────────────────────────────────────────────
-    log.info("Stage 6 · Exporting")
     ner_path = out_dir / "ner_dataset.jsonl"
     llm_path = out_dir / "llm_finetune.jsonl"
+    count    = 0
+    with contextlib.ExitStack() as outputs:
+        writer = (outputs.enter_context(DatasetWriter(ner_path, llm_path, **(jsonl_options or {})))
+                  if "jsonl" in formats else None)
+        binary = outputs.enter_context(BinaryDatasetWriter(out_dir / "binary")) if "binary" in formats else None
+        for shard in run_shards(canonical, spec, workers=workers, cache=records):
+            if writer is not None:
+                writer.write_serialized(shard.ner_text, shard.llm_text, shard.count)
+            if binary is not None:
+                for batch in shard.examples:
+                    binary.write_batch(batch)
+            count += shard.count
+            label_counts.update(shard.label_counts)
+            progress.update(shard.progress)
+            manifest.add_shard(shard)
+
+    log.info(f"Stage 2 done · {progress['normalized']} normalized, {progress['canonical']} canonical records augmented")
+    if spec.dedup == "near":
+        dedup.write_report(out_dir / "dedup_clusters.jsonl")
+        log.info(f"Stage 2 · {sum(len(m) for m in dedup.clusters.values())} near-duplicates merged into "
+                 f"{len(dedup.clusters)} clusters → {out_dir / 'dedup_clusters.jsonl'}")
+    log.info(f"Stage 3 done · {progress['examples']} examples after augmentation")
+    log.info(f"Stage 4 done · {count} labeled, {progress['skipped']} skipped (alignment errors)")
+    if records is not None:
+        if prune_build_cache:
+            log.info(f"Build cache · pruned {records.prune()} unused entries")
+        log.info(f"Build cache · {records.summary()}")
+        records.close()
 
-    export_ner_jsonl(labeled, ner_path)
-    export_llm_jsonl(labeled, llm_path)
-
-    log.info(f"✓ NER dataset  → {ner_path}  ({len(labeled)} examples)")
-    log.info(f"✓ LLM dataset  → {llm_path}  ({len(labeled)} examples)")
+    # ── Stage 5: Validate ──────────────────────────────────────────────────
+    log.info("Stage 5 · Validation report")
+    print_distribution_report(label_counts)
+
+    if writer is not None:
+        log.info(f"✓ NER dataset  → {ner_path}  ({count} examples, {len(writer.files) // 2} file(s))")
+        log.info(f"✓ LLM dataset  → {llm_path}  ({count} examples, {len(writer.files) // 2} file(s))")
+        for path, sha256, size, examples in writer.files:
+            manifest.add_output(path, sha256, size, examples)
+    if binary is not None:
+        log.info(f"✓ Binary shards → {binary.directory}  ({count} examples, {len(binary.shards)} shard(s))")
+        for entry in binary.shards:
+            manifest.add_output(binary.directory / entry["file"], entry["sha256"], entry["bytes"], entry["examples"])
+    manifest.write(out_dir / "manifest.json")
+    log.info(f"✓ Manifest     → {out_dir / 'manifest.json'}")
+    if not fetcher.failed:
+        fetcher.checkpoint.clear()
     log.info("Pipeline complete.")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
+    parser.add_argument("--spec",   default=None,         help="Build spec JSON (or a previous manifest.json); "
+                                                                "replaces --seeds/--limit/--n/--seed/--shard-size/--dedup")
     parser.add_argument("--seeds",  default="seeds.txt",  help="One query term per line")
     parser.add_argument("--out",    default="./output",   help="Output directory")
     parser.add_argument("--limit",  type=int, default=200, help="Max canonical records to augment")
     parser.add_argument("--n",      type=int, default=20,  help="ALS results per query")
+    parser.add_argument("--concurrency", type=int,   default=4,   help="Parallel ALS requests")
+    parser.add_argument("--rate",        type=float, default=2.0, help="Max ALS requests per second")
+    parser.add_argument("--base-url",    default=ALS_BASE,        help="ALS lookup URL (e.g. a local stub server)")
+    parser.add_argument("--cache-dir",   default=None,            help="ALS response cache (default <out>/als_cache)")
+    parser.add_argument("--cache-ttl-days", type=float, default=7, help="Refetch cached responses older than this")
+    parser.add_argument("--offline",     action="store_true",     help="Serve ALS responses from the cache only")
+    parser.add_argument("--workers",     type=int, default=1,     help="Processes for augment + label (0 = all cores)")
+    parser.add_argument("--seed",        type=int, default=None,  help="RNG seed; same seed → same dataset")
+    parser.add_argument("--shard-size",  type=int, default=256,   help="Canonical records per augment shard")
+    parser.add_argument("--dedup",       choices=["exact", "near"], default="exact",
+                                                                  help="near: also merge near-duplicate records")
+    parser.add_argument("--near-dup-threshold", type=float, default=0.8, help="MinHash similarity that merges records")
+    parser.add_argument("--minhash-perm", type=int, default=128,  help="MinHash signature length for --dedup near")
+    parser.add_argument("--lsh-bands",   type=int, default=16,    help="LSH bands; must divide --minhash-perm")
+    parser.add_argument("--build-cache", default=None,            help="Per-record build cache "
+                                                                       "(default <out>/build_cache.sqlite)")
+    parser.add_argument("--no-build-cache",    action="store_true", help="Augment + label every record from scratch")
+    parser.add_argument("--prune-build-cache", action="store_true", help="Drop cache entries this build did not use")
+    parser.add_argument("--format",      choices=["jsonl", "binary", "both"], default="jsonl",
+                                                                  help="Dataset output format")
+    parser.add_argument("--shard-examples", type=int,   default=0, help="Examples per JSONL shard (0 = one file)")
+    parser.add_argument("--shard-mb",       type=float, default=0, help="Uncompressed MB per JSONL shard (0 = no limit)")
+    parser.add_argument("--compress",    choices=["gzip", "zstd"], default=None, help="Compress JSONL outputs")
     args = parser.parse_args()
 
     seeds_path = Path(args.seeds)
-    if not seeds_path.exists():
+    if not args.spec and not seeds_path.exists():
         # Default seeds covering all 18 districts + common building types
         default_seeds = [
             "中環", "灣仔", "銅鑼灣", "北角", "西環",         # HK Island
@@ -129,5 +207,24 @@ if __name__ == "__main__":
         seeds_path.write_text("\n".join(default_seeds), encoding="utf-8")
         log.info(f"Created default seeds file at {seeds_path}")
 
-    seeds = [s.strip() for s in seeds_path.read_text(encoding="utf-8").splitlines() if s.strip()]
-    run(seeds, Path(args.out), limit=args.limit, n_per_query=args.n)
+    try:
+        if args.spec:
+            spec = BuildSpec.load(args.spec)
+        else:
+            seeds = [s.strip() for s in seeds_path.read_text(encoding="utf-8").splitlines() if s.strip()]
+            spec  = BuildSpec(seeds=seeds, seed=args.seed, limit=args.limit, n_per_query=args.n,
+                              shard_size=args.shard_size, dedup=args.dedup,
+                              near_dup_threshold=args.near_dup_threshold,
+                              minhash_perm=args.minhash_perm, lsh_bands=args.lsh_bands)
+    except ValueError as e:
+        parser.error(str(e))
+    run(spec, Path(args.out),
+        concurrency=args.concurrency, rate=args.rate, base_url=args.base_url,
+        cache_dir=Path(args.cache_dir) if args.cache_dir else None,
+        cache_ttl_days=args.cache_ttl_days, offline=args.offline,
+        workers=args.workers or os.cpu_count() or 1,
+        build_cache=None if args.no_build_cache else Path(args.build_cache or Path(args.out) / "build_cache.sqlite"),
+        prune_build_cache=args.prune_build_cache,
+        formats=("jsonl", "binary") if args.format == "both" else (args.format,),
+        jsonl_options=dict(shard_examples=args.shard_examples, shard_bytes=int(args.shard_mb * 1024 * 1024),
+                           compression=args.compress))
@@ -0,0 +1,195 @@
+"""
+stages.py
+==========
+Per-record stages 2–4 as generators, plus the sharded runner for 3–4.
+
+Sharding
+  Canonical records are cut into shards of `shard_size` in stream order.
+  Every record is augmented with its own RNG derived from (spec seed, record
+  hash) — see build_spec.py — so the output never depends on how many
+  workers ran or which worker got which shard. workers=1 runs the same
+  shards in-process and produces identical files.
+
+  Workers return each record's output already rendered as NER/LLM JSONL
+  plus label and progress counts; the parent only joins text in shard order.
+  At most 2 × workers shards are in flight, so memory stays bounded.
+
+Incremental builds
+  A record's output is a pure function of its content and the stage
+  versions (stage_versions: source hashes of the augment/label/export code
+  plus the augmentation config). build_cache.BuildCache stores outputs under
+  that key, so a rebuild only processes records that are new or changed.
+"""
+
+import hashlib, itertools, logging, sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+import augmentor.noise, augmentor.variants, build_spec, exporter, validator.label_aligner
+from processor.normalizer    import normalize_record
+from augmentor.variants      import VariantGenerator
+from augmentor.noise         import NoiseInjector
+from validator.label_aligner import align_and_validate
+from exporter                import ner_line, llm_line
+from examples                import ExampleBatch
+from build_spec              import BuildSpec, record_hash, record_rng, sha256_json
+
+log = logging.getLogger(__name__)
+
+
+def normalized(raw_records, progress: Counter):
+    for r in raw_records:
+        n = normalize_record(r)
+        if n is not None:
+            progress["normalized"] += 1
+            yield n
+
+
+def augmented(canonical, spec: BuildSpec, progress: Counter):
+    for record in canonical:
+        progress["canonical"] += 1
+        rng   = record_rng(spec.seed, record_hash(record))
+        gen   = VariantGenerator(rng, spec.variants_per_record)
+        noise = NoiseInjector(spec.noise_rate, rng)
+        for v in gen.generate(record):           # pure structural variants
+            progress["examples"] += 1
+            yield v
+            noisy = noise.inject(v)              # optionally add noise
+            if noisy is not None:
+                progress["examples"] += 1
+                yield noisy
+
+
+def labeled(dataset, progress: Counter):
+    for ex in dataset:
+        label_ids, errors = align_and_validate(ex["address"], ex["parsed"])
+        if errors:
+            progress["skipped"] += 1
+            continue
+        yield {**ex, "label_ids": label_ids}
+
+
+# ── Sharded augment + label ───────────────────────────────────────────────
+
+class RecordOutput(NamedTuple):
+    """Everything one canonical record contributes to the dataset."""
+    ner_text:     str
+    llm_text:     str
+    count:        int
+    label_counts: Counter
+    progress:     Counter
+    examples:     ExampleBatch
+
+
+class Shard(NamedTuple):
+    index:        int
+    records:      int
+    ner_text:     str
+    llm_text:     str
+    count:        int
+    label_counts: Counter
+    progress:     Counter
+    ner_sha256:   str
+    llm_sha256:   str
+    examples:     list                         # one ExampleBatch per record, for the binary export
+
+
+def stage_versions(spec: BuildSpec) -> dict:
+    """
+    Code/config version of each stage after dedup. Code versions hash the
+    stage's source, so any edit invalidates cached outputs of that stage;
+    augment includes build_spec, whose record_rng seeds every record's variants.
+    """
+    def source(*modules):
+        return hashlib.sha256(b"".join(Path(m.__file__).read_bytes() for m in modules)).hexdigest()[:16]
+    return {
+        "augment": source(augmentor.variants, augmentor.noise, build_spec, sys.modules[__name__]),
+        "label":   source(validator.label_aligner),
+        "export":  source(exporter),
+        "config":  sha256_json({"seed": spec.seed, "variants_per_record": spec.variants_per_record,
+                                "noise_rate": spec.noise_rate})[:16],
+    }
+
+
+def process_record(record: dict, spec: BuildSpec) -> RecordOutput:
+    progress = Counter()
+    batch    = ExampleBatch()
+    for ex in labeled(augmented([record], spec, progress), progress):
+        batch.append(ex["address"], ex["label_ids"], ex["parsed"], ex.get("_noisy", False))
+    return RecordOutput("".join(ner_line(ex) for ex in batch), "".join(llm_line(ex) for ex in batch),
+                        len(batch), batch.label_counts(), progress, batch)
+
+
+def process_records(records: list, spec: BuildSpec) -> list:
+    return [process_record(r, spec) for r in records]
+
+
+def assemble_shard(index: int, outputs: list) -> Shard:
+    ner_text = "".join(o.ner_text for o in outputs)
+    llm_text = "".join(o.llm_text for o in outputs)
+    counts, progress = Counter(), Counter()
+    for o in outputs:
+        counts.update(o.label_counts)
+        progress.update(o.progress)
+    return Shard(index, len(outputs), ner_text, llm_text, sum(o.count for o in outputs), counts, progress,
+                 hashlib.sha256(ner_text.encode("utf-8")).hexdigest(),
+                 hashlib.sha256(llm_text.encode("utf-8")).hexdigest(),
+                 [o.examples for o in outputs])
+
+
+def process_shard(index: int, records: list, spec: BuildSpec) -> Shard:
+    return assemble_shard(index, process_records(records, spec))
+
+
+def shards(canonical: Iterable[dict], shard_size: int) -> Iterator[tuple[int, list]]:
+    it = iter(canonical)
+    for index in itertools.count():
+        batch = list(itertools.islice(it, shard_size))
+        if not batch:
+            return
+        yield index, batch
+
+
+def run_shards(canonical: Iterable[dict], spec: BuildSpec, workers: int = 1, cache=None) -> Iterator[Shard]:
+    """
+    Augmented, labeled shards in shard order; spec.seed must be set.
+
+    With a BuildCache, records whose (content hash, stage versions) key is
+    cached are reused and only new or changed records are processed; a shard
+    whose records are all cached never reaches a worker.
+    """
+    versions = stage_versions(spec) if cache is not None else None
+    pool     = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending  = deque()
+
+    def finish(index, keys, outputs, missing, result):
+        computed = result if isinstance(result, list) else result.result()
+        for i, output in zip(missing, computed):
+            outputs[i] = output
+        if cache is not None and missing:
+            cache.put_many([(keys[i], outputs[i]) for i in missing])
+        shard = assemble_shard(index, outputs)
+        shard.progress["reused"] += len(outputs) - len(missing)
+        return shard
+
+    try:
+        for index, records in shards(canonical, spec.shard_size):
+            keys    = [cache.key(record_hash(r), versions) for r in records] if cache is not None else []
+            found   = cache.get_many(keys) if cache is not None else {}
+            outputs = [found.get(k) for k in keys] if keys else [None] * len(records)
+            missing = [i for i, o in enumerate(outputs) if o is None]
+            todo    = [records[i] for i in missing]
+            if pool is None or not todo:
+                result = process_records(todo, spec)
+            else:
+                result = pool.submit(process_records, todo, spec)
+            pending.append((index, keys, outputs, missing, result))
+            if len(pending) >= max(1, 2 * workers):
+                yield finish(*pending.popleft())
+        while pending:
+            yield finish(*pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
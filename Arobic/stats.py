@@ -2,14 +2,44 @@
 validator/stats.py
 ===================
 Prints a label distribution report for quality checking.
+
+Pass either the flat list of labels, a Counter built up incrementally
+(counts.update(...) per example, which keeps memory flat however many
+examples are streamed through), or a buffer of uint8 label IDs.
+
+label_counts() turns a label ID buffer into a Counter with one bincount
+(numpy when installed, bytes.count per label otherwise), so a shard's
+statistics never touch per-character label strings.
 """
 
 from collections import Counter
 
+from validator.label_aligner import LABELS
+
+try:
+    import numpy as np
+except ImportError:  # bytes.count per label; same counts, just slower
+    np = None
+
 
-def print_distribution_report(all_labels: list):
-    total = len(all_labels)
-    dist  = Counter(all_labels)
+def label_counts(label_ids) -> Counter:
+    """Counter of label strings from a bytes-like buffer of uint8 label IDs."""
+    if np is not None:
+        counts = np.bincount(np.frombuffer(label_ids, dtype=np.uint8), minlength=len(LABELS)).tolist()
+    else:
+        data   = bytes(label_ids)
+        counts = [data.count(i) for i in range(len(LABELS))]
+    return Counter({LABELS[i]: n for i, n in enumerate(counts) if n})
+
+
+def print_distribution_report(all_labels):
+    if isinstance(all_labels, Counter):
+        dist = all_labels
+    elif isinstance(all_labels, (bytes, bytearray, memoryview)):
+        dist = label_counts(all_labels)
+    else:
+        dist = Counter(all_labels)
+    total = sum(dist.values())
 
     print("\n" + "="*50)
     print("Label Distribution Report")
@@ -20,13 +50,7 @@ def print_distribution_report(all_labels: list):
     print(f"  {'Label':<16} {'Count':>7}  {'%':>6}")
     print("  " + "-"*32)
 
-    for label in [
-        "O",
-        "B-REGION","I-REGION","B-DISTRICT","I-DISTRICT",
-        "B-STREET","I-STREET","B-STRNUM","I-STRNUM",
-        "B-BUILDING","I-BUILDING","B-FLOOR","I-FLOOR",
-        "B-UNIT","I-UNIT",
-    ]:
+    for label in LABELS:
         count = dist.get(label, 0)
         pct   = 100 * count / total if total else 0
         bar   = "█" * int(pct / 2)
@@ -6,16 +6,30 @@ after the v2 fixes: district_en is "Yau Tsim Mong" (no "District" suffix),
 district_zh is "油尖旺" (no "區" suffix), block fields present.
 """
 
-import sys, json
+import sys, os, json, tempfile, threading, time, urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 sys.path.insert(0, "/home/claude/hk_address_pipeline")
 
+from extractor.als_client    import ALSClient
+from extractor.fetcher       import ParallelFetcher, TokenBucket
+from extractor.cache         import ResponseCache
+
 from processor.normalizer    import normalize_record
 from processor.deduplicator  import Deduplicator
 from augmentor.variants      import VariantGenerator
 from augmentor.noise         import NoiseInjector
-from validator.label_aligner import align_labels, validate_alignment, visualize, LABELS
-from validator.stats         import print_distribution_report
-from exporter                import export_ner_jsonl, export_llm_jsonl
+from validator.label_aligner import align_labels, validate_alignment, align_and_validate, visualize, LABELS, FIELD_SPEC
+from validator.label_aligner import encode_labels
+from validator.stats         import print_distribution_report, label_counts
+import validator.stats
+from exporter                import export_ner_jsonl, export_llm_jsonl, DatasetWriter, ner_line
+from collections             import Counter
+from stages                  import run_shards
+from build_spec              import BuildSpec, Manifest
+from build_cache             import BuildCache
+from examples                import ExampleBatch
+from binary_export           import BinaryDatasetWriter, BinaryDataset
+import mmap
 from pathlib import Path
 
 P = "✓"; F = "✗"; errors = 0
@@ -101,6 +115,112 @@ print("Stage 1 · Extract  (fixture, no API call)")
 print("="*55)
 check("Fixture loaded", len(RAW_RECORDS) == 6)
 
+# ── Stage 1b: Parallel fetcher against a local stub ALS server ────────────
+print("\nStage 1b · Parallel fetch (local stub server)")
+print("="*55)
+
+def als_json(street_zh, street_en, no):
+    """Recorded-style ALS JSON body with one suggested address."""
+    return json.dumps({"SuggestedAddress": [{"Address": {"PremisesAddress": {
+        "EngPremisesAddress": {"Region": "KLN", "EngDistrict": {"DcDistrict": "Yau Tsim Mong District"},
+                               "EngStreet": {"StreetName": street_en, "BuildingNoFrom": no}},
+        "ChiPremisesAddress": {"Region": "九龍", "ChiDistrict": {"DcDistrict": "油尖旺區"},
+                               "ChiStreet": {"StreetName": street_zh, "BuildingNoFrom": no}},
+        "GeospatialInformation": [{"Latitude": 22.3, "Longitude": 114.17}]}}}]}, ensure_ascii=False).encode()
+
+class StubALS(BaseHTTPRequestHandler):
+    recorded   = {f"seed{i}": als_json("彌敦道", "NATHAN ROAD", str(i)) for i in range(12)}
+    fail_first = {"seed3"}          # 503 once, then OK
+    missing    = set()              # 404 every time
+    hits, active, peak = {}, 0, 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        term = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)["q"][0]
+        cls = type(self)
+        with cls.lock:
+            cls.hits[term] = cls.hits.get(term, 0) + 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            first = cls.hits[term] == 1
+        time.sleep(0.1)
+        with cls.lock:
+            cls.active -= 1
+        if term in cls.missing or term not in cls.recorded:
+            self.send_error(404)
+        elif term in cls.fail_first and first:
+            self.send_response(503); self.send_header("Retry-After", "0"); self.end_headers()
+        else:
+            body = cls.recorded[term]
+            self.send_response(200); self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body))); self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), StubALS)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+stub_url = f"http://127.0.0.1:{server.server_address[1]}/lookup"
+seeds    = [f"seed{i}" for i in range(12)]
+ckpt     = Path(tempfile.mkdtemp()) / "als_checkpoint.jsonl"
+
+StubALS.missing = {"seed7"}
+fetcher = ParallelFetcher(ALSClient(base_url=stub_url), concurrency=4, rate=0, backoff=0.01, checkpoint=ckpt)
+t0 = time.monotonic()
+got = fetcher.fetch_all(seeds)
+elapsed = time.monotonic() - t0
+check("Parallel: 11/12 seeds fetched, 404 seed failed", len(got) == 11 and fetcher.failed == ["seed7"], str(fetcher.failed))
+check("Parallel: requests overlapped (peak 4 in flight)", StubALS.peak == 4, str(StubALS.peak))
+check("Parallel: 12 × 100 ms in well under sequential time", elapsed < 0.8, f"{elapsed:.2f}s")
+check("Retry: 503 seed retried and parsed", StubALS.hits["seed3"] == 2 and got["seed3"][0]["street_zh"] == "彌敦道")
+
+StubALS.missing = set(); StubALS.hits = {}
+resumed = ParallelFetcher(ALSClient(base_url=stub_url), concurrency=4, rate=0, checkpoint=ckpt).fetch_all(seeds)
+check("Resume: only the failed seed is fetched again", list(StubALS.hits) == ["seed7"], str(StubALS.hits))
+check("Resume: all 12 seeds available", len(resumed) == 12)
+
+StubALS.hits = {}
+wider = ParallelFetcher(ALSClient(n_results=50, base_url=stub_url), concurrency=4, rate=0, checkpoint=ckpt)
+wider.fetch_all(seeds)
+check("Resume: entries for another n_per_query are fetched again", sorted(StubALS.hits) == sorted(seeds),
+      f"{len(StubALS.hits)} refetched")
+
+bucket = TokenBucket(rate=20, burst=1)
+t0 = time.monotonic()
+for _ in range(6):
+    bucket.acquire()
+check("TokenBucket: 6 tokens at 20/s take ≥ 0.25 s", time.monotonic() - t0 >= 0.24, f"{time.monotonic() - t0:.3f}s")
+
+# ── Stage 1c: Response cache ───────────────────────────────────────────────
+print("\nStage 1c · Response cache")
+print("="*55)
+cache_dir = Path(tempfile.mkdtemp())
+cache = ResponseCache(cache_dir)
+StubALS.hits, StubALS.fail_first = {}, set()
+first = ParallelFetcher(ALSClient(base_url=stub_url, cache=cache), rate=0).fetch_all(seeds)
+again = ParallelFetcher(ALSClient(base_url=stub_url, cache=cache), rate=0).fetch_all(seeds)
+check("Cache: second run makes no HTTP requests", sum(StubALS.hits.values()) == 12, str(sum(StubALS.hits.values())))
+check("Cache: cached responses parse identically", again == first)
+check("Cache: key includes n_results", ALSClient(n_results=5, cache=cache).cached("seed0") is None)
+check("Cache: entries stored compressed", all(p.stat().st_size < len(StubALS.recorded["seed0"]) for p in cache_dir.glob("*/*.z")))
+server.shutdown()
+
+offline = ParallelFetcher(ALSClient(base_url=stub_url, cache=cache, offline=True), rate=0).fetch_all(seeds + ["uncached"])
+check("Offline: cached seeds served with the server down", len(offline) == 12 and "uncached" not in offline)
+
+expired = ResponseCache(cache_dir, ttl_seconds=0)
+time.sleep(0.01)
+check("TTL: expired entry is a miss", expired.get("seed0", 20, "json") is None)
+check("TTL: offline still serves stale entries", expired.get("seed0", 20, "json", allow_stale=True) is not None)
+
+small = ResponseCache(Path(tempfile.mkdtemp()), max_bytes=1000)
+for i in range(6):
+    small.put(f"t{i}", 20, "json", os.urandom(300))    # incompressible
+    small.get("t0", 20, "json")                 # keep t0 recently used
+check("LRU: cache held under max_bytes", small._size <= 1000 and small.evictions >= 1, small.summary())
+check("LRU: recently used entry survives eviction", small.get("t0", 20, "json") is not None)
+
 # ── Stage 2: Normalize ─────────────────────────────────────────────────────
 print("\nStage 2 · Normalize + Deduplicate")
 print("="*55)
@@ -134,6 +254,44 @@ dedup = Deduplicator()
 canonical = dedup.run(normalized)
 check("Dedup: 6→5 records (1 duplicate removed)", len(canonical) == 5)
 
+# Near-duplicate dedup: whitespace / full-width digits / trailing 大廈 merge, other numbers don't
+import processor.deduplicator as dedup_mod
+base = normalized[0]
+def variant(street_no=None, building=None, street=None):
+    r = json.loads(json.dumps(base))
+    if street_no is not None: r["street_no"] = street_no
+    if building is not None:  r["building"]["zh"] = building
+    if street is not None:    r["street"]["zh"] = street
+    return r
+near_in = [base,
+           variant(building=" " + base["building"]["zh"] + " "),
+           variant(street_no="".join(chr(ord(c) + 0xFEE0) if c.isdigit() else c for c in base["street_no"])),
+           variant(building=base["building"]["zh"] + "大廈"),
+           variant(street=base["street"]["zh"] + "　"),
+           variant(street_no=base["street_no"] + "2"),
+           variant(building="完全不同的大樓名稱")]
+check("Exact dedup keeps formatting variants apart", len(Deduplicator().run(near_in)) == len(near_in))
+near = Deduplicator(mode="near")
+near_out = near.run(near_in)
+check("Near dedup merges whitespace / full-width / 大廈 variants",
+      near_out == [near_in[0], near_in[5], near_in[6]], f"{len(near_out)} kept")
+report = near.report()
+check("Near dedup reports the merged cluster",
+      len(report) == 1 and len(report[0]["merged"]) == 4 and report[0]["kept"] == "|".join(dedup_mod._key_fields(base)))
+long_base = variant(building="香港特別行政區政府總部東翼辦公大樓")
+typo      = variant(building="香港特別行政區政府總部東翼辦公大楼")
+lsh = Deduplicator(mode="near", threshold=0.7)
+check("Near dedup: LSH merges a one-character difference", len(lsh.run([long_base, typo])) == 1,
+      str(lsh.report()[0]["merged"][0]["similarity"] if lsh.clusters else "no merge"))
+index = dedup_mod.NearDuplicateIndex()
+text = "|".join(dedup_mod.normalize_key(dedup_mod._key_fields(base)))
+saved_np, dedup_mod.np = dedup_mod.np, None
+pure_sig = index.signature(text)
+dedup_mod.np = saved_np
+check("MinHash: numpy and pure-Python signatures agree", index.signature(text) == pure_sig)
+spread = [variant(street_no=str(i), building=f"大廈{i * 7919 % 10007}") for i in range(3000)]
+check("Near dedup: distinct records all kept", len(Deduplicator(mode="near").run(spread)) == len(spread))
+
 # ── Stage 3: Augment ──────────────────────────────────────────────────────
 print("\nStage 3 · Augment")
 print("="*55)
@@ -181,6 +339,40 @@ labs_c = align_labels(addr_c, parsed_c)
 errs_c = validate_alignment(addr_c, labs_c, parsed_c)
 check("Estate+block alignment", not errs_c, "; ".join(errs_c) if errs_c else "ok")
 
+# Automaton aligner must label exactly like the original find()-loop aligner
+def align_labels_by_find(address, parsed):
+    labels = ["O"] * len(address)
+    for zh_key, en_key, b_tag, i_tag in FIELD_SPEC:
+        candidates = []
+        for value in [parsed.get(zh_key, "").strip() if zh_key else "",
+                      parsed.get(en_key, "").strip() if en_key else ""]:
+            start = 0
+            while value and (idx := address.find(value, start)) != -1:
+                candidates.append((idx, value))
+                start = idx + 1
+        candidates.sort(key=lambda x: x[0])
+        for idx, value in candidates:
+            if all(labels[i] == "O" for i in range(idx, idx + len(value))):
+                labels[idx:idx + len(value)] = [b_tag] + [i_tag] * (len(value) - 1)
+                break
+    return labels
+
+import random as _random
+fuzz_rng = _random.Random(21)
+fuzz = [(ex["address"], ex["parsed"]) for ex in dataset] + [(addr_a, parsed_a), (addr_b, parsed_b), (addr_c, parsed_c)]
+for _ in range(3000):                  # tiny alphabet → overlapping, repeated and nested values
+    text = "".join(fuzz_rng.choice("ab1") for _ in range(fuzz_rng.randint(0, 12)))
+    keys = [k for spec in FIELD_SPEC for k in spec[:2] if k]
+    fuzz.append((text, {k: "".join(fuzz_rng.choice("ab1 ") for _ in range(fuzz_rng.randint(0, 3))) for k in keys}))
+check("Automaton aligner matches find() aligner",
+      all(align_labels(a, p) == align_labels_by_find(a, p) for a, p in fuzz), f"{len(fuzz)} cases")
+check("align_and_validate matches separate calls",
+      all(align_and_validate(a, p) == (encode_labels(align_labels(a, p)), validate_alignment(a, align_labels(a, p), p))
+          for a, p in fuzz[:len(dataset)]))
+check("validate_alignment: label IDs and label strings give the same errors",
+      all(validate_alignment(a, encode_labels(align_labels(a, p)), p) == validate_alignment(a, align_labels(a, p), p)
+          for a, p in fuzz))
+
 print("\n  Visualizing Test A:")
 visualize(addr_a, labs_a)
 
@@ -198,6 +390,18 @@ check(f"Labeled examples ({len(labeled)}/{len(dataset)} passed validation)",
 all_labels = [l for ex in labeled for l in ex["bio_labels"]]
 print_distribution_report(all_labels)
 
+# Array-backed batch: same examples back, counts by bincount (numpy and pure Python)
+batch = ExampleBatch()
+for ex in labeled:
+    batch.append(ex["address"], encode_labels(ex["bio_labels"]), ex["parsed"], ex.get("_noisy", False))
+check("ExampleBatch round-trips labeled examples", list(batch) == labeled)
+check("ExampleBatch: one byte per character", len(batch.labels) == len(all_labels) == len(batch.text))
+saved_np, validator.stats.np = validator.stats.np, None
+pure_counts = label_counts(batch.labels)
+validator.stats.np = saved_np
+check("Label bincount matches Counter of label strings",
+      batch.label_counts() == pure_counts == Counter(all_labels))
+
 # ── Stage 6: Export ────────────────────────────────────────────────────────
 print("Stage 6 · Export")
 print("="*55)
@@ -216,6 +420,165 @@ with open(out/"llm_finetune.jsonl") as f:
 check("LLM: all 3 keys present",
       all(k in first_llm for k in ["instruction","input","output"]))
 
+# Streaming writer must produce byte-identical files to the list exporters
+stream_out = Path(tempfile.mkdtemp())
+with DatasetWriter(stream_out/"ner_dataset.jsonl", stream_out/"llm_finetune.jsonl") as writer:
+    for ex in iter(labeled):
+        writer.write(ex)
+check("Streaming export matches list export",
+      all((stream_out/n).read_bytes() == (out/n).read_bytes() for n in ["ner_dataset.jsonl", "llm_finetune.jsonl"]))
+
+# Sharded / compressed JSONL: same bytes once shards are joined and decompressed
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+from exporter import JSONLWriter, zstandard
+plain = (out/"ner_dataset.jsonl").read_bytes()
+def joined(paths, decompress=lambda b: b):
+    return b"".join(decompress(Path(p).read_bytes()) for p in paths)
+shard_dir = Path(tempfile.mkdtemp())
+(shard_dir/"ner-00009.jsonl.gz").write_bytes(b"stale")
+with ThreadPoolExecutor(4) as pool:
+    export_ner_jsonl(labeled, shard_dir/"ner.jsonl", shard_examples=7, compression="gzip", pool=pool, block_bytes=512)
+index = json.loads((shard_dir/"ner.shards.json").read_text())
+check("Sharded gzip JSONL: shards join to the plain export",
+      joined((shard_dir/s["file"] for s in index["shards"]), gzip.decompress) == plain, f"{len(index['shards'])} shards")
+check("Sharded JSONL: index counts examples per shard",
+      [s["examples"] for s in index["shards"]] == [min(7, len(labeled) - k) for k in range(0, len(labeled), 7)]
+      and index["examples"] == len(labeled))
+check("Sharded JSONL: stale shards and temp files removed",
+      not (shard_dir/"ner-00009.jsonl.gz").exists() and not list(shard_dir.glob("*.tmp")))
+with JSONLWriter(shard_dir/"sized.jsonl", shard_bytes=2000) as w:
+    for ex in labeled:
+        w.write_serialized(ner_line(ex), 1)
+check("Size-sharded JSONL: whole lines, within the limit",
+      joined(p for p, *_ in w.files) == plain and
+      all(size <= 2000 or n == 1 for _, _, size, n in w.files) and sum(n for *_, n in w.files) == len(labeled))
+if zstandard is not None:
+    export_ner_jsonl(labeled, shard_dir/"z.jsonl", compression="zstd")
+    reader = zstandard.ZstdDecompressor().stream_reader(open(shard_dir/"z.jsonl.zst", "rb"), read_across_frames=True)
+    check("zstd JSONL decompresses to the plain export", reader.read() == plain)
+else:
+    try:
+        export_ner_jsonl(labeled, shard_dir/"z.jsonl", compression="zstd")
+        check("zstd without zstandard is refused", False)
+    except RuntimeError:
+        check("zstd without zstandard is refused", True)
+try:
+    with JSONLWriter(shard_dir/"crash.jsonl") as w:
+        w.write_serialized(ner_line(labeled[0]), 1)
+        raise KeyboardInterrupt
+except KeyboardInterrupt:
+    pass
+check("Atomic commit: an interrupted export leaves no file behind",
+      not (shard_dir/"crash.jsonl").exists() and not list(shard_dir.glob("*.tmp")))
+
+# Binary shards: same examples back through mmap, JSONL view byte-identical
+bin_dir = Path(tempfile.mkdtemp()) / "binary"
+with BinaryDatasetWriter(bin_dir, examples_per_shard=7) as bin_writer:
+    for ex in labeled:
+        bin_writer.write(ex)
+with BinaryDataset(bin_dir) as bin_data:
+    check("Binary: examples round-trip in order", len(bin_data) == len(labeled) and list(bin_data) == labeled,
+          f"{len(bin_data.shards)} shards")
+    check("Binary: random access", bin_data[len(labeled) - 1] == labeled[-1] and bin_data[8] == labeled[8])
+    ids = bin_data.label_ids(3)
+    check("Binary: label IDs are a view into the mapping", isinstance(ids.obj, mmap.mmap) and
+          bytes(ids) == encode_labels(labeled[3]["bio_labels"]))
+    ids.release()
+    bin_jsonl = Path(tempfile.mkdtemp())
+    bin_data.write_jsonl(bin_jsonl/"ner_dataset.jsonl", bin_jsonl/"llm_finetune.jsonl")
+    check("Binary: JSONL view matches JSONL export",
+          all((bin_jsonl/n).read_bytes() == (out/n).read_bytes() for n in ["ner_dataset.jsonl", "llm_finetune.jsonl"]))
+    def shuffled(seed):
+        return [a for b in bin_data.batches(4, shuffle=True, seed=seed) for a, ids in b]
+    check("Binary: shuffled batches cover every example once, reproducibly",
+          sorted(shuffled(1)) == sorted(ex["address"] for ex in labeled) and shuffled(1) == shuffled(1)
+          and shuffled(1) != [ex["address"] for ex in labeled])
+    check("Binary: batches never span shards", [len(b) for b in bin_data.batches(4)] ==
+          [min(4, len(sh) - k) for sh in bin_data.shards for k in range(0, len(sh), 4)])
+try:
+    with BinaryDatasetWriter(bin_dir, examples_per_shard=7) as bin_writer:
+        for ex in labeled[:8]:
+            bin_writer.write(ex)
+        raise KeyboardInterrupt
+except KeyboardInterrupt:
+    pass
+check("Binary: a failed rebuild leaves no index to stale shards", not (bin_dir/"index.json").exists())
+with BinaryDatasetWriter(bin_dir, examples_per_shard=7) as bin_writer:
+    for ex in labeled[:8]:
+        bin_writer.write(ex)
+with BinaryDataset(bin_dir) as bin_data:
+    check("Binary: a smaller rebuild drops the shards it no longer lists",
+          list(bin_data) == labeled[:8] and sorted(p.name for p in bin_dir.iterdir()) ==
+          ["index.json", "ner-00000.bin", "ner-00001.bin"])
+
+# Dedup stream is lazy: pulling one record consumes only one input
+pulled = []
+def tracked(records):
+    for r in records:
+        pulled.append(r)
+        yield r
+first_unique = next(Deduplicator().stream(tracked(normalized)))
+check("Dedup stream is lazy", len(pulled) == 1 and first_unique is normalized[0])
+
+# Sharded augment + label: same spec → same bytes, whatever the worker count
+many = [dict(r, street_no=str(i)) for i in range(40) for r in canonical]
+def sharded(seed, workers, shard_size=16):
+    spec = BuildSpec(seed=seed, shard_size=shard_size)
+    return [(s.ner_text, s.llm_text, s.count, s.ner_sha256) for s in run_shards(many, spec, workers=workers)]
+serial_run = sharded(7, 1)
+check("Sharded: 2 worker processes match serial output", sharded(7, 2) == serial_run)
+check("Sharded: same seed reproduces, other seed differs",
+      sharded(7, 1) == serial_run and sharded(8, 1) != serial_run)
+check("Sharded: shard order preserved", len(serial_run) == -(-len(many) // 16))
+check("Per-record RNG: output independent of shard size",
+      "".join(t[0] for t in sharded(7, 1, shard_size=5)) == "".join(t[0] for t in serial_run))
+first_alone = run_shards(many[5:6], BuildSpec(seed=7), workers=1)
+check("Per-record RNG: a record's examples don't depend on its position",
+      next(first_alone).ner_text in "".join(t[0] for t in serial_run))
+
+# Incremental builds: cached records are reused, only new/changed ones rebuilt
+cache_path = Path(tempfile.mkdtemp()) / "build_cache.sqlite"
+def cached_run(records, seed=7, workers=1):
+    with BuildCache(cache_path) as cache:
+        shards = list(run_shards(records, BuildSpec(seed=seed, shard_size=16), workers=workers, cache=cache))
+        return "".join(s.ner_text for s in shards), sum(s.progress["reused"] for s in shards), cache.misses
+cold_text, cold_reused, _ = cached_run(many)
+warm_text, warm_reused, _ = cached_run(many, workers=2)
+check("Build cache: cold build matches uncached output",
+      cold_text == "".join(t[0] for t in serial_run) and cold_reused == 0)
+check("Build cache: warm rebuild reuses every record", warm_text == cold_text and warm_reused == len(many))
+grown = many[:10] + [dict(canonical[0], street_no="new")] + many[10:]
+grown[3] = dict(grown[3], street_no="changed")
+grown_text, grown_reused, grown_misses = cached_run(grown)
+check("Build cache: only new/changed records rebuilt", grown_reused == len(many) - 1 and grown_misses == 2)
+check("Build cache: incremental output matches a clean build",
+      grown_text == "".join(s.ner_text for s in run_shards(grown, BuildSpec(seed=7, shard_size=16))))
+_, other_seed_reused, _ = cached_run(many, seed=8)
+check("Build cache: config change invalidates entries", other_seed_reused == 0)
+with BuildCache(cache_path) as cache:
+    cache.get_many([BuildCache.key(r, {}) for r in ["x"]])
+    stored = len(cache)
+    check("Build cache: prune drops entries the build did not use", cache.prune() == stored and len(cache) == 0)
+
+spec_path = Path(tempfile.mkdtemp()) / "manifest.json"
+manifest = Manifest(BuildSpec(seeds=["旺角"], seed=7))
+list(manifest.hash_raw(RAW_RECORDS))
+manifest.write(spec_path)
+check("Manifest: spec round-trips through manifest.json",
+      BuildSpec.load(spec_path) == BuildSpec(seeds=["旺角"], seed=7))
+manifest_again = Manifest(BuildSpec(seeds=["旺角"], seed=7))
+list(manifest_again.hash_raw(RAW_RECORDS))
+check("Manifest: identical inputs → identical manifest", manifest_again.to_dict() == manifest.to_dict())
+try:
+    BuildSpec(dedup="near", minhash_perm=100, lsh_bands=16)
+    check("Spec: LSH bands that don't divide minhash_perm are rejected", False)
+except ValueError:
+    check("Spec: LSH bands that don't divide minhash_perm are rejected", True)
+
+check("Distribution from incremental Counter",
+      Counter(l for ex in labeled for l in ex["bio_labels"]) == Counter(all_labels))
+
 # ── Final ──────────────────────────────────────────────────────────────────
 print("\n" + "="*55)
 status = "ALL TESTS PASSED ✓" if errors == 0 else f"{errors} TEST(S) FAILED ✗"
@@ -56,6 +56,11 @@ STRNUM_FMTS = [
 
 
 class VariantGenerator:
+    def __init__(self, rng: random.Random = None, n_variants: int = 6):
+        # Pass a seeded random.Random for reproducible output; default is the global RNG
+        self.rng = rng if rng is not None else random
+        self.n_variants = n_variants
+
     def generate(self, record: dict) -> list:
         variants = []
         rz = record["region"]["zh"];   re_ = record["region"]["en"]
@@ -64,14 +69,14 @@ class VariantGenerator:
         sn = record["street_no"]
         bz = record["building"]["zh"]; be  = record["building"]["en"]
 
-        floor = random.choice(FLOORS)
-        unit  = random.choice(UNITS)
+        floor = self.rng.choice(FLOORS)
+        unit  = self.rng.choice(UNITS)
 
-        for _ in range(6):  # 6 variants per canonical record
-            mode = random.choice(["zh_only","en_only","mixed_zh","mixed_en","hkpost_zh","hkpost_en"])
-            fl_fmt = random.choice(FLOOR_FMTS)(floor)
-            un_fmt = random.choice(UNIT_FMTS)(unit)
-            sn_fmt = random.choice(STRNUM_FMTS)(sn) if sn else ""
+        for _ in range(self.n_variants):  # 6 variants per canonical record by default
+            mode = self.rng.choice(["zh_only","en_only","mixed_zh","mixed_en","hkpost_zh","hkpost_en"])
+            fl_fmt = self.rng.choice(FLOOR_FMTS)(floor)
+            un_fmt = self.rng.choice(UNIT_FMTS)(unit)
+            sn_fmt = self.rng.choice(STRNUM_FMTS)(sn) if sn else ""
 
             parsed = {
                 "region_zh":    rz, "region_en":    re_,
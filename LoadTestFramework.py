@@ -1,22 +1,29 @@
-import win32com.client
-import win32api
-import pythoncom
-import pywintypes
 import time
 import datetime
 import os
 import sys
 import json
-import pyodbc
 import socket
 import subprocess
 import random
-from typing import List, Dict, Tuple, Any, Optional
+import threading
+import argparse
+from typing import List, Dict, Set, Tuple, Any, Optional
 import logging
 from dataclasses import dataclass
 from contextlib import contextmanager
-from func_timeout import func_timeout, FunctionTimedOut
-from sqlalchemy import create_engine  # New import for connection pooling
+from concurrent.futures import Future, ThreadPoolExecutor
+from load_executor import WorkerPool, CallResult, THREAD_MODE
+from load_scheduler import DeadlineScheduler
+from load_profiles import LoadProfile, parse_load_profile
+from latency_histogram import LatencyRecorder, REPORT_PERCENTILES
+from result_writer import ResultWriter, CSV_FORMAT, BINARY_FORMAT
+from control_plane import ControlPlaneClient, SqlControlStore
+from target_drivers import COM_TARGET, create_session_factory, describe_target
+from coordinator import Assignment, AgentLink, parse_address, partition_inner_functions
+from startup_timer import StartupTimer
+from metrics_exporter import MetricsExporter
+from testcase_source import PHASES, TestCaseRow, TestCaseWatcher, FileTestCaseSource, SqlTestCaseSource
 
 # Configure logging with separate console log file
 log_directory = os.path.join(os.getcwd(), 'logs')
@@ -32,6 +39,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+HEARTBEAT_INTERVAL_SECONDS = 60
+
 @dataclass
 class FunctionInfo:
     module_name: str
@@ -40,6 +49,13 @@ class FunctionInfo:
     interval_seconds: float
     throughput: int
     timeout_seconds: float
+    load_profile: Optional[LoadProfile] = None  # open-model arrival schedule; None keeps interval pacing
+
+@dataclass
+class ArrivalStats:
+    arrivals: int = 0
+    behind: int = 0
+    max_lag_seconds: float = 0.0
 
 @dataclass
 class DatabaseConfig:
@@ -53,6 +69,15 @@ class DatabaseConfig:
 class LoggingConfig:
     log_directory: str
     log_level: str
+    histogram_flush_seconds: float
+    result_format: str
+    result_queue_size: int
+    result_flush_rows: int
+    result_flush_seconds: float
+    metrics_port: int
+    metrics_host: str
+    metrics_publish_seconds: float
+    metrics_snapshot: bool
 
 @dataclass
 class ExecutionConfig:
@@ -65,6 +90,16 @@ class ExecutionConfig:
     default_inner_interval: float
     default_wait_time_seconds: int
     default_timeout_seconds: float
+    num_workers: int
+    executor_mode: str
+    arrival_lag_threshold_seconds: float
+    stop_refresh_seconds: float
+    coordinator_address: str
+    coordinator_authkey: str
+    stats_stream_seconds: float
+    target: Dict[str, Any]
+    testcase_file: str
+    testcase_reload_seconds: float
 
 @dataclass
 class LoadTestConfig:
@@ -73,7 +108,9 @@ class LoadTestConfig:
     execution: ExecutionConfig
 
 class LoadTestFramework:
-    def __init__(self):
+    def __init__(self, executor: Optional[WorkerPool] = None, keep_executor: bool = False):
+        """executor: already-open worker pool to reuse; keep_executor leaves the pool open after cleanup (warm mode)"""
+        self.startup = StartupTimer()
         self.config = self.load_configuration()
         self.duration_min: int = self.config.execution.default_duration_min
         self.num_iterations: int = self.config.execution.default_num_iterations
@@ -85,14 +122,17 @@ class LoadTestFramework:
         self.second_iteration_count: int = 0
         self.second_next_run: datetime.datetime = datetime.datetime.min
         self.iteration_count: int = 0
-        self.should_stop: bool = False
         self.test_id: str = os.environ.get('eVTCS_TestId', '')
         self.user_role: str = os.environ.get('eVTCS_UserRole', '')
         self.ip_address: str = self.get_ip_address()
         if not self.ip_address:
             self.ip_address = "UNKNOWN"
-        self.xl_app = None
-        self.wb = None
+        self.executor: Optional[WorkerPool] = executor
+        self.keep_executor = keep_executor
+        self.latency = LatencyRecorder()
+        self.result_writer: Optional[ResultWriter] = None
+        self.metrics: Optional[MetricsExporter] = None
+        self.agent_link: Optional[AgentLink] = None
         self.script_dir: str = ""
         self.xlsm_file: str = ""
         self.log_file: str = ""
@@ -105,9 +145,33 @@ class LoadTestFramework:
         self.pso_functions: List[FunctionInfo] = []
         self.psc_functions: List[FunctionInfo] = []
         self.inner_function_last_run: Dict[Tuple[str, str, str], datetime.datetime] = {}
+        # Current INNER definition per key, and the token of the schedule chain allowed to run it
+        self.inner_by_key: Dict[Tuple[str, str, str], FunctionInfo] = {}
+        self.inner_chains: Dict[Tuple[str, str, str], object] = {}
+        self.testcase_source = None
+        self.testcase_watcher: Optional[TestCaseWatcher] = None
+        self.testcase_version: Optional[str] = None
+        self.pending_testcase: Optional[Tuple[str, Dict[str, List[FunctionInfo]]]] = None
+        self.reload_lock = threading.Lock()
+        self.active_scheduler: Optional[DeadlineScheduler] = None
+        self.last_scheduler: Optional[DeadlineScheduler] = None
+        self.assignment: Optional[Assignment] = None
+        self.inner_in_flight: Set[Future] = set()
+        self.arrival_stats: Dict[Tuple[str, str, str], ArrivalStats] = {}
+        self.arrival_rng = random.Random()
+        self.profile_origin: float = 0.0
+        self.inner_active: bool = False
         self.wait_time: int = self.config.execution.default_wait_time_seconds
         # Initialize SQLAlchemy engine for connection pooling
         self.db_engine = self.create_db_engine()
+        self.control = ControlPlaneClient(
+            SqlControlStore(self.db_engine, self.test_id),
+            self.ip_address,
+            refresh_seconds=self.config.execution.stop_refresh_seconds,
+            heartbeat_seconds=HEARTBEAT_INTERVAL_SECONDS,
+            on_error=self.log_control_error,
+            on_stop_error=self.log_stop_check_error
+        )
         self.setup_logging()
     
     def create_db_engine(self):
@@ -118,6 +182,8 @@ class LoadTestFramework:
                 f"mssql+pyodbc://{self.config.database.username}:{self.config.database.password}"
                 f"@{self.config.database.server}/{self.config.database.database}?driver={driver}"
             )
+            # Imported here so the module loads (e.g. for scheduler benchmarks) without the SQL Server stack
+            from sqlalchemy import create_engine
             engine = create_engine(conn_str, pool_size=5, max_overflow=10)
             logger.info(f"[DB] Created SQLAlchemy engine with driver: {driver}")
             return engine
@@ -125,7 +191,8 @@ class LoadTestFramework:
             logger.error(f"[DB ERROR] Failed to create database engine: {str(e)}")
             sys.exit(1)
     
-    def load_configuration(self) -> LoadTestConfig:
+    @staticmethod
+    def load_configuration() -> LoadTestConfig:
         """Load configuration from file with multiple fallback locations"""
         config_paths = [
             os.path.join(os.path.dirname(sys.executable if getattr(sys, 'frozen', False) else __file__), 'config.json'),
@@ -163,7 +230,16 @@ class LoadTestFramework:
             
             logging_config = LoggingConfig(
                 log_directory=config_data['logging']['log_directory'],
-                log_level=config_data['logging']['log_level']
+                log_level=config_data['logging']['log_level'],
+                histogram_flush_seconds=config_data['logging'].get('histogram_flush_seconds', 60.0),
+                result_format=config_data['logging'].get('result_format', CSV_FORMAT),
+                result_queue_size=config_data['logging'].get('result_queue_size', 10000),
+                result_flush_rows=config_data['logging'].get('result_flush_rows', 500),
+                result_flush_seconds=config_data['logging'].get('result_flush_seconds', 1.0),
+                metrics_port=config_data['logging'].get('metrics_port', 0),
+                metrics_host=config_data['logging'].get('metrics_host', '127.0.0.1'),
+                metrics_publish_seconds=config_data['logging'].get('metrics_publish_seconds', 5.0),
+                metrics_snapshot=config_data['logging'].get('metrics_snapshot', True)
             )
             
             execution_config = ExecutionConfig(
@@ -175,8 +251,20 @@ class LoadTestFramework:
                 default_thinking_time=config_data['execution']['default_thinking_time'],
                 default_inner_interval=config_data['execution'].get('default_inner_interval', 3.0),
                 default_wait_time_seconds=config_data['execution'].get('default_wait_time_seconds', 10),
-                default_timeout_seconds=config_data['execution'].get('default_timeout_seconds', 10.0)
+                default_timeout_seconds=config_data['execution'].get('default_timeout_seconds', 10.0),
+                num_workers=config_data['execution'].get('num_workers', 1),
+                executor_mode=config_data['execution'].get('executor_mode', THREAD_MODE),
+                arrival_lag_threshold_seconds=config_data['execution'].get('arrival_lag_threshold_seconds', 1.0),
+                stop_refresh_seconds=config_data['execution'].get('stop_refresh_seconds', 10.0),
+                coordinator_address=os.environ.get('eVTCS_Coordinator', config_data['execution'].get('coordinator_address', '')),
+                coordinator_authkey=os.environ.get('eVTCS_CoordinatorKey', config_data['execution'].get('coordinator_authkey', '')),
+                stats_stream_seconds=config_data['execution'].get('stats_stream_seconds', 5.0),
+                target=config_data['execution'].get('target', {"type": COM_TARGET}),
+                testcase_file=config_data['execution'].get('testcase_file', ''),
+                testcase_reload_seconds=config_data['execution'].get('testcase_reload_seconds', 30.0)
             )
+            if execution_config.coordinator_address and not execution_config.coordinator_authkey:
+                raise ValueError("coordinator_address needs coordinator_authkey (or eVTCS_CoordinatorKey)")
             
             config = LoadTestConfig(
                 database=db_config,
@@ -213,7 +301,7 @@ class LoadTestFramework:
         logger.info("[INIT] Initializing Python script...")
         
         self.xlsm_file = os.environ.get('eVTCS_Program', '')
-        if not self.xlsm_file:
+        if not self.xlsm_file and self.config.execution.target.get("type", COM_TARGET) == COM_TARGET:
             logger.error("[ERROR] EXCEL_FILE not defined!")
             sys.exit(1)
         
@@ -223,15 +311,70 @@ class LoadTestFramework:
             self.xlsm_file = self.xlsm_file[:-1]
         
         logfile_time = datetime.datetime.now().strftime("%Y%m%d-%H")
-        self.log_file = f"{self.config.logging.log_directory}\\{self.test_id}-{self.ip_address}-jmeter_logfile_{logfile_time}.log"
+        log_extension = "bin" if self.config.logging.result_format == BINARY_FORMAT else "log"
+        self.log_file = os.path.join(self.config.logging.log_directory, f"{self.test_id}-{self.ip_address}-jmeter_logfile_{logfile_time}.{log_extension}")
         
         log_dir = os.path.dirname(self.log_file)
         os.makedirs(log_dir, exist_ok=True)
         
-        with open(self.log_file, 'w', encoding='utf-8') as f:
-            f.write("Timestamp,Result,Parameter\n")
+        self.result_writer = ResultWriter(
+            self.log_file,
+            fmt=self.config.logging.result_format,
+            max_queue=self.config.logging.result_queue_size,
+            flush_rows=self.config.logging.result_flush_rows,
+            flush_seconds=self.config.logging.result_flush_seconds
+        )
         
         logger.info(f"[LOG] Writing to: {self.log_file}")
+        
+        histogram_base = os.path.join(self.config.logging.log_directory, f"{self.test_id}-{self.ip_address}-histograms")
+        self.latency = LatencyRecorder(
+            interval_path=f"{histogram_base}_{logfile_time}.jsonl",
+            final_path=f"{histogram_base}.json",
+            flush_interval_seconds=self.config.logging.histogram_flush_seconds,
+            labels={"test_id": self.test_id, "agent": self.ip_address}
+        )
+        self.latency.start()
+        logger.info(f"[LOG] Histograms every {self.config.logging.histogram_flush_seconds}s to: {histogram_base}_{logfile_time}.jsonl")
+        
+        if self.config.logging.metrics_publish_seconds > 0 and (self.config.logging.metrics_port or self.config.logging.metrics_snapshot):
+            snapshot_path = ""
+            if self.config.logging.metrics_snapshot:
+                snapshot_path = os.path.join(self.config.logging.log_directory, f"{self.test_id}-{self.ip_address}-metrics.json")
+            self.metrics = MetricsExporter(
+                self.collect_metrics,
+                port=self.config.logging.metrics_port,
+                host=self.config.logging.metrics_host,
+                snapshot_path=snapshot_path,
+                publish_seconds=self.config.logging.metrics_publish_seconds
+            )
+            self.metrics.start()
+    
+    def collect_metrics(self) -> Dict[str, Any]:
+        """Snapshot of the agent's pre-aggregated counters for the metrics exporter"""
+        elapsed = (datetime.datetime.now() - self.start_time).total_seconds() if self.start_time != datetime.datetime.min else 0.0
+        functions = {}
+        for key, stats in self.latency.cumulative().items():
+            row = {**stats.summary(elapsed), **stats.corrected_summary()}
+            row["sum_seconds"] = stats.histogram.sum_us / 1_000_000
+            functions[key] = row
+        executor = self.executor
+        scheduler = self.active_scheduler or self.last_scheduler
+        return {
+            "time": time.time(),
+            "labels": {"test_id": self.test_id, "agent": self.ip_address},
+            "iteration": self.iteration_count,
+            "in_flight": executor.in_flight if executor else 0,
+            "queued": executor.queued if executor else 0,
+            "workers": executor.num_workers if executor else 0,
+            "sessions_recycled": executor.recycled if executor else 0,
+            "scheduler_lag_seconds": round(scheduler.last_lag, 6) if scheduler else 0.0,
+            "scheduler_max_lag_seconds": round(scheduler.max_lag, 6) if scheduler else 0.0,
+            "writer_queue_depth": self.result_writer.qsize() if self.result_writer else 0,
+            "writer_rows_written": self.result_writer.written if self.result_writer else 0,
+            "writer_queue_full_waits": self.result_writer.queue_full_waits if self.result_writer else 0,
+            "functions": functions,
+        }
     
     def get_ip_address(self) -> str:
         """Get the hostname of the machine since internet is unavailable"""
@@ -276,98 +419,146 @@ class LoadTestFramework:
             logger.error(f"[SQL ERROR] Cannot query config: {str(e)}")
             sys.exit(1)
     
+    def create_testcase_source(self):
+        """TestCase definitions come from execution.testcase_file when set, otherwise from the database"""
+        if self.config.execution.testcase_file:
+            return FileTestCaseSource(self.config.execution.testcase_file, self.default_inner_interval, self.default_timeout_seconds)
+        return SqlTestCaseSource(self.db_engine, self.user_role, self.default_inner_interval, self.default_timeout_seconds)
+    
     def load_vba_functions(self):
-        """Load VBA functions from database"""
-        logger.info("[SQL] Loading VBA functions from database...")
+        """Load VBA functions and their optional load profiles from the TestCase source"""
+        self.testcase_source = self.create_testcase_source()
+        logger.info(f"[SQL] Loading VBA functions from {self.testcase_source.describe()}...")
         
         try:
-            with self.db_engine.connect() as conn:
-                cursor = conn.execute(
-                    """
-                    SELECT Phase, ModuleName, FunctionName, Parameter, 
-                           COALESCE(IntervalSeconds, ?) AS IntervalSeconds,
-                           COALESCE(Throughput, 1) AS Throughput,
-                           COALESCE(TimeoutSeconds, ?) AS TimeoutSeconds
-                    FROM TestCase 
-                    WHERE UserRole = ? OR UserRole = SUBSTRING(?, 1, 1) 
-                    ORDER BY Phase, Sequence
-                    """,
-                    (self.default_inner_interval, self.default_timeout_seconds, self.user_role, self.user_role)
-                )
-                
-                pso_list = []
-                psc_list = []
-                start_list = []
-                inner_list = []
-                end_list = []
-                second_end_list = []
-                
-                for row in cursor.fetchall():
-                    phase = row[0]
-                    module_name = row[1]
-                    function_name = row[2]
-                    parameter = row[3]
-                    interval_seconds = float(row[4])
-                    throughput = int(row[5])
-                    timeout_seconds = float(row[6])
-                    
-                    if timeout_seconds <= 0:
-                        logger.warning(f"Invalid timeout {timeout_seconds} for {module_name}.{function_name}. Using default {self.default_timeout_seconds}.")
-                        timeout_seconds = self.default_timeout_seconds
-                    
-                    func_info = FunctionInfo(module_name, function_name, parameter, interval_seconds, throughput, timeout_seconds)
-                    
-                    if phase == "PSO":
-                        pso_list.append(func_info)
-                    elif phase == "PSC":
-                        psc_list.append(func_info)
-                    elif phase == "START":
-                        start_list.append(func_info)
-                    elif phase == "INNER":
-                        inner_list.append(func_info)
-                    elif phase == "END":
-                        end_list.append(func_info)
-                    elif phase == "SECOND_END":
-                        second_end_list.append(func_info)
-                
-                self.pso_functions = pso_list
-                self.psc_functions = psc_list
-                self.start_functions = start_list
-                self.inner_functions = inner_list
-                self.end_functions = end_list
-                self.second_end_functions = second_end_list
-                
-                logger.info(f"[SQL] Loaded functions: START={len(self.start_functions)}, INNER={len(self.inner_functions)}, END={len(self.end_functions)}, SECOND_END={len(self.second_end_functions)}, PSO={len(self.pso_functions)}, PSC={len(self.psc_functions)}")
-                
+            self.testcase_version = self.testcase_source.version()
+            rows = self.testcase_source.load()
         except Exception as e:
             logger.error(f"[SQL ERROR] Cannot query functions: {str(e)}")
             sys.exit(1)
-    
-    def initialize_excel(self):
-        """Initialize Excel application and workbook"""
-        logger.info("[OPEN] Connecting to Excel...")
         
-        try:
-            pythoncom.CoInitialize()
-            self.xl_app = win32com.client.Dispatch("Excel.Application")
-            self.xl_app.Visible = True
+        self.set_phase_lists(self.build_phase_lists(rows))
+        logger.info(f"[SQL] Loaded functions: START={len(self.start_functions)}, INNER={len(self.inner_functions)}, END={len(self.end_functions)}, SECOND_END={len(self.second_end_functions)}, PSO={len(self.pso_functions)}, PSC={len(self.psc_functions)}")
+    
+    def build_phase_lists(self, rows: List[TestCaseRow]) -> Dict[str, List[FunctionInfo]]:
+        """FunctionInfo lists per phase from TestCase rows"""
+        phases: Dict[str, List[FunctionInfo]] = {phase: [] for phase in PHASES}
+        for row in rows:
+            timeout_seconds = row.timeout_seconds
+            if timeout_seconds <= 0:
+                logger.warning(f"Invalid timeout {timeout_seconds} for {row.module_name}.{row.function_name}. Using default {self.default_timeout_seconds}.")
+                timeout_seconds = self.default_timeout_seconds
             
-            self.wb = self.xl_app.Workbooks.Open(self.xlsm_file)
-            self.wb.Activate()
+            load_profile = None
+            if row.load_profile and row.phase == "INNER":
+                try:
+                    load_profile = parse_load_profile(row.load_profile)
+                    logger.info(f"[SQL] {row.module_name}.{row.function_name}( \"{row.parameter}\" ) load profile: {load_profile.spec}")
+                except ValueError as e:
+                    logger.warning(f"Invalid load profile '{row.load_profile}' for {row.module_name}.{row.function_name}: {str(e)}. Using interval pacing.")
             
-            logger.info(f"    [OPEN] Excel opened: {self.wb.Name}")
+            if row.phase in phases:
+                phases[row.phase].append(FunctionInfo(row.module_name, row.function_name, row.parameter,
+                                                      row.interval_seconds, row.throughput, timeout_seconds, load_profile))
+        return phases
+    
+    def set_phase_lists(self, phases: Dict[str, List[FunctionInfo]]):
+        """Replace every phase list at once"""
+        self.pso_functions = phases["PSO"]
+        self.psc_functions = phases["PSC"]
+        self.start_functions = phases["START"]
+        self.set_inner_functions(phases["INNER"])
+        self.end_functions = phases["END"]
+        self.second_end_functions = phases["SECOND_END"]
+    
+    def set_inner_functions(self, functions: List[FunctionInfo]):
+        if self.assignment:
+            functions = partition_inner_functions(functions, self.assignment.index, self.assignment.count)
+        self.inner_functions = functions
+        self.inner_by_key = {(f.module_name, f.function_name, f.parameter): f for f in functions}
+    
+    def start_testcase_watcher(self):
+        """Poll the TestCase source for a new version while the test runs"""
+        seconds = self.config.execution.testcase_reload_seconds
+        if seconds <= 0:
+            return
+        self.testcase_watcher = TestCaseWatcher(self.testcase_source, seconds, self.queue_testcase_reload)
+        self.testcase_watcher.start(self.testcase_version)
+        logger.info(f"[RELOAD] Watching {self.testcase_source.describe()} for TestCase changes every {seconds} seconds")
+    
+    def queue_testcase_reload(self, version: str, rows: List[TestCaseRow]):
+        """Watcher callback: parse the new definition here, swap it in on the main thread"""
+        phases = self.build_phase_lists(rows)
+        with self.reload_lock:
+            self.pending_testcase = (version, phases)
+            scheduler = self.active_scheduler
+        if scheduler:
+            scheduler.call_soon(self.apply_testcase_reload, scheduler)
+    
+    def apply_testcase_reload(self, scheduler: Optional[DeadlineScheduler] = None):
+        """Swap in a queued TestCase definition; INNER functions keep their schedule, stats and histograms.
+        
+        A function whose pacing is unchanged keeps its running schedule and picks up
+        the new definition at its next call. New functions, and functions whose
+        interval or pacing mode changed, start a fresh schedule now; removed
+        functions stop after any call already in flight.
+        """
+        with self.reload_lock:
+            pending, self.pending_testcase = self.pending_testcase, None
+        if not pending:
+            return
+        version, phases = pending
+        previous = self.inner_by_key
+        self.set_phase_lists(phases)
+        logger.info(f"[RELOAD] TestCase version {version} live: START={len(self.start_functions)}, INNER={len(self.inner_functions)}, END={len(self.end_functions)}, SECOND_END={len(self.second_end_functions)}, PSO={len(self.pso_functions)}, PSC={len(self.psc_functions)}")
+        self.update_job_status("Running", f"[RELOAD] TestCase version {version}")
+        if not scheduler or not self.inner_active:
+            return
+        
+        now = scheduler.now()
+        for key in [key for key in self.inner_chains if key not in self.inner_by_key]:
+            del self.inner_chains[key]
+            logger.info(f"    [RELOAD] {key[0]}.{key[1]}( \"{key[2]}\" ) removed")
+        for key, func in self.inner_by_key.items():
+            old = previous.get(key)
+            if old is None:
+                reason = "added"
+            elif (old.load_profile is None) != (func.load_profile is None):
+                reason = "pacing changed"
+            elif func.load_profile is None and old.interval_seconds != func.interval_seconds:
+                reason = f"interval {old.interval_seconds} -> {func.interval_seconds}"
+            else:
+                continue
+            logger.info(f"    [RELOAD] {func.module_name}.{func.function_name}( \"{func.parameter}\" ) {reason}")
+            self.start_inner_chain(scheduler, func, now)
+    
+    def target_key(self) -> str:
+        """Identifies the sessions a worker pool holds; a warm pool is only reused for the same key"""
+        return pool_key(self.config.execution, self.xlsm_file)
+    
+    def initialize_target(self):
+        """Start the worker pool; every worker slot opens its own session on the configured target"""
+        target = self.config.execution.target
+        if self.executor:
+            logger.info(f"[OPEN] Reusing {self.executor.num_workers} warm worker session(s) on {describe_target(target, self.xlsm_file)}")
+            return
+        logger.info(f"[OPEN] Connecting to {describe_target(target, self.xlsm_file)} with {self.config.execution.num_workers} worker(s)...")
+        
+        try:
+            self.executor = open_worker_pool(self.config.execution, self.xlsm_file)
             
         except Exception as e:
-            logger.error(f"[FATAL] Cannot open workbook: {str(e)}")
+            logger.error(f"[FATAL] Cannot open target: {str(e)}")
+            self.executor = None
             sys.exit(1)
     
-    def run_vba_functions(self, phase: str) -> List[Tuple[datetime.datetime, float, str]]:
-        """Run VBA functions for the specified phase with timeout"""
+    def run_vba_functions(self, phase: str) -> List[CallResult]:
+        """Run VBA functions for the specified phase; each function's throughput runs concurrently"""
         results = []
         
-        if not self.wb:
-            logger.info(f"    [{phase}] [ERROR] Workbook lost! Reopening...")
-            self.initialize_excel()
+        if not self.executor:
+            logger.info(f"    [{phase}] [ERROR] Worker pool lost! Reopening...")
+            self.initialize_target()
         
         functions = {
             "PSO": self.pso_functions,
@@ -382,65 +573,57 @@ class LoadTestFramework:
         
         for func_info in functions:
             unique_key = f"{phase}.{func_info.function_name}"
-            logger.info(f"    [KEY] Executing with key: {unique_key}")
+            logger.info(f"    [KEY] Executing with key: {unique_key} x{func_info.throughput}")
             
-            for _ in range(func_info.throughput):
-                logger.info(f"    Thinking for {self.thinking_time} seconds")
-                time.sleep(self.thinking_time)
-                logger.info(f"    {self.get_log_data_dt(datetime.datetime.now())} [{phase}] {func_info.module_name}.{func_info.function_name}( \"{func_info.parameter}\" )")
-                
-                try:
-                    result = func_timeout(
-                        func_info.timeout_seconds,
-                        self.wb.Application.Run,
-                        args=(f"{func_info.module_name}.{func_info.function_name}", func_info.parameter)
-                    )
-                    results.append((datetime.datetime.now(), float(result), func_info.parameter))
-                    logger.info(f"    [SUCCESS] {int(result)}")
-                except FunctionTimedOut:
-                    logger.error(f"    [TIMEOUT] {func_info.module_name}.{func_info.function_name} timed out after {func_info.timeout_seconds} seconds")
-                except Exception as e:
-                    logger.error(f"    [ERROR] {func_info.module_name}.{func_info.function_name}: {str(e)}")
-                    continue
+            results.extend(self.executor.run_all(phase, [func_info] * func_info.throughput, self.thinking_time))
         
         return results
     
-    def log_results(self, results: List[Tuple[datetime.datetime, float, str]], phase: str):
-        """Log results to file, excluding errors"""
-        log_entries = []
+    def log_results(self, results: List[CallResult], phase: str, expected_interval: float = 0.0):
+        """Record every result's latency and queue it for the result log, errors and timeouts included.
+
+        expected_interval is the pacing interval of a fixed-interval caller; its
+        corrected latency is backfilled for the calls a slow call held back.
+        """
+        if not results:
+            return
         
-        for timestamp, value, parameter in results:
-            if value >= 0:
-                log_line = f"{self.get_log_data_dt(timestamp)},{int(value)},{parameter}"
-                log_entries.append(log_line)
+        for result in results:
+            self.latency.record(result.phase, result.module_name, result.function_name, result.status,
+                                result.elapsed_seconds, result.start_lag, expected_interval)
         
-        if log_entries:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                for entry in log_entries:
-                    f.write(entry + "\n")
+        if self.result_writer:
+            self.result_writer.write(results)
+    
+    @property
+    def should_stop(self) -> bool:
+        """Cached stop signal, refreshed by the control-plane thread"""
+        return self.control.stop_signaled
     
     def update_job_status(self, job_status: str, job_details: str):
-        """Update job status in database"""
-        try:
-            with self.db_engine.connect() as conn:
-                cursor = conn.execute(
-                    "SELECT TOP 1 TestId FROM Testcontrol WHERE testid = ? AND (GETDATE() > EndTime OR Status IN ('Aborted', 'Completed'))",
-                    (self.test_id,)
-                )
-                
-                if cursor.fetchone():
-                    self.should_stop = True
-                    logger.info("[CONTROL] Test End Signaled.")
-                
-                cursor.execute("{CALL UpdateJobStatusWithHistory (?, ?, ?)}", 
-                             (self.ip_address, job_status, job_details))
-                
-                logger.info(f"[SQL] Stored proc called: IP={self.ip_address}, Status={job_status}")
-                
-        except Exception as e:
-            logger.error(f"[SQL ERROR] Stored proc failed: {str(e)}")
-            error_results = [(datetime.datetime.now(), -1.0, f"SQL ERROR: {str(e)}")]
-            self.log_results(error_results, "SQL")
+        """Queue a job status update; the control-plane thread sends it to the database"""
+        self.control.post_status(job_status, job_details)
+    
+    def log_control_error(self, error: Exception):
+        """Record a failed status update in the result log"""
+        self.log_sql_error("UpdateJobStatusWithHistory", f"SQL ERROR: {str(error)}", error)
+
+    def log_stop_check_error(self, error: Exception):
+        """Record a failed TestControl stop-signal read in the result log"""
+        self.log_sql_error("TestControl", f"STOP CHECK ERROR: {str(error)}", error)
+
+    def log_sql_error(self, function_name: str, parameter: str, error: Exception):
+        error_results = [CallResult(
+            phase="SQL",
+            module_name="SQL",
+            function_name=function_name,
+            parameter=parameter,
+            timestamp=datetime.datetime.now(),
+            value=None,
+            status="error",
+            error=str(error)
+        )]
+        self.log_results(error_results, "SQL")
 
     def get_log_data_dt(self, timestamp: datetime.datetime) -> str:
         """Get formatted timestamp for log data in 'yyyy/mm/dd hh:mi:ss' format"""
@@ -450,19 +633,19 @@ class LoadTestFramework:
     
     def execute_main_loop(self):
         """Execute the main testing loop"""
-        last_sql_update = datetime.datetime.now()
-        
         self.update_job_status("Running", "Test START")
+        self.control.heartbeats_enabled = True
         
         while self.iteration_count < self.num_iterations:
             self.iteration_count += 1
+            self.apply_testcase_reload()
             logger.info(f"{self.get_log_data_dt(datetime.datetime.now())} [VT PERIOD] {self.iteration_count} START")
             self.update_job_status("Running", f"[VT PERIOD] {self.iteration_count} START")
             
             start_results = self.run_vba_functions("START")
             self.log_results(start_results, "START")
             
-            self.execute_inner_loop(last_sql_update)
+            self.execute_inner_loop()
             
             end_results = self.run_vba_functions("END")
             self.log_results(end_results, "END")
@@ -473,85 +656,244 @@ class LoadTestFramework:
                 logger.info(f"{self.get_log_data_dt(datetime.datetime.now())} [DONE] Total main end time reached!")
                 break
     
-    def execute_inner_loop(self, last_sql_update: datetime.datetime):
-        """Execute the inner testing loop with function-specific intervals"""
-        iteration_end_time = datetime.datetime.now() + datetime.timedelta(minutes=self.duration_min)
+    def execute_inner_loop(self):
+        """Execute the inner testing loop; every inner function, cut-off and heartbeat is a scheduler event"""
+        scheduler = DeadlineScheduler()
+        self.last_scheduler = scheduler
+        now = scheduler.now()
+        iteration_deadline = now + self.duration_min * 60
+        main_deadline = now + (self.end_time - datetime.datetime.now()).total_seconds()
         
+        self.apply_testcase_reload()
+        self.inner_active = True
+        self.inner_chains = {}
         for func in self.inner_functions:
             key = (func.module_name, func.function_name, func.parameter)
             self.inner_function_last_run[key] = datetime.datetime.min
+            self.start_inner_chain(scheduler, func, now)
         
-        while datetime.datetime.now() < iteration_end_time:
-            if datetime.datetime.now() >= self.end_time or self.should_stop:
-                logger.info(f"{self.get_log_data_dt(datetime.datetime.now())} [DONE] Main end time reached or stop signaled!")
-                break
-            
-            inner_results = []
-            current_time = datetime.datetime.now()
-            for func in self.inner_functions:
-                unique_key = f"INNER.{func.function_name}"
-                logger.info(f"    [KEY] Checking with key: {unique_key}")
-                
-                key = (func.module_name, func.function_name, func.parameter)
-                last_run = self.inner_function_last_run.get(key, datetime.datetime.min)
-                time_since_last_run = (current_time - last_run).total_seconds()
-                
-                if time_since_last_run >= func.interval_seconds:
-                    logger.info(f"    Thinking for {self.thinking_time} seconds before {func.module_name}.{func.function_name}")
-                    time.sleep(self.thinking_time)
-                    logger.info(f"    {self.get_log_data_dt(current_time)} [INNER] {func.module_name}.{func.function_name}( \"{func.parameter}\" )")
-                    
-                    try:
-                        result = func_timeout(
-                            func.timeout_seconds,
-                            self.wb.Application.Run,
-                            args=(f"{func.module_name}.{func.function_name}", func.parameter)
-                        )
-                        inner_results.append((current_time, float(result), func.parameter))
-                        logger.info(f"    [SUCCESS] {int(result)}")
-                        self.inner_function_last_run[key] = current_time
-                    except FunctionTimedOut:
-                        logger.error(f"    [TIMEOUT] {func.module_name}.{func.function_name} timed out after {func.timeout_seconds} seconds")
-                    except Exception as e:
-                        logger.error(f"    [ERROR] {func.module_name}.{func.function_name}: {str(e)}")
-            
-            self.log_results(inner_results, "INNER")
-            
-            if self.second_iteration_count < self.second_num_iterations and datetime.datetime.now() >= self.second_next_run:
-                self.second_iteration_count += 1
-                logger.info(f"{self.get_log_data_dt(datetime.datetime.now())} [CS PERIOD] {self.second_iteration_count} CUT-OFF")
-                
-                second_end_results = self.run_vba_functions("SECOND_END")
-                self.log_results(second_end_results, "SECOND_END")
-                
-                logger.info(f"{self.get_log_data_dt(datetime.datetime.now())} [CS PERIOD] {self.second_iteration_count} END")
-                self.second_next_run = self.second_next_run + datetime.timedelta(minutes=self.second_duration_min)
-            
-            if (datetime.datetime.now() - last_sql_update).total_seconds() >= 60:
-                self.update_job_status("Running", "Heart beat")
-                last_sql_update = datetime.datetime.now()
-            
-            time.sleep(0.1)
+        if self.second_iteration_count < self.second_num_iterations:
+            scheduler.call_at(self.to_monotonic(scheduler, self.second_next_run), self.run_second_end, scheduler)
+        
+        # A stop signal seen by the control-plane thread wakes the scheduler immediately
+        self.control.on_stop = scheduler.stop
+        with self.reload_lock:
+            self.active_scheduler = scheduler
+            if self.pending_testcase:
+                scheduler.call_soon(self.apply_testcase_reload, scheduler)
+        scheduler.run_until(min(iteration_deadline, main_deadline), stop_when=lambda: self.should_stop)
+        with self.reload_lock:
+            self.active_scheduler = None
+        self.control.on_stop = None
+        if scheduler.now() >= main_deadline or self.should_stop:
+            logger.info(f"{self.get_log_data_dt(datetime.datetime.now())} [DONE] Main end time reached or stop signaled!")
+        
+        # Drop calls still queued for a worker, and let running ones finish and log before END runs
+        self.inner_active = False
+        for future in list(self.inner_in_flight):
+            if future.cancel():
+                self.inner_in_flight.discard(future)
+        while self.inner_in_flight:
+            scheduler.run_until(scheduler.now() + 1.0, stop_when=lambda: not self.inner_in_flight)
+        
+        for key, stats in self.arrival_stats.items():
+            logger.info(f"    [ARRIVALS] {key[0]}.{key[1]}( \"{key[2]}\" ): {stats.arrivals} arrivals, "
+                        f"{stats.behind} behind schedule, max lag {stats.max_lag_seconds:.3f}s")
+        logger.info(f"    [SCHED] Scheduler max lag {scheduler.max_lag:.3f}s this iteration")
+    
+    def to_monotonic(self, scheduler: DeadlineScheduler, when: datetime.datetime) -> float:
+        """Convert a wall-clock time to the scheduler's monotonic clock"""
+        return scheduler.now() + max(0.0, (when - datetime.datetime.now()).total_seconds())
+    
+    def start_inner_chain(self, scheduler: DeadlineScheduler, func: FunctionInfo, at: float):
+        """Start scheduling func at monotonic time at; any older chain for the same function stops"""
+        key = (func.module_name, func.function_name, func.parameter)
+        token = self.inner_chains[key] = object()
+        if func.load_profile:
+            self.schedule_next_arrival(scheduler, key, token, at)
+        else:
+            scheduler.call_at(at, self.dispatch_inner_function, scheduler, key, token, at)
+    
+    def current_inner_function(self, key: Tuple[str, str, str], token: object) -> Optional[FunctionInfo]:
+        """Latest definition of key, or None if the chain holding token was replaced or removed"""
+        if not self.inner_active or self.inner_chains.get(key) is not token:
+            return None
+        return self.inner_by_key.get(key)
+    
+    def dispatch_inner_function(self, scheduler: DeadlineScheduler, key: Tuple[str, str, str], token: object, due: float):
+        """Submit one inner function call; its completion reschedules the next one"""
+        func = self.current_inner_function(key, token)
+        if not func:
+            return
+        logger.info(f"    [KEY] Dispatching with key: INNER.{func.function_name}")
+        future = self.executor.submit("INNER", func, self.thinking_time, intended_start=due)
+        self.inner_in_flight.add(future)
+        interval = func.interval_seconds
+        future.add_done_callback(
+            lambda f: scheduler.call_soon(self.complete_inner_function, scheduler, key, token, due, interval, f)
+        )
+    
+    def complete_inner_function(self, scheduler: DeadlineScheduler, key: Tuple[str, str, str], token: object,
+                                due: float, interval: float, future: Future):
+        """Log an inner call's result and schedule the function's next due time"""
+        self.inner_in_flight.discard(future)
+        if future.cancelled():
+            return
+        call_result = future.result()
+        self.log_results([call_result], "INNER", interval)
+        if call_result.status == "ok":
+            self.inner_function_last_run[key] = call_result.timestamp
+        
+        func = self.current_inner_function(key, token)
+        if not func:
+            return
+        # Next run keeps to the interval grid; a call slower than its interval runs again immediately
+        next_due = max(due + func.interval_seconds, scheduler.now())
+        scheduler.call_at(next_due, self.dispatch_inner_function, scheduler, key, token, next_due)
+    
+    def schedule_next_arrival(self, scheduler: DeadlineScheduler, key: Tuple[str, str, str], token: object, after: float):
+        """Schedule the next open-model arrival of func; arrivals follow the profile, not call completions"""
+        func = self.current_inner_function(key, token)
+        if not func or not func.load_profile:
+            return
+        next_elapsed = func.load_profile.next_arrival(after - self.profile_origin, self.arrival_rng)
+        if next_elapsed is not None:
+            intended = self.profile_origin + next_elapsed
+            scheduler.call_at(intended, self.dispatch_arrival, scheduler, key, token, intended)
+    
+    def dispatch_arrival(self, scheduler: DeadlineScheduler, key: Tuple[str, str, str], token: object, intended: float):
+        """Fire one arrival without waiting for earlier calls of the same function to finish"""
+        func = self.current_inner_function(key, token)
+        if not func:
+            return
+        self.arrival_stats.setdefault(key, ArrivalStats()).arrivals += 1
+        future = self.executor.submit("INNER", func, 0.0, intended_start=intended)
+        self.inner_in_flight.add(future)
+        future.add_done_callback(
+            lambda f: scheduler.call_soon(self.complete_arrival, func, f)
+        )
+        # Chain from the intended time so a late scheduler catches up instead of drifting
+        self.schedule_next_arrival(scheduler, key, token, intended)
+    
+    def complete_arrival(self, func: FunctionInfo, future: Future):
+        """Log an arrival's result and record whether it started behind schedule"""
+        key = (func.module_name, func.function_name, func.parameter)
+        self.inner_in_flight.discard(future)
+        if future.cancelled():
+            return
+        call_result = future.result()
+        self.log_results([call_result], "INNER")
+        if call_result.status == "ok":
+            self.inner_function_last_run[key] = call_result.timestamp
+        
+        stats = self.arrival_stats.setdefault(key, ArrivalStats())
+        lag = call_result.start_lag
+        stats.max_lag_seconds = max(stats.max_lag_seconds, lag)
+        if lag > self.config.execution.arrival_lag_threshold_seconds:
+            stats.behind += 1
+            if stats.behind == 1 or stats.behind % 100 == 0:
+                logger.warning(f"    [ARRIVALS] {func.module_name}.{func.function_name} behind schedule by {lag:.3f}s "
+                               f"({stats.behind} late of {stats.arrivals})")
+    
+    def run_second_end(self, scheduler: DeadlineScheduler):
+        """SECOND_END cut-off; reschedules itself for the next CS period"""
+        self.second_iteration_count += 1
+        logger.info(f"{self.get_log_data_dt(datetime.datetime.now())} [CS PERIOD] {self.second_iteration_count} CUT-OFF")
+        
+        second_end_results = self.run_vba_functions("SECOND_END")
+        self.log_results(second_end_results, "SECOND_END")
+        
+        logger.info(f"{self.get_log_data_dt(datetime.datetime.now())} [CS PERIOD] {self.second_iteration_count} END")
+        self.second_next_run = self.second_next_run + datetime.timedelta(minutes=self.second_duration_min)
+        
+        if self.second_iteration_count < self.second_num_iterations:
+            scheduler.call_at(self.to_monotonic(scheduler, self.second_next_run), self.run_second_end, scheduler)
+    
+    def report_latency(self):
+        """Log the cumulative per-phase, per-function latency report"""
+        rows = self.latency.report()
+        if not rows:
+            return
+        percentile_columns = [f"p{p:g}_ms" for p in REPORT_PERCENTILES]
+        logger.info("[REPORT] Latency (ms) by phase|function:")
+        logger.info("    " + "  ".join(["key", "calls", "ok", "error", "timeout", "tps"] + percentile_columns + ["max_ms"]))
+        for key, row in rows:
+            values = [key, row["calls"], row["ok"], row["error"], row["timeout"], row["throughput_per_sec"]]
+            values += [row[column] for column in percentile_columns] + [row["max_ms"]]
+            logger.info("    " + "  ".join(str(v) for v in values))
+        
+        # Same calls measured from their intended start: queueing and schedule delay count as latency
+        corrected_columns = [f"corrected_p{p:g}_ms" for p in REPORT_PERCENTILES] + ["corrected_max_ms", "lag_p50_ms", "lag_p99_ms", "lag_max_ms"]
+        logger.info("[REPORT] Corrected latency and start lag (ms) by phase|function:")
+        logger.info("    " + "  ".join(["key"] + corrected_columns))
+        for key, row in rows:
+            logger.info("    " + "  ".join(str(v) for v in [key] + [row[column] for column in corrected_columns]))
+    
+    def join_coordinator(self):
+        """Register with the coordinator, take this agent's share of INNER and wait for the shared start"""
+        address = self.config.execution.coordinator_address
+        logger.info(f"[AGENT] Joining coordinator at {address}...")
+        self.agent_link = AgentLink(
+            parse_address(address),
+            self.config.execution.coordinator_authkey,
+            f"{self.ip_address}:{os.getpid()}"
+        )
+        assignment = self.agent_link.wait_for_assignment()
+        # Kept so reloaded TestCase definitions are split the same way
+        self.assignment = assignment
+        self.set_inner_functions(self.inner_functions)
+        logger.info(f"[AGENT] Agent {assignment.index + 1}/{assignment.count}: {len(self.inner_functions)} INNER function(s)")
+        self.agent_link.wait_for_start(assignment)
+        self.agent_link.start_streaming(self.latency.cumulative, self.config.execution.stats_stream_seconds)
     
     def cleanup_script(self):
         """Clean up resources"""
         logger.info("[CLEANUP] Cleaning up resources...")
         
-        if self.wb:
+        if self.testcase_watcher:
+            self.testcase_watcher.close()
+            if self.testcase_watcher.reloads:
+                logger.info(f"[RELOAD] {self.testcase_watcher.reloads} TestCase reload(s) during the run")
+        
+        if self.metrics:
+            try:
+                self.metrics.close()
+            except Exception as e:
+                logger.warning(f"Error closing metrics exporter: {str(e)}")
+        
+        self.control.heartbeats_enabled = False
+        try:
+            self.control.close()
+        except Exception as e:
+            logger.warning(f"Error flushing status updates: {str(e)}")
+        
+        self.report_latency()
+        if self.agent_link:
             try:
-                self.wb.Close(SaveChanges=False)
-                self.wb = None
-            except:
-                logger.warning("Error closing workbook")
+                self.agent_link.close()
+                self.agent_link = None
+            except Exception as e:
+                logger.warning(f"Error closing coordinator link: {str(e)}")
+        self.latency.close()
         
-        if self.xl_app:
+        if self.result_writer:
             try:
-                self.xl_app.Quit()
-                self.xl_app = None
-            except:
-                logger.warning("Error quitting Excel")
+                self.result_writer.close()
+            except Exception as e:
+                logger.warning(f"Error flushing result log: {str(e)}")
+        
+        if self.executor:
+            if self.executor.recycled:
+                logger.info(f"[EXEC] {self.executor.recycled} worker session(s) recycled after hung or lost calls")
+            if self.keep_executor:
+                logger.info(f"[CLEANUP] Keeping {self.executor.num_workers} warm worker session(s) open for the next test")
+            else:
+                try:
+                    self.executor.shutdown()
+                    self.executor = None
+                except Exception as e:
+                    logger.warning(f"Error shutting down worker pool: {str(e)}")
         
-        pythoncom.CoUninitialize()
         if self.db_engine:
             self.db_engine.dispose()  # Dispose of SQLAlchemy engine
         logger.info("[CLEANUP] Script completed successfully")
@@ -559,15 +901,28 @@ class LoadTestFramework:
     def run(self):
         """Main execution method"""
         try:
-            self.initialize_script()
-            self.load_configuration_from_database()
-            self.load_vba_functions()
-            self.initialize_excel()
+            self.startup.timed("init", self.initialize_script)
+            self.control.start()
+            # Sessions open while the database is queried; the two queries also run side by side
+            with ThreadPoolExecutor(max_workers=3, thread_name_prefix="ltf-startup") as startup:
+                stages = [
+                    startup.submit(self.startup.timed, "sessions", self.initialize_target),
+                    startup.submit(self.startup.timed, "db_config", self.load_configuration_from_database),
+                    startup.submit(self.startup.timed, "functions", self.load_vba_functions),
+                ]
+            for stage in stages:
+                stage.result()
+            self.startup.report()
             
-            logger.info(f"[WAIT] Waiting for {self.wait_time} seconds before starting test...")
-            time.sleep(self.wait_time)
+            if self.config.execution.coordinator_address:
+                self.join_coordinator()
+            else:
+                logger.info(f"[WAIT] Waiting for {self.wait_time} seconds before starting test...")
+                time.sleep(self.wait_time)
             
+            self.start_testcase_watcher()
             self.start_time = datetime.datetime.now()
+            self.profile_origin = time.monotonic()
             self.end_time = self.start_time + datetime.timedelta(minutes=self.duration_min * self.num_iterations)
             
             logger.info(f"[START TEST] {self.start_time.strftime('%c')}")
@@ -601,8 +956,92 @@ class LoadTestFramework:
         finally:
             self.cleanup_script()
 
+def pool_key(execution: ExecutionConfig, xlsm_file: str) -> str:
+    return f"{describe_target(execution.target, xlsm_file)} x{execution.num_workers} {execution.executor_mode}"
+
+def open_worker_pool(execution: ExecutionConfig, xlsm_file: str) -> WorkerPool:
+    """Start a worker pool; every worker slot opens its own session on the configured target"""
+    pool = WorkerPool(
+        create_session_factory(execution.target, xlsm_file),
+        num_workers=execution.num_workers,
+        mode=execution.executor_mode
+    )
+    pool.start()
+    return pool
+
+def parse_warm_job(line: str) -> Dict[str, str]:
+    """Warm-mode job line: 'TestId [UserRole [Program]]' or a JSON object with those keys"""
+    if line.startswith("{"):
+        job = json.loads(line)
+        return {key: str(job[key]) for key in ("test_id", "user_role", "program") if job.get(key) is not None}
+    fields = line.split(None, 2)
+    return dict(zip(("test_id", "user_role", "program"), fields))
+
+def run_warm_agent(jobs):
+    """Warm-start agent: run one test per job line, keeping the worker sessions open between tests.
+
+    The sessions are opened at agent start from the configured target and
+    eVTCS_Program, so the first test already finds them warm.
+    """
+    env_names = {"test_id": "eVTCS_TestId", "user_role": "eVTCS_UserRole", "program": "eVTCS_Program"}
+    execution = LoadTestFramework.load_configuration().execution
+    xlsm_file = os.environ.get('eVTCS_Program', '').strip('"')
+    print(f"[WARM] Opening {execution.num_workers} session(s) on {describe_target(execution.target, xlsm_file)}...", flush=True)
+    try:
+        pool: Optional[WorkerPool] = open_worker_pool(execution, xlsm_file)
+        warm_key = pool_key(execution, xlsm_file)
+    except Exception as e:
+        # The first test opens the sessions itself and reports the failure with its results
+        print(f"[WARM] Cannot open sessions yet: {str(e)}", flush=True)
+        pool, warm_key = None, ""
+    print("[WARM] Ready; one test per line: TestId [UserRole [Program]]", flush=True)
+    for line in jobs:
+        line = line.strip()
+        if not line:
+            continue
+        if line.lower() in ("quit", "exit"):
+            break
+        try:
+            job = parse_warm_job(line)
+        except ValueError as e:
+            print(f"[WARM] Cannot parse job '{line}': {str(e)}", flush=True)
+            continue
+        for key, value in job.items():
+            os.environ[env_names[key]] = value
+        
+        
+        test_id = job.get("test_id", "")
+        try:
+            framework = LoadTestFramework(keep_executor=True)
+        except SystemExit:
+            print(f"[WARM] Test {test_id} failed: cannot set up the test; {pool.num_workers if pool else 0} session(s) kept warm", flush=True)
+            continue
+        framework.xlsm_file = os.environ.get('eVTCS_Program', '').strip('"')
+        if pool and framework.target_key() == warm_key:
+            framework.executor = pool
+        elif pool:
+            logger.info(f"[WARM] Target changed from {warm_key}; reopening sessions")
+            pool.shutdown()
+        outcome = "finished"
+        try:
+            framework.run()
+        except SystemExit:
+            logger.error(f"[WARM] Test {framework.test_id} aborted during startup")
+            outcome = "failed"
+        pool, warm_key = framework.executor, framework.target_key()
+        print(f"[WARM] Test {framework.test_id} {outcome}; {pool.num_workers if pool else 0} session(s) kept warm", flush=True)
+    if pool:
+        pool.shutdown()
+
 def main():
     """Main function to run the load test framework"""
+    parser = argparse.ArgumentParser(description="Excel VBA load test agent")
+    parser.add_argument("--warm", action="store_true",
+                        help="Keep worker sessions open and run one test per line read from stdin")
+    args, _ = parser.parse_known_args()
+    if args.warm:
+        run_warm_agent(sys.stdin)
+        return
     framework = LoadTestFramework()
     framework.run()
 
@@ -0,0 +1,552 @@
+"""Offline analysis of result logs written by LoadTestFramework.
+
+Streams CSV (with or without the LatencyMs/Status/Phase/StartLagMs columns) and binary
+result logs in fixed-size chunks, merges the agents' files by timestamp, and
+writes per-window throughput and latency percentiles for every
+(phase, parameter) pair plus an overall summary:
+
+    python analyze_results.py C:\\Test\\log\\T123-*-jmeter_logfile_*.log --window 60 --output-dir report
+
+Output: summary.json, series.csv and report.html in the output directory.
+Where the logs carry StartLagMs, corrected percentiles charge each call's
+start lag to its latency (coordinated-omission corrected).
+Memory stays flat however long the test ran: a window is finalised and
+written out once every agent's stream has moved late_seconds past its end,
+and the report's sparklines keep at most SPARKLINE_POINTS points per key.
+A last line or record cut off by a crashed agent is skipped and counted.
+"""
+import io
+import os
+import re
+import csv
+import glob
+import json
+import heapq
+import time
+import math
+import html
+import logging
+import argparse
+import datetime
+import functools
+import itertools
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from latency_histogram import FunctionStats, LatencyHistogram, REPORT_PERCENTILES
+from result_writer import BINARY_MAGIC, CSV_HEADER, read_binary_results
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # pure-Python chunks; same results, just slower
+    np = None
+    pd = None
+
+logger = logging.getLogger(__name__)
+
+ALL_KEY = ("*", "*")
+TIMESTAMP_FORMAT = "%Y/%m/%d %H:%M:%S.%f"
+_HOUR_SUFFIX = re.compile(r"_\d{8}-\d{2}(?=\.\w+$)")
+_EPOCH = datetime.datetime(1970, 1, 1)
+SPARKLINE_POINTS = 360  # one per pixel of the report's sparklines
+
+# A chunk is a tuple of parallel columns:
+#   seconds (local wall clock as naive epoch seconds), latency ms (NaN/None when not logged),
+#   start lag ms (NaN/None when not logged), status, phase, parameter
+Chunk = Tuple[Any, Any, Any, Any, Any, Any]
+
+
+@functools.lru_cache(maxsize=4096)
+def _minute_seconds(prefix: str) -> float:
+    return (datetime.datetime.strptime(prefix, "%Y/%m/%d %H:%M") - _EPOCH).total_seconds()
+
+
+def parse_timestamp(text: str) -> float:
+    """'yyyy/mm/dd hh:mi:ss.mmm' as naive epoch seconds (the minute prefix is cached, so this stays cheap)"""
+    return _minute_seconds(text[:16]) + float(text[17:])
+
+
+def format_seconds(seconds: float) -> str:
+    return (_EPOCH + datetime.timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def stream_name(path: str) -> str:
+    """Files of one agent differ only in their hour suffix; they form one time-ordered stream"""
+    return _HOUR_SUFFIX.sub("", os.path.basename(path))
+
+
+def expand_paths(patterns: Iterable[str]) -> List[str]:
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(
+                os.path.join(pattern, name) for name in os.listdir(pattern)
+                if "jmeter_logfile_" in name and name.endswith((".log", ".bin"))
+            )
+        else:
+            paths.extend(glob.glob(pattern) or [pattern])
+    return sorted(set(paths))
+
+
+def _columns(rows: List[Tuple[float, Optional[float], Optional[float], str, str, str]]) -> Chunk:
+    seconds, latency, lag, status, phase, parameter = zip(*rows)
+    if np is not None:
+        return (np.asarray(seconds, dtype=np.float64),
+                np.asarray([math.nan if v is None else v for v in latency], dtype=np.float64),
+                np.asarray([math.nan if v is None else v for v in lag], dtype=np.float64),
+                np.asarray(status, dtype=object), np.asarray(phase, dtype=object), np.asarray(parameter, dtype=object))
+    return seconds, latency, lag, status, phase, parameter
+
+
+class _CompleteLines(io.RawIOBase):
+    """A log file up to its last newline; a line cut off by a crash (truncated=True) is left out"""
+
+    def __init__(self, path: str, block_size: int = 65536):
+        self._file = open(path, 'rb')
+        end = self._file.seek(0, os.SEEK_END)
+        self._remaining = 0
+        while end > 0:
+            start = max(0, end - block_size)
+            self._file.seek(start)
+            newline = self._file.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                self._remaining = start + newline + 1
+                break
+            end = start
+        self.truncated = self._remaining < self._file.seek(0, os.SEEK_END)
+        self._file.seek(0)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._file.readinto(memoryview(buffer)[:self._remaining])
+        self._remaining -= count
+        return count
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _report_skipped(path: str, count: int, on_skipped: Optional[Callable[[int], None]]):
+    if count:
+        logger.warning(f"[ANALYZE] Skipped {count} truncated or malformed row(s) in {path}")
+        if on_skipped:
+            on_skipped(count)
+
+
+def _read_csv_pandas(path: str, chunk_rows: int, on_skipped: Optional[Callable[[int], None]] = None) -> Iterator[Chunk]:
+    source = _CompleteLines(path)
+    skipped = int(source.truncated)
+    with io.BufferedReader(source) as f:
+        reader = pd.read_csv(f, encoding="utf-8", chunksize=chunk_rows, dtype={"Parameter": str, "Status": str, "Phase": str},
+                             keep_default_na=False, na_values={"LatencyMs": [""], "StartLagMs": [""]})
+        for frame in reader:
+            stamps = pd.to_datetime(frame["Timestamp"], format=TIMESTAMP_FORMAT, errors="coerce")
+            malformed = stamps.isna().to_numpy()
+            if malformed.any():
+                skipped += int(malformed.sum())
+                frame, stamps = frame[~malformed], stamps[~malformed]
+            if frame.empty:
+                continue
+            seconds = (stamps - pd.Timestamp(_EPOCH)).dt.total_seconds().to_numpy()
+            if "StartLagMs" in frame.columns:
+                lag = pd.to_numeric(frame["StartLagMs"], errors="coerce").to_numpy(dtype=np.float64)
+            else:
+                lag = np.full(len(frame), math.nan)
+            yield (seconds, pd.to_numeric(frame["LatencyMs"], errors="coerce").to_numpy(dtype=np.float64), lag,
+                   frame["Status"].to_numpy(dtype=object), frame["Phase"].to_numpy(dtype=object),
+                   frame["Parameter"].to_numpy(dtype=object))
+    _report_skipped(path, skipped, on_skipped)
+
+
+def _parse_legacy(line: str) -> Tuple[float, Optional[float], Optional[float], str, str, str]:
+    # Pre-latency log: "timestamp,value,parameter" per successful call
+    return parse_timestamp(line[:23]), None, None, "ok", "", line.rstrip("\r\n").split(",", 2)[2]
+
+
+def _parse_row(r: List[str]) -> Tuple[float, Optional[float], Optional[float], str, str, str]:
+    return parse_timestamp(r[0]), float(r[3]) if r[3] else None, float(r[6]) if len(r) > 6 and r[6] else None, r[4], r[5], r[2]
+
+
+def _read_csv_rows(path: str, chunk_rows: int, legacy: bool, has_header: bool = True,
+                   on_skipped: Optional[Callable[[int], None]] = None) -> Iterator[Chunk]:
+    source = _CompleteLines(path)
+    skipped = int(source.truncated)
+    with io.TextIOWrapper(io.BufferedReader(source), encoding='utf-8', newline='') as f:
+        if has_header:
+            next(f, None)
+        records = (line for line in f if line.strip()) if legacy else (r for r in csv.reader(f) if r)
+        parse = _parse_legacy if legacy else _parse_row
+
+        def parsed():
+            nonlocal skipped
+            for record in records:
+                try:
+                    yield parse(record)
+                except (ValueError, IndexError):
+                    skipped += 1
+        rows = parsed()
+        while True:
+            batch = list(itertools.islice(rows, chunk_rows))
+            if not batch:
+                break
+            yield _columns(batch)
+    _report_skipped(path, skipped, on_skipped)
+
+
+def _read_binary(path: str, chunk_rows: int, on_skipped: Optional[Callable[[int], None]] = None) -> Iterator[Chunk]:
+    records = read_binary_results(path, on_truncated=(lambda: on_skipped(1)) if on_skipped else None)
+    while True:
+        batch = list(itertools.islice(records, chunk_rows))
+        if not batch:
+            return
+        # Binary logs hold real epoch seconds; shift to local wall clock like the CSV timestamps
+        offset = time.localtime(batch[0][0]).tm_gmtoff
+        yield _columns([(epoch + offset, latency, lag, status, phase, parameter)
+                        for epoch, _, parameter, latency, status, phase, lag in batch])
+
+
+def iter_chunks(path: str, chunk_rows: int = 200000, use_pandas: bool = True,
+                on_skipped: Optional[Callable[[int], None]] = None) -> Iterator[Chunk]:
+    """Columns of one result log, chunk_rows rows at a time, whatever its format.
+
+    on_skipped(count) is called with the number of truncated or malformed rows left out.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(len(BINARY_MAGIC))
+    if head == BINARY_MAGIC:
+        return _read_binary(path, chunk_rows, on_skipped)
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline()
+    has_header = first.startswith(CSV_HEADER[0] + ",")
+    # Logs from before the latency columns have either no header or "Timestamp,Result,Parameter"
+    legacy = not has_header or CSV_HEADER[3] not in next(csv.reader([first]))
+    if not legacy and use_pandas and pd is not None:
+        return _read_csv_pandas(path, chunk_rows, on_skipped)
+    return _read_csv_rows(path, chunk_rows, legacy, has_header, on_skipped)
+
+
+def _chunk_min(chunk: Chunk) -> float:
+    return float(chunk[0].min()) if np is not None else min(chunk[0])
+
+
+def _record_latencies(histogram: LatencyHistogram, latencies_ms) -> None:
+    """Record a whole array of latencies at once (vectorised bucket indexing when NumPy is available)"""
+    if np is None:
+        for value in latencies_ms:
+            if value is not None:
+                histogram.record(int(round(value * 1000)))
+        return
+    values = latencies_ms[~np.isnan(latencies_ms)]
+    if not values.size:
+        return
+    values_us = np.maximum(np.rint(values * 1000), 0).astype(np.int64)
+    _, exponents = np.frexp(values_us.astype(np.float64))  # exponent == bit_length for positive integers
+    shift = np.maximum(exponents - histogram.sub_bucket_bits, 0)
+    indexes = np.where(shift > 0, shift * histogram.half + (values_us >> shift), values_us)
+    unique, counts = np.unique(indexes, return_counts=True)
+    for index, count in zip(unique.tolist(), counts.tolist()):
+        histogram.counts[index] = histogram.counts.get(index, 0) + count
+    histogram.total += int(values_us.size)
+    histogram.sum_us += int(values_us.sum())
+    low, high = int(values_us.min()), int(values_us.max())
+    histogram.min_us = low if histogram.min_us is None else min(histogram.min_us, low)
+    histogram.max_us = high if histogram.max_us is None else max(histogram.max_us, high)
+
+
+def _record_lag(stats: FunctionStats, latencies_ms, lags_ms) -> None:
+    """Start lag and corrected latency (lag + latency) for the rows that logged both"""
+    if np is None:
+        logged = [(latency, lag) for latency, lag in zip(latencies_ms, lags_ms) if latency is not None and lag is not None]
+        _record_latencies(stats.start_lag, [lag for _, lag in logged])
+        _record_latencies(stats.corrected, [latency + lag for latency, lag in logged])
+        return
+    logged = ~np.isnan(latencies_ms) & ~np.isnan(lags_ms)
+    if logged.any():
+        _record_latencies(stats.start_lag, lags_ms[logged])
+        _record_latencies(stats.corrected, latencies_ms[logged] + lags_ms[logged])
+
+
+def _summary_row(stats: FunctionStats, duration: float) -> Dict[str, Any]:
+    return {**stats.summary(duration), **stats.corrected_summary()}
+
+
+def _count_status(stats: FunctionStats, statuses) -> None:
+    if np is not None:
+        ok, timeout = int((statuses == "ok").sum()), int((statuses == "timeout").sum())
+        stats.ok += ok
+        stats.timeout += timeout
+        stats.error += len(statuses) - ok - timeout
+        return
+    for status in statuses:
+        if status == "ok":
+            stats.ok += 1
+        elif status == "timeout":
+            stats.timeout += 1
+        else:
+            stats.error += 1
+
+
+class SparkSeries:
+    """Throughput and p99 per window of one key, for the report's sparklines.
+
+    Once max_points points are held, neighbouring points are merged pairwise
+    (mean throughput, highest p99) and each point covers twice as many windows,
+    so memory stays bounded however many windows the logs span.
+    """
+
+    def __init__(self, max_points: int = SPARKLINE_POINTS):
+        self.max_points = max_points
+        self.calls = 0
+        self.throughput: List[float] = []
+        self.p99: List[float] = []
+        self._span = 1       # windows per point
+        self._filled = 1     # windows in the last point; a full point starts a new one
+
+    def add(self, row: Dict[str, Any]):
+        self.calls += row["calls"]
+        if self._filled == self._span and len(self.throughput) >= self.max_points:
+            self._halve()
+        if self._filled < self._span:
+            weight = self._filled
+            self.throughput[-1] = (self.throughput[-1] * weight + row["throughput_per_sec"]) / (weight + 1)
+            self.p99[-1] = max(self.p99[-1], row["p99_ms"])
+            self._filled += 1
+        else:
+            self.throughput.append(row["throughput_per_sec"])
+            self.p99.append(row["p99_ms"])
+            self._filled = 1
+
+    def _halve(self):
+        pairs = range(0, len(self.throughput) - 1, 2)
+        odd = len(self.throughput) % 2
+        self.throughput = [(self.throughput[i] + self.throughput[i + 1]) / 2 for i in pairs] + self.throughput[len(self.throughput) - odd:]
+        self.p99 = [max(self.p99[i], self.p99[i + 1]) for i in pairs] + self.p99[len(self.p99) - odd:]
+        # An unpaired last point keeps its windows and fills up to the new span
+        self._filled = self._span if odd else self._span * 2
+        self._span *= 2
+
+
+class WindowAggregator:
+    """Per-window, per-(phase, parameter) stats; windows are written out and dropped once complete"""
+
+    def __init__(self, window_seconds: float, series_path: str = ""):
+        self.window_seconds = window_seconds
+        self.open: Dict[float, Dict[Tuple[str, str], FunctionStats]] = {}
+        self.totals: Dict[Tuple[str, str], FunctionStats] = {}
+        self.series: Dict[Tuple[str, str], SparkSeries] = {}
+        self.flushed_until = -math.inf
+        self.rows = 0
+        self.late_rows = 0
+        self.skipped_rows = 0
+        self.first_seconds = math.inf
+        self.last_seconds = -math.inf
+        self._series_file = open(series_path, 'w', encoding='utf-8', newline='') if series_path else None
+        if self._series_file:
+            self._series = csv.writer(self._series_file, lineterminator="\n")
+            self._series.writerow(["window_start", "phase", "parameter", "calls", "ok", "error", "timeout",
+                                   "throughput_per_sec", "mean_ms"] + [f"p{p:g}_ms" for p in REPORT_PERCENTILES] + ["max_ms"]
+                                  + list(FunctionStats().corrected_summary()))
+
+    def add_chunk(self, chunk: Chunk):
+        seconds, latency, lag, status, phase, parameter = chunk
+        if not len(seconds):
+            return
+        self.rows += len(seconds)
+        if np is not None:
+            self.first_seconds = min(self.first_seconds, float(seconds.min()))
+            self.last_seconds = max(self.last_seconds, float(seconds.max()))
+            windows = np.floor(seconds / self.window_seconds) * self.window_seconds
+            frame = pd.DataFrame({"window": windows, "phase": phase, "parameter": parameter})
+            for (window, group_phase, group_parameter), rows in frame.groupby(["window", "phase", "parameter"], sort=False).indices.items():
+                stats = FunctionStats()
+                _record_latencies(stats.histogram, latency[rows])
+                _record_lag(stats, latency[rows], lag[rows])
+                _count_status(stats, status[rows])
+                self._add(float(window), (group_phase, group_parameter), stats)
+        else:
+            self.first_seconds = min(self.first_seconds, min(seconds))
+            self.last_seconds = max(self.last_seconds, max(seconds))
+            windows = [math.floor(s / self.window_seconds) * self.window_seconds for s in seconds]
+            for (window, group_phase, group_parameter), rows in self._group_rows(windows, phase, parameter).items():
+                stats = FunctionStats()
+                _record_latencies(stats.histogram, [latency[i] for i in rows])
+                _record_lag(stats, [latency[i] for i in rows], [lag[i] for i in rows])
+                _count_status(stats, (status[i] for i in rows))
+                self._add(window, (group_phase, group_parameter), stats)
+
+    @staticmethod
+    def _group_rows(windows, phase, parameter) -> Dict[Tuple[float, str, str], List[int]]:
+        groups: Dict[Tuple[float, str, str], List[int]] = {}
+        for i, key in enumerate(zip(windows, phase, parameter)):
+            groups.setdefault(key, []).append(i)
+        return groups
+
+    def _add(self, window: float, key: Tuple[str, str], stats: FunctionStats):
+        if window < self.flushed_until:
+            # Arrived after its window was written out; still counted in the totals
+            self.late_rows += stats.calls
+            self.totals.setdefault(key, FunctionStats()).merge(stats)
+            self.totals.setdefault(ALL_KEY, FunctionStats()).merge(stats)
+            return
+        self.open.setdefault(window, {}).setdefault(key, FunctionStats()).merge(stats)
+
+    def advance(self, watermark: float):
+        """Write out every window that ends at or before watermark"""
+        for window in sorted(w for w in self.open if w + self.window_seconds <= watermark):
+            self._flush_window(window, self.open.pop(window))
+            self.flushed_until = max(self.flushed_until, window + self.window_seconds)
+
+    def _flush_window(self, window: float, keys: Dict[Tuple[str, str], FunctionStats]):
+        overall = FunctionStats()
+        for key, stats in sorted(keys.items()):
+            overall.merge(stats)
+            self._emit(window, key, stats)
+        self._emit(window, ALL_KEY, overall)
+
+    def _emit(self, window: float, key: Tuple[str, str], stats: FunctionStats):
+        self.totals.setdefault(key, FunctionStats()).merge(stats)
+        row = _summary_row(stats, self.window_seconds)
+        self.series.setdefault(key, SparkSeries()).add(row)
+        if self._series_file:
+            self._series.writerow([format_seconds(window), key[0], key[1]] + list(row.values()))
+
+    def skip(self, count: int):
+        self.skipped_rows += count
+
+    def close(self):
+        self.advance(math.inf)
+        if self._series_file:
+            self._series_file.close()
+            self._series_file = None
+
+
+def analyze(paths: List[str], window_seconds: float = 60.0, output_dir: str = "", chunk_rows: int = 200000,
+            late_seconds: float = 300.0, use_pandas: bool = True) -> Dict[str, Any]:
+    """Merge every agent's result logs by timestamp into windowed series and a summary"""
+    streams: Dict[str, List[str]] = {}
+    for path in paths:
+        streams.setdefault(stream_name(path), []).append(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    aggregator = WindowAggregator(window_seconds, os.path.join(output_dir, "series.csv") if output_dir else "")
+
+    readers = [
+        itertools.chain.from_iterable(iter_chunks(path, chunk_rows, use_pandas, aggregator.skip) for path in sorted(files))
+        for files in streams.values()
+    ]
+    # Always read next from the stream that is furthest behind; windows older than
+    # every stream's position (minus late_seconds for out-of-order completions) are final
+    heap: List[Tuple[float, int, Chunk]] = []
+    for index, reader in enumerate(readers):
+        chunk = next(reader, None)
+        if chunk is not None:
+            heapq.heappush(heap, (_chunk_min(chunk), index, chunk))
+    while heap:
+        _, index, chunk = heapq.heappop(heap)
+        aggregator.add_chunk(chunk)
+        following = next(readers[index], None)
+        if following is not None:
+            heapq.heappush(heap, (_chunk_min(following), index, following))
+        aggregator.advance(heap[0][0] - late_seconds if heap else math.inf)
+    aggregator.close()
+
+    duration = max(aggregator.last_seconds - aggregator.first_seconds, 1e-9) if aggregator.rows else 0.0
+    summary = {
+        "files": len(paths),
+        "agents": len(streams),
+        "rows": aggregator.rows,
+        "late_rows": aggregator.late_rows,
+        "skipped_rows": aggregator.skipped_rows,
+        "window_seconds": window_seconds,
+        "start": format_seconds(aggregator.first_seconds) if aggregator.rows else None,
+        "end": format_seconds(aggregator.last_seconds) if aggregator.rows else None,
+        "duration_seconds": round(duration, 3),
+        "keys": [
+            {"phase": key[0], "parameter": key[1], **_summary_row(stats, duration)}
+            for key, stats in sorted(aggregator.totals.items())
+        ],
+    }
+    if output_dir:
+        with open(os.path.join(output_dir, "summary.json"), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        write_html_report(os.path.join(output_dir, "report.html"), summary, aggregator.series)
+    return summary
+
+
+def _sparkline(points: List[float], width: int = 360, height: int = 60) -> str:
+    if len(points) < 2:
+        return ""
+    top = max(points) or 1.0
+    step = width / (len(points) - 1)
+    coords = " ".join(f"{i * step:.1f},{height - value / top * (height - 4) - 2:.1f}" for i, value in enumerate(points))
+    return (f'<svg width="{width}" height="{height}"><polyline fill="none" stroke="#3366cc" '
+            f'stroke-width="1.5" points="{coords}"/></svg><div class="max">max {top:g}</div>')
+
+
+def write_html_report(path: str, summary: Dict[str, Any], series: Dict[Tuple[str, str], SparkSeries],
+                      max_charts: int = 25):
+    """Static single-file report: summary table plus throughput and p99 sparklines per (phase, parameter)"""
+    percentile_columns = [f"p{p:g}_ms" for p in REPORT_PERCENTILES]
+    columns = ["phase", "parameter", "calls", "ok", "error", "timeout", "throughput_per_sec", "mean_ms"] + percentile_columns + ["max_ms", "corrected_p99_ms", "lag_p99_ms"]
+    rows = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(key_row[c]))}</td>" for c in columns) + "</tr>"
+        for key_row in summary["keys"]
+    )
+    busiest = sorted(series, key=lambda k: (k != ALL_KEY, -series[k].calls))[:max_charts]
+    charts = "".join(
+        f"<tr><td>{html.escape(key[0])}</td><td>{html.escape(key[1])}</td>"
+        f"<td>{_sparkline(series[key].throughput)}</td>"
+        f"<td>{_sparkline(series[key].p99)}</td></tr>"
+        for key in busiest
+    )
+    document = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Load test report</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 2em; }}
+td, th {{ border: 1px solid #ccc; padding: 3px 8px; text-align: right; font-size: 13px; }}
+.max {{ font-size: 11px; color: #666; }}
+</style></head><body>
+<h1>Load test report</h1>
+<p>{summary['start']} &ndash; {summary['end']} ({summary['duration_seconds']} s), {summary['rows']} calls from
+{summary['agents']} agent(s) in {summary['files']} file(s); {summary['window_seconds']:g} s windows, {summary['late_rows']} late row(s), {summary['skipped_rows']} truncated or malformed row(s) skipped.</p>
+<h2>Summary</h2>
+<table><tr>{"".join(f"<th>{c}</th>" for c in columns)}</tr>{rows}</table>
+<h2>Throughput and p99 per window</h2>
+<table><tr><th>phase</th><th>parameter</th><th>calls/s</th><th>p99 ms</th></tr>{charts}</table>
+</body></html>
+"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(document)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise LoadTestFramework result logs")
+    parser.add_argument("paths", nargs="+", help="Result log files, globs or log directories")
+    parser.add_argument("--window", type=float, default=60.0, help="Window length in seconds")
+    parser.add_argument("--output-dir", default="report", help="Where to write summary.json, series.csv and report.html")
+    parser.add_argument("--chunk-rows", type=int, default=200000)
+    parser.add_argument("--late-seconds", type=float, default=300.0,
+                        help="How far rows may arrive out of timestamp order before their window is final")
+    parser.add_argument("--no-pandas", action="store_true", help="Use the pure-Python reader")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    paths = expand_paths(args.paths)
+    if not paths:
+        parser.error("no result logs found")
+    started = time.monotonic()
+    summary = analyze(paths, args.window, args.output_dir, args.chunk_rows, args.late_seconds, not args.no_pandas)
+    logger.info(f"[ANALYZE] {summary['rows']} rows from {summary['files']} file(s) in {time.monotonic() - started:.1f} s")
+    for key_row in summary["keys"]:
+        logger.info(f"    {key_row['phase']}|{key_row['parameter']}: {key_row['calls']} calls, "
+                    f"{key_row['throughput_per_sec']}/s, p50 {key_row['p50_ms']} ms, p99 {key_row['p99_ms']} ms, "
+                    f"errors {key_row['error']}, timeouts {key_row['timeout']}")
+    logger.info(f"[ANALYZE] Report written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
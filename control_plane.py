@@ -0,0 +1,183 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_STATUS = ("Running", "Heart beat")
+
+
+class SqlControlStore:
+    """TestControl stop signal and UpdateJobStatusWithHistory over the SQLAlchemy engine"""
+
+    def __init__(self, engine, test_id: str):
+        self.engine = engine
+        self.test_id = test_id
+
+    def stop_signaled(self) -> bool:
+        with self.engine.connect() as conn:
+            cursor = conn.execute(
+                "SELECT TOP 1 TestId FROM Testcontrol WHERE testid = ? AND (GETDATE() > EndTime OR Status IN ('Aborted', 'Completed'))",
+                (self.test_id,)
+            )
+            return cursor.fetchone() is not None
+
+    def update_status(self, ip_address: str, job_status: str, job_details: str):
+        with self.engine.begin() as conn:
+            conn.execute("{CALL UpdateJobStatusWithHistory (?, ?, ?)}", (ip_address, job_status, job_details))
+
+
+class InMemoryControlStore:
+    """Stand-in control store for running without SQL Server; records every status update"""
+
+    def __init__(self, stop: bool = False, latency_seconds: float = 0.0):
+        self.stop = stop
+        self.latency_seconds = latency_seconds
+        self.updates: List[Tuple[str, str, str]] = []
+        self.stop_checks = 0
+
+    def stop_signaled(self) -> bool:
+        time.sleep(self.latency_seconds)
+        self.stop_checks += 1
+        return self.stop
+
+    def update_status(self, ip_address: str, job_status: str, job_details: str):
+        time.sleep(self.latency_seconds)
+        self.updates.append((ip_address, job_status, job_details))
+
+
+class ControlPlaneClient:
+    """Non-blocking client for the test control database.
+
+    post_status only queues the update; a background thread sends queued
+    updates in order (a queued heartbeat is replaced by anything newer), sends a heartbeat
+    whenever nothing was sent for heartbeat_seconds, and refreshes the cached
+    stop signal every refresh_seconds. A slow database therefore delays the
+    control thread, never the load loop.
+
+    Failed status updates are reported to on_error, failed stop-signal reads
+    to on_stop_error; the stop signal keeps its last known value meanwhile.
+    """
+
+    def __init__(self, store, ip_address: str, refresh_seconds: float = 10.0, heartbeat_seconds: float = 60.0,
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 on_stop_error: Optional[Callable[[Exception], None]] = None):
+        self.store = store
+        self.ip_address = ip_address
+        self.refresh_seconds = refresh_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.on_error = on_error
+        self.on_stop_error = on_stop_error
+        self.on_stop: Optional[Callable[[], None]] = None
+        self.heartbeats_enabled = False
+        self.sent = 0
+        self.coalesced = 0
+        self.send_errors = 0
+        self.stop_check_errors = 0
+        self._stop_signaled = False
+        self._pending: Deque[Tuple[str, str]] = deque()
+        self._cond = threading.Condition()
+        self._closing = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._last_sent = time.monotonic()
+        self._next_refresh = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def stop_signaled(self) -> bool:
+        return self._stop_signaled
+
+    def start(self):
+        if not self._thread:
+            self._thread = threading.Thread(target=self._run, name="ltf-control-plane", daemon=True)
+            self._thread.start()
+
+    def post_status(self, job_status: str, job_details: str):
+        """Queue a status update; returns immediately"""
+        with self._cond:
+            if self._pending and self._pending[-1] == HEARTBEAT_STATUS:
+                # A queued heartbeat is redundant once any newer status is queued behind it
+                self._pending.pop()
+                self.coalesced += 1
+            self._pending.append((job_status, job_details))
+            self._idle.clear()
+            self._cond.notify()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until every queued update has been sent; returns False on timeout"""
+        if not self._thread:
+            self._send_pending()
+            return True
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: float = 30.0):
+        """Send what is still queued, then stop the control thread"""
+        if not self._thread:
+            self._send_pending()
+            return
+        if not self.flush(timeout):
+            logger.warning(f"[CONTROL] {len(self._pending)} status update(s) not sent before shutdown")
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    now = time.monotonic()
+                    wake_at = self._next_refresh
+                    if self.heartbeats_enabled:
+                        wake_at = min(wake_at, self._last_sent + self.heartbeat_seconds)
+                    if now >= wake_at:
+                        break
+                    self._cond.wait(timeout=wake_at - now)
+                if self._closing and not self._pending:
+                    return
+                if self.heartbeats_enabled and not self._pending and time.monotonic() >= self._last_sent + self.heartbeat_seconds:
+                    self._pending.append(HEARTBEAT_STATUS)
+                    self._idle.clear()
+            self._send_pending()
+            if time.monotonic() >= self._next_refresh:
+                self._refresh_stop()
+
+    def _send_pending(self):
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._idle.set()
+                    return
+                job_status, job_details = self._pending.popleft()
+            # Every status call used to check the stop signal first; keep that so a stop is seen promptly
+            self._refresh_stop()
+            try:
+                self.store.update_status(self.ip_address, job_status, job_details)
+                self.sent += 1
+                logger.info(f"[SQL] Stored proc called: IP={self.ip_address}, Status={job_status}")
+            except Exception as e:
+                logger.error(f"[SQL ERROR] Stored proc failed: {str(e)}")
+                self.send_errors += 1
+                if self.on_error:
+                    self.on_error(e)
+            self._last_sent = time.monotonic()
+
+    def _refresh_stop(self):
+        self._next_refresh = time.monotonic() + self.refresh_seconds
+        try:
+            signaled = self.store.stop_signaled()
+        except Exception as e:
+            logger.error(f"[SQL ERROR] Cannot read stop signal: {str(e)}")
+            self.stop_check_errors += 1
+            if self.on_stop_error:
+                self.on_stop_error(e)
+            return
+        if signaled and not self._stop_signaled:
+            self._stop_signaled = True
+            logger.info("[CONTROL] Test End Signaled.")
+            if self.on_stop:
+                self.on_stop()
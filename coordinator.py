@@ -0,0 +1,302 @@
+"""Coordinator for multi-agent load tests.
+
+The coordinator listens for N agents, hands each one its slice of the workload
+and a shared start time, then merges the latency histograms the agents stream
+back into one cluster-wide view.
+
+Usage:
+    python coordinator.py --agents 4 --port 6150
+    python coordinator.py --agents 4 --spawn-local "python LoadTestFramework.py"
+    python coordinator.py --agents 4 --simulate
+
+Agents authenticate with a shared key (--authkey or eVTCS_CoordinatorKey); without
+one the coordinator generates a key and prints it. Messages are pickled, so only
+bind to a reachable interface (--host 0.0.0.0) on a network you trust.
+"""
+import os
+import json
+import time
+import random
+import secrets
+import socket
+import logging
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from dataclasses import dataclass, replace
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from latency_histogram import FunctionStats, LatencyRecorder, REPORT_PERCENTILES, merge_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 6150
+DEFAULT_HOST = "127.0.0.1"
+HELLO_TIMEOUT_SECONDS = 10.0
+
+
+@dataclass
+class Assignment:
+    index: int
+    count: int
+    start_at: float  # epoch seconds shared by every agent
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return (host or "localhost", int(port) if port else DEFAULT_PORT)
+
+
+def partition_inner_functions(functions: List[Any], index: int, count: int) -> List[Any]:
+    """This agent's share of the cluster-wide INNER workload.
+
+    Interval-paced functions are dealt out round-robin so each runs on exactly
+    one agent; functions with a load profile run on every agent at 1/count of
+    the profiled rate, keeping the cluster-wide arrival rate as declared.
+    """
+    if count <= 1:
+        return list(functions)
+    share = []
+    for position, func in enumerate(functions):
+        if getattr(func, "load_profile", None) is not None:
+            share.append(replace(func, load_profile=func.load_profile.scaled(1.0 / count)))
+        elif position % count == index:
+            share.append(func)
+    return share
+
+
+def format_live_view(stats: Dict[str, FunctionStats], seconds: float) -> List[str]:
+    percentile_columns = [f"p{p:g}_ms" for p in REPORT_PERCENTILES]
+    lines = ["  ".join(["key", "calls", "ok", "error", "timeout", "tps"] + percentile_columns + ["max_ms"])]
+    for key, function_stats in sorted(stats.items()):
+        row = function_stats.summary(seconds)
+        values = [key, row["calls"], row["ok"], row["error"], row["timeout"], row["throughput_per_sec"]]
+        values += [row[column] for column in percentile_columns] + [row["max_ms"]]
+        lines.append("  ".join(str(v) for v in values))
+    return lines
+
+
+class AgentLink:
+    """Agent side of the coordinator protocol"""
+
+    def __init__(self, address: Tuple[str, int], authkey: str, agent_name: str):
+        self.agent_name = agent_name
+        self._conn = Client(address, authkey=authkey.encode())
+        self._send_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._streamer: Optional[threading.Thread] = None
+        self._snapshot: Optional[Callable[[], Dict[str, FunctionStats]]] = None
+        self._send({"type": "hello", "agent": agent_name})
+
+    def _send(self, message: Dict[str, Any]):
+        with self._send_lock:
+            self._conn.send(message)
+
+    def wait_for_assignment(self) -> Assignment:
+        """Block until the coordinator has seen every agent and sends out assignments"""
+        message = self._conn.recv()
+        if message.get("type") != "start":
+            raise RuntimeError(f"Unexpected coordinator message: {message}")
+        return Assignment(message["index"], message["count"], message["start_at"])
+
+    def wait_for_start(self, assignment: Assignment):
+        delay = assignment.start_at - time.time()
+        if delay > 0:
+            logger.info(f"[AGENT] Start barrier in {delay:.1f} seconds...")
+            time.sleep(delay)
+
+    def start_streaming(self, snapshot: Callable[[], Dict[str, FunctionStats]], interval_seconds: float):
+        """Send cumulative stats to the coordinator every interval_seconds"""
+        self._snapshot = snapshot
+        self._streamer = threading.Thread(target=self._stream_loop, args=(interval_seconds,), name="ltf-agent-stream", daemon=True)
+        self._streamer.start()
+
+    def _stream_loop(self, interval_seconds: float):
+        while not self._stop.wait(interval_seconds):
+            self.send_stats()
+
+    def send_stats(self):
+        if not self._snapshot:
+            return
+        stats = {key: value.to_dict() for key, value in self._snapshot().items()}
+        try:
+            self._send({"type": "stats", "agent": self.agent_name, "stats": stats})
+        except (OSError, EOFError) as e:
+            logger.warning(f"[AGENT] Cannot stream stats to coordinator: {str(e)}")
+
+    def close(self):
+        """Send final stats and tell the coordinator this agent is done"""
+        self._stop.set()
+        if self._streamer:
+            self._streamer.join(timeout=10)
+        self.send_stats()
+        try:
+            self._send({"type": "done", "agent": self.agent_name})
+        except (OSError, EOFError):
+            pass
+        self._conn.close()
+
+
+class Coordinator:
+    """Start barrier, workload split and live cluster-wide latency view for N agents"""
+
+    def __init__(self, expected_agents: int, address: Tuple[str, int] = (DEFAULT_HOST, DEFAULT_PORT),
+                 authkey: str = "", start_delay_seconds: float = 5.0, report_seconds: float = 10.0):
+        if not authkey:
+            raise ValueError("Coordinator needs an authkey")
+        self.expected_agents = expected_agents
+        self.start_delay_seconds = start_delay_seconds
+        self.report_seconds = report_seconds
+        self.listener = Listener(address, authkey=authkey.encode())
+        self.address = self.listener.address
+        self.agent_stats: Dict[str, Dict[str, FunctionStats]] = {}
+        self._lock = threading.Lock()
+        self._started = 0.0
+
+    def live_view(self) -> Dict[str, FunctionStats]:
+        """Latest stats of every agent merged into cluster-wide histograms"""
+        with self._lock:
+            return merge_stats(list(self.agent_stats.values()))
+
+    def run(self) -> Dict[str, FunctionStats]:
+        """Accept all agents, release them together and collect stats until every agent is done"""
+        logger.info(f"[COORD] Waiting for {self.expected_agents} agent(s) on {self.address[0]}:{self.address[1]}...")
+        agents: List[Tuple[Any, str]] = []
+        while len(agents) < self.expected_agents:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, EOFError, OSError) as e:
+                # A client with the wrong key (or a port scanner) must not take the coordinator down
+                logger.warning(f"[COORD] Rejected connection: {type(e).__name__}: {str(e)}")
+                continue
+            try:
+                if not conn.poll(HELLO_TIMEOUT_SECONDS):
+                    raise TimeoutError(f"no hello within {HELLO_TIMEOUT_SECONDS:g} seconds")
+                hello = conn.recv()
+                name = hello.get("agent", "agent")
+            except Exception as e:
+                logger.warning(f"[COORD] Dropped connection before hello: {type(e).__name__}: {str(e)}")
+                conn.close()
+                continue
+            if any(name == joined for _, joined in agents):
+                name = f"{name}#{len(agents)}"
+            agents.append((conn, name))
+            logger.info(f"[COORD] Agent joined: {agents[-1][1]} ({len(agents)}/{self.expected_agents})")
+
+        start_at = time.time() + self.start_delay_seconds
+        for index, (conn, _) in enumerate(agents):
+            conn.send({"type": "start", "index": index, "count": len(agents), "start_at": start_at})
+        logger.info(f"[COORD] All agents released; start barrier at {time.strftime('%c', time.localtime(start_at))}")
+        self._started = start_at
+
+        names = {conn: name for conn, name in agents}
+        open_conns = list(names)
+        next_report = time.monotonic() + self.report_seconds
+        while open_conns:
+            for conn in wait(open_conns, timeout=max(0.0, next_report - time.monotonic())):
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    logger.warning(f"[COORD] Lost agent {names[conn]}")
+                    open_conns.remove(conn)
+                    continue
+                if message.get("type") == "stats":
+                    stats = {key: FunctionStats.from_dict(data) for key, data in message["stats"].items()}
+                    with self._lock:
+                        self.agent_stats[names[conn]] = stats
+                elif message.get("type") == "done":
+                    logger.info(f"[COORD] Agent done: {names[conn]}")
+                    open_conns.remove(conn)
+                    conn.close()
+            if time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + self.report_seconds
+
+        self.listener.close()
+        self.report()
+        return self.live_view()
+
+    def report(self):
+        view = self.live_view()
+        if not view:
+            return
+        seconds = max(time.time() - self._started, 1e-9)
+        logger.info(f"[COORD] Cluster view from {len(self.agent_stats)} agent(s):")
+        for line in format_live_view(view, seconds):
+            logger.info(f"    {line}")
+
+
+def simulated_agent(address: Tuple[str, int], authkey: str, agent_name: str, duration_seconds: float = 10.0,
+                    calls_per_second: float = 20.0, mean_latency_seconds: float = 0.02):
+    """Stand-in agent process: joins the coordinator and records fake calls, for testing on one machine"""
+    link = AgentLink(address, authkey, agent_name)
+    assignment = link.wait_for_assignment()
+    link.wait_for_start(assignment)
+    recorder = LatencyRecorder()
+    link.start_streaming(recorder.cumulative, interval_seconds=1.0)
+    rng = random.Random(agent_name)
+    deadline = time.monotonic() + duration_seconds
+    while time.monotonic() < deadline:
+        latency = rng.expovariate(1.0 / mean_latency_seconds)
+        time.sleep(min(latency, 1.0 / calls_per_second))
+        status = "ok" if rng.random() > 0.01 else "error"
+        recorder.record("INNER", "Sim", f"Func{assignment.index % 2}", status, latency)
+    link.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coordinate a multi-agent load test")
+    parser.add_argument("--agents", type=int, required=True, help="Number of agents to wait for")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to listen on; 0.0.0.0 for remote agents")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--authkey", default=os.environ.get("eVTCS_CoordinatorKey", ""),
+                        help="Shared agent key (default: eVTCS_CoordinatorKey, else a generated one)")
+    parser.add_argument("--start-delay", type=float, default=5.0, help="Seconds between the last join and the start barrier")
+    parser.add_argument("--report", type=float, default=10.0, help="Seconds between live cluster reports")
+    parser.add_argument("--spawn-local", metavar="COMMAND", help="Start the agents locally with this command")
+    parser.add_argument("--simulate", action="store_true", help="Start simulated in-process agents (no Excel/DB)")
+    parser.add_argument("--simulate-seconds", type=float, default=10.0)
+    parser.add_argument("--output", help="Write the merged cluster histograms to this JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.authkey:
+        args.authkey = secrets.token_hex(16)
+        logger.info(f"[COORD] Generated authkey; start agents with eVTCS_CoordinatorKey={args.authkey}")
+    coordinator = Coordinator(args.agents, (args.host, args.port), args.authkey, args.start_delay, args.report)
+    connect_host = socket.gethostname() if args.host == "0.0.0.0" else args.host
+    connect_address = (connect_host, coordinator.address[1])
+
+    children = []
+    if args.simulate:
+        for i in range(args.agents):
+            process = multiprocessing.Process(
+                target=simulated_agent,
+                args=(connect_address, args.authkey, f"sim-{i}", args.simulate_seconds),
+                daemon=True
+            )
+            process.start()
+            children.append(process)
+    elif args.spawn_local:
+        env = dict(os.environ, eVTCS_Coordinator=f"{connect_address[0]}:{connect_address[1]}", eVTCS_CoordinatorKey=args.authkey)
+        for _ in range(args.agents):
+            children.append(subprocess.Popen(args.spawn_local, shell=True, env=env))
+
+    merged = coordinator.run()
+    for child in children:
+        if isinstance(child, subprocess.Popen):
+            child.wait()
+        else:
+            child.join()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"stats": {key: value.to_dict() for key, value in merged.items()}}, f)
+        logger.info(f"[COORD] Merged histograms written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
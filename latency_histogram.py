@@ -0,0 +1,332 @@
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REPORT_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """HdrHistogram-style log-linear histogram of integer microsecond values.
+
+    Values below 2**sub_bucket_bits are counted exactly; above that every
+    power-of-two range is split into 2**(sub_bucket_bits - 1) linear buckets, so
+    the relative error stays under 1 / 2**(sub_bucket_bits - 1) at any magnitude.
+    Counts are kept sparsely, which keeps histograms small and trivially mergeable.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 11):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.half = 1 << (sub_bucket_bits - 1)
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us: Optional[int] = None
+
+    def bucket_index(self, value_us: int) -> int:
+        shift = value_us.bit_length() - self.sub_bucket_bits
+        if shift <= 0:
+            return value_us
+        return shift * self.half + (value_us >> shift)
+
+    def bucket_bounds(self, index: int) -> Tuple[int, int]:
+        """Lowest and highest value that land in bucket index"""
+        if index < 2 * self.half:
+            return index, index
+        shift = index // self.half - 1
+        mantissa = index - shift * self.half
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, value_us: int, count: int = 1):
+        value_us = max(0, int(value_us))
+        index = self.bucket_index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum_us += value_us * count
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if self.max_us is None or value_us > self.max_us:
+            self.max_us = value_us
+
+    def record_seconds(self, seconds: float):
+        self.record(int(round(seconds * 1_000_000)))
+
+    def record_with_expected_interval(self, value_us: int, expected_interval_us: int):
+        """Record value_us plus the samples a fixed-interval caller missed while it was blocked.
+
+        Like HdrHistogram's recordValueWithExpectedInterval: a call that took k
+        intervals hid k - 1 calls that would have waited value - interval,
+        value - 2 * interval, ... had the load kept coming.
+        """
+        self.record(value_us)
+        if expected_interval_us <= 0:
+            return
+        missing = int(value_us) - expected_interval_us
+        while missing >= expected_interval_us:
+            self.record(missing)
+            missing -= expected_interval_us
+
+    def merge(self, other: "LatencyHistogram"):
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        if other.max_us is not None and (self.max_us is None or other.max_us > self.max_us):
+            self.max_us = other.max_us
+
+    def percentile(self, percentile: float) -> int:
+        """Highest equivalent value (microseconds) at the given percentile, like HdrHistogram"""
+        if not self.total:
+            return 0
+        threshold = max(1, int(-(-self.total * percentile // 100)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= threshold:
+                return min(self.bucket_bounds(index)[1], self.max_us)
+        return self.max_us
+
+    def mean_us(self) -> float:
+        return self.sum_us / self.total if self.total else 0.0
+
+    def copy(self) -> "LatencyHistogram":
+        clone = LatencyHistogram(self.sub_bucket_bits)
+        clone.merge(self)
+        return clone
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sub_bucket_bits": self.sub_bucket_bits,
+            "total": self.total,
+            "sum_us": self.sum_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls(data.get("sub_bucket_bits", 11))
+        histogram.counts = {int(index): count for index, count in data.get("counts", {}).items()}
+        histogram.total = data.get("total", sum(histogram.counts.values()))
+        histogram.sum_us = data.get("sum_us", 0)
+        histogram.min_us = data.get("min_us")
+        histogram.max_us = data.get("max_us")
+        return histogram
+
+
+@dataclass
+class FunctionStats:
+    """Latency histograms and outcome counts for one (phase, function) pair.
+
+    histogram is service time (actual start to end). corrected is response
+    time measured from the intended start, so queueing and schedule delay count
+    against latency (coordinated-omission corrected); start_lag is the delay alone.
+    """
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    ok: int = 0
+    error: int = 0
+    timeout: int = 0
+    corrected: LatencyHistogram = field(default_factory=LatencyHistogram)
+    start_lag: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def calls(self) -> int:
+        return self.ok + self.error + self.timeout
+
+    def merge(self, other: "FunctionStats"):
+        self.histogram.merge(other.histogram)
+        self.corrected.merge(other.corrected)
+        self.start_lag.merge(other.start_lag)
+        self.ok += other.ok
+        self.error += other.error
+        self.timeout += other.timeout
+
+    def copy(self) -> "FunctionStats":
+        clone = FunctionStats()
+        clone.merge(self)
+        return clone
+
+    def summary(self, seconds: float) -> Dict[str, Any]:
+        """Counts, throughput and percentiles (milliseconds) over a window of the given length"""
+        row = {
+            "calls": self.calls,
+            "ok": self.ok,
+            "error": self.error,
+            "timeout": self.timeout,
+            "throughput_per_sec": round(self.calls / seconds, 3) if seconds > 0 else 0.0,
+            "mean_ms": round(self.histogram.mean_us() / 1000, 3),
+        }
+        for percentile in REPORT_PERCENTILES:
+            row[f"p{percentile:g}_ms"] = round(self.histogram.percentile(percentile) / 1000, 3)
+        row["max_ms"] = round((self.histogram.max_us or 0) / 1000, 3)
+        return row
+
+    def corrected_summary(self) -> Dict[str, Any]:
+        """Corrected response-time percentiles and start-lag percentiles (milliseconds)"""
+        row = {}
+        for percentile in REPORT_PERCENTILES:
+            row[f"corrected_p{percentile:g}_ms"] = round(self.corrected.percentile(percentile) / 1000, 3)
+        row["corrected_max_ms"] = round((self.corrected.max_us or 0) / 1000, 3)
+        row["lag_p50_ms"] = round(self.start_lag.percentile(50) / 1000, 3)
+        row["lag_p99_ms"] = round(self.start_lag.percentile(99) / 1000, 3)
+        row["lag_max_ms"] = round((self.start_lag.max_us or 0) / 1000, 3)
+        return row
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "error": self.error,
+            "timeout": self.timeout,
+            "histogram": self.histogram.to_dict(),
+            "corrected": self.corrected.to_dict(),
+            "start_lag": self.start_lag.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FunctionStats":
+        return cls(
+            histogram=LatencyHistogram.from_dict(data["histogram"]),
+            ok=data.get("ok", 0),
+            error=data.get("error", 0),
+            timeout=data.get("timeout", 0),
+            corrected=LatencyHistogram.from_dict(data.get("corrected", {})),
+            start_lag=LatencyHistogram.from_dict(data.get("start_lag", {}))
+        )
+
+
+def merge_stats(snapshots: Iterable[Dict[str, FunctionStats]]) -> Dict[str, FunctionStats]:
+    """Merge per-key stats from several recorders or agents into one view"""
+    merged: Dict[str, FunctionStats] = {}
+    for snapshot in snapshots:
+        for key, stats in snapshot.items():
+            merged.setdefault(key, FunctionStats()).merge(stats)
+    return merged
+
+
+class LatencyRecorder:
+    """Per-phase, per-function latency histograms with interval flushes and a final mergeable dump.
+
+    Every call is recorded into an interval histogram (reset on each flush and
+    appended to interval_path as one JSON line per key) and a cumulative one
+    (written to final_path by close()).
+    """
+
+    def __init__(self, interval_path: str = "", final_path: str = "", flush_interval_seconds: float = 60.0,
+                 labels: Optional[Dict[str, str]] = None):
+        self.interval_path = interval_path
+        self.final_path = final_path
+        self.flush_interval_seconds = flush_interval_seconds
+        self.labels = labels or {}
+        self._lock = threading.Lock()
+        self._interval: Dict[str, FunctionStats] = {}
+        self._cumulative: Dict[str, FunctionStats] = {}
+        self._started = time.time()
+        self._interval_started = self._started
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    @staticmethod
+    def key_for(phase: str, module_name: str, function_name: str) -> str:
+        return f"{phase}|{module_name}.{function_name}"
+
+    def record(self, phase: str, module_name: str, function_name: str, status: str, elapsed_seconds: float,
+               start_lag_seconds: float = 0.0, expected_interval_seconds: float = 0.0):
+        """Record one call.
+
+        start_lag_seconds is how far the call started behind its intended start;
+        expected_interval_seconds > 0 marks a fixed-interval caller, whose
+        corrected histogram is backfilled for the calls it could not make.
+        """
+        key = self.key_for(phase, module_name, function_name)
+        elapsed_us = int(round(elapsed_seconds * 1_000_000))
+        lag_us = int(round(max(0.0, start_lag_seconds) * 1_000_000))
+        interval_us = int(round(expected_interval_seconds * 1_000_000))
+        with self._lock:
+            for table in (self._interval, self._cumulative):
+                stats = table.get(key)
+                if stats is None:
+                    stats = table[key] = FunctionStats()
+                stats.histogram.record(elapsed_us)
+                stats.start_lag.record(lag_us)
+                stats.corrected.record_with_expected_interval(lag_us + elapsed_us, interval_us)
+                if status == "ok":
+                    stats.ok += 1
+                elif status == "timeout":
+                    stats.timeout += 1
+                else:
+                    stats.error += 1
+
+    def cumulative(self) -> Dict[str, FunctionStats]:
+        """Copy of the cumulative stats, safe to use without holding the recorder lock"""
+        with self._lock:
+            return {key: stats.copy() for key, stats in self._cumulative.items()}
+
+    def start(self):
+        """Start the background thread that flushes interval histograms"""
+        if self.interval_path and self.flush_interval_seconds > 0 and not self._flusher:
+            self._flusher = threading.Thread(target=self._flush_loop, name="ltf-histogram-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval_seconds):
+            self.flush_interval()
+
+    def flush_interval(self):
+        """Append the current interval's histograms and start a new interval"""
+        with self._lock:
+            interval, self._interval = self._interval, {}
+            started, self._interval_started = self._interval_started, time.time()
+        if not interval or not self.interval_path:
+            return
+        ended = time.time()
+        try:
+            with open(self.interval_path, 'a', encoding='utf-8') as f:
+                for key, stats in interval.items():
+                    line = {**self.labels, "key": key, "start": started, "end": ended, **stats.to_dict()}
+                    f.write(json.dumps(line) + "\n")
+        except OSError as e:
+            logger.error(f"[HIST] Cannot write interval histograms: {str(e)}")
+
+    def report(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Cumulative summary rows, corrected and start-lag percentiles included, sorted by key"""
+        seconds = time.time() - self._started
+        return [(key, {**stats.summary(seconds), **stats.corrected_summary()})
+                for key, stats in sorted(self.cumulative().items())]
+
+    def close(self):
+        """Stop flushing, write the last interval and the cumulative histograms"""
+        self._stop.set()
+        if self._flusher:
+            self._flusher.join(timeout=10)
+            self._flusher = None
+        self.flush_interval()
+        if not self.final_path:
+            return
+        payload = {
+            **self.labels,
+            "start": self._started,
+            "end": time.time(),
+            "stats": {key: stats.to_dict() for key, stats in self.cumulative().items()},
+        }
+        try:
+            with open(self.final_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+        except OSError as e:
+            logger.error(f"[HIST] Cannot write final histograms: {str(e)}")
+
+
+def load_stats(path: str) -> Dict[str, FunctionStats]:
+    """Read a final histogram dump written by LatencyRecorder.close"""
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    return {key: FunctionStats.from_dict(data) for key, data in payload.get("stats", {}).items()}
@@ -0,0 +1,379 @@
+import time
+import datetime
+import queue
+import logging
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+THREAD_MODE = "thread"
+PROCESS_MODE = "process"
+RECYCLE_RETRY_SECONDS = 5.0
+KILL_JOIN_SECONDS = 2.0
+# A process slot waits this long past a call's timeout for the session to end the call
+# itself (a subprocess target kills its command) before killing the worker process
+SESSION_TIMEOUT_GRACE_SECONDS = 1.0
+
+# Process slots open concurrently (and recycle from dispatch threads), so forks are
+# serialised: a child forked while a sibling's pipe and sentinel are still open in the
+# parent would inherit them, keeping EOF from reaching us and joins waiting on the sibling.
+_FORK_LOCK = threading.Lock()
+
+
+class WorkerLost(RuntimeError):
+    """The worker process died or its pipe broke during a call"""
+
+
+@dataclass
+class CallResult:
+    phase: str
+    module_name: str
+    function_name: str
+    parameter: str
+    timestamp: datetime.datetime  # wall-clock start of the call
+    value: Any  # whatever the call returned; None unless status is "ok"
+    status: str  # "ok", "error" or "timeout"
+    error: str = ""
+    worker_id: int = -1
+    intended_start: float = 0.0  # monotonic time the schedule wanted the call to start (not before its slot's think time ended)
+    actual_start: float = 0.0  # monotonic time the call was handed to its worker session
+    elapsed_seconds: float = 0.0  # monotonic duration of the call, including timeouts
+
+    @property
+    def start_lag(self) -> float:
+        """Seconds the call started behind its intended start"""
+        return max(0.0, self.actual_start - self.intended_start)
+
+
+class CallableSession:
+    """In-process stand-in backend that forwards every macro call to a Python callable"""
+
+    def __init__(self, target: Callable[[str, str], Any]):
+        self.target = target
+
+    def run(self, macro_name: str, parameter: str, timeout: Optional[float] = None) -> Any:
+        return self.target(macro_name, parameter)
+
+    def close(self):
+        pass
+
+
+class ThreadWorkerSlot:
+    """Worker slot whose session is created, used and closed on one dedicated thread.
+
+    A thread cannot be killed: after a timeout the hung call keeps its thread and
+    session until it returns, and the slot is reopened beside it (with COM, a
+    hung Excel instance stays running next to the new one). The thread is a
+    daemon, so an abandoned call never holds up interpreter exit. Use
+    executor_mode 'process' when the target can hang for good.
+    """
+
+    def __init__(self, worker_id: int, session_factory: Callable[[], Any]):
+        self.worker_id = worker_id
+        self._session = None
+        # One thread per slot keeps the session on the thread that created it, which COM apartments require
+        self._calls: "queue.Queue[Optional[Tuple[Future, Callable, tuple]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._serve, name=f"ltf-worker-{worker_id}", daemon=True)
+        self._thread.start()
+        try:
+            self._submit(self._open, session_factory).result()
+        except BaseException:
+            self._calls.put(None)
+            raise
+
+    def _serve(self):
+        while True:
+            item = self._calls.get()
+            if item is None:
+                break
+            future, function, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        if self._session is not None:
+            try:
+                self._session.close()
+            except Exception as e:
+                logger.warning(f"[EXEC] Worker {self.worker_id} failed to close session: {str(e)}")
+            self._session = None
+
+    def _submit(self, function: Callable, *args) -> Future:
+        future: Future = Future()
+        self._calls.put((future, function, args))
+        return future
+
+    def _open(self, session_factory: Callable[[], Any]):
+        self._session = session_factory()
+
+    def call(self, macro_name: str, parameter: str, timeout: float) -> Any:
+        future = self._submit(self._session.run, macro_name, parameter, timeout)
+        return future.result(timeout=timeout)
+
+    def close(self):
+        self._calls.put(None)
+        self._thread.join(timeout=30)
+        if self._thread.is_alive():
+            logger.warning(f"[EXEC] Worker {self.worker_id} session did not close within 30 seconds")
+
+    def kill(self):
+        """Abandon a thread stuck in a call; it closes its session if the call ever returns"""
+        logger.warning(f"[EXEC] Worker {self.worker_id} thread abandoned; use executor_mode 'process' to reclaim hung sessions")
+        self._calls.put(None)
+
+
+def _process_worker_main(conn, session_factory: Callable[[], Any]):
+    """Entry point of a process worker slot: open a session and serve calls until told to stop"""
+    try:
+        session = session_factory()
+    except Exception as e:
+        conn.send((None, "error", str(e)))
+        return
+    conn.send((None, "ready", None))
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            seq, macro_name, parameter, timeout = message
+            try:
+                conn.send((seq, "ok", session.run(macro_name, parameter, timeout)))
+            except TimeoutError as e:
+                conn.send((seq, "timeout", str(e)))
+            except Exception as e:
+                conn.send((seq, "error", str(e)))
+    except (EOFError, OSError):
+        pass
+    finally:
+        session.close()
+
+
+class ProcessWorkerSlot:
+    """Worker slot whose session lives in its own child process"""
+
+    def __init__(self, worker_id: int, session_factory: Callable[[], Any]):
+        self.worker_id = worker_id
+        self._seq = itertools.count(1)
+        with _FORK_LOCK:
+            self._conn, child_conn = multiprocessing.Pipe()
+            self._process = multiprocessing.Process(
+                target=_process_worker_main,
+                args=(child_conn, session_factory),
+                name=f"ltf-worker-{worker_id}",
+                daemon=True
+            )
+            self._process.start()
+            child_conn.close()
+        _, status, error = self._conn.recv()
+        if status != "ready":
+            self._process.join(timeout=5)
+            raise RuntimeError(f"Worker {worker_id} failed to open session: {error}")
+
+    def call(self, macro_name: str, parameter: str, timeout: float) -> Any:
+        seq = next(self._seq)
+        deadline = time.monotonic() + timeout + SESSION_TIMEOUT_GRACE_SECONDS
+        try:
+            self._conn.send((seq, macro_name, parameter, timeout))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._conn.poll(remaining):
+                    raise TimeoutError(f"no reply within {timeout} seconds")
+                reply_seq, status, payload = self._conn.recv()
+                if reply_seq == seq:
+                    break
+        except TimeoutError:
+            raise
+        except (EOFError, OSError) as e:
+            raise WorkerLost(f"worker process exited (exit code {self._process.exitcode}): {str(e)}")
+        if status == "timeout":
+            raise TimeoutError(payload)
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def close(self):
+        try:
+            self._conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self._process.join(timeout=30)
+        if self._process.is_alive():
+            self._process.kill()
+        self._conn.close()
+
+    def kill(self):
+        """Hard-kill the worker process, taking any hung call and its session with it"""
+        self._process.kill()
+        self._process.join(timeout=KILL_JOIN_SECONDS)
+        self._conn.close()
+
+
+class WorkerPool:
+    """Runs FunctionInfo calls concurrently across N worker slots, each with its own backend session"""
+
+    def __init__(self, session_factory: Callable[[], Any], num_workers: int = 1, mode: str = THREAD_MODE):
+        if num_workers < 1:
+            raise ValueError(f"num_workers must be at least 1, got {num_workers}")
+        if mode not in (THREAD_MODE, PROCESS_MODE):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.session_factory = session_factory
+        self.num_workers = num_workers
+        self.mode = mode
+        self._slots: List[Any] = []  # indexed by worker_id; None while a session cannot be reopened
+        self.recycled = 0
+        # Live counts for metrics; read without locking, so they are at most momentarily stale
+        self.queued = 0
+        self.in_flight = 0
+        self._count_lock = threading.Lock()
+        # Idle slots ordered by when their virtual user has finished thinking
+        self._idle: "queue.PriorityQueue[Tuple[float, int, Any]]" = queue.PriorityQueue()
+        self._dispatch: Optional[ThreadPoolExecutor] = None
+
+    def _open_slot(self, worker_id: int):
+        slot_class = ProcessWorkerSlot if self.mode == PROCESS_MODE else ThreadWorkerSlot
+        return slot_class(worker_id, self.session_factory)
+
+    def start(self):
+        """Open one backend session per worker slot"""
+        logger.info(f"[EXEC] Starting {self.num_workers} {self.mode} worker(s)...")
+        # Sessions open concurrently; with Excel each one takes seconds
+        with ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="ltf-open") as opener:
+            opening = [opener.submit(self._open_slot, worker_id) for worker_id in range(self.num_workers)]
+        failures = [future.exception() for future in opening if future.exception()]
+        self._slots = [future.result() for future in opening if not future.exception()]
+        if failures:
+            self.shutdown()
+            raise failures[0]
+        for slot in self._slots:
+            self._idle.put((0.0, slot.worker_id, slot))
+        self._dispatch = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="ltf-dispatch")
+
+    def submit(self, phase: str, func_info, think_time: float = 0.0,
+               intended_start: Optional[float] = None) -> "Future[CallResult]":
+        """Queue one call; it runs on the worker slot whose virtual user is ready first.
+
+        think_time is charged to that slot after the call, so a thinking user only
+        delays its own next call instead of stalling the whole agent.
+        intended_start (monotonic) defaults to now and is used to measure start lag.
+        """
+        if intended_start is None:
+            intended_start = time.monotonic()
+        with self._count_lock:
+            self.queued += 1
+        future = self._dispatch.submit(self._execute, phase, func_info, think_time, intended_start)
+        future.add_done_callback(self._count_cancelled)
+        return future
+
+    def _count_cancelled(self, future: Future):
+        if future.cancelled():
+            with self._count_lock:
+                self.queued -= 1
+
+    def run_all(self, phase: str, calls: List[Any], think_time: float = 0.0) -> List[CallResult]:
+        """Run all calls concurrently and return their results in submission order"""
+        futures = [self.submit(phase, func_info, think_time) for func_info in calls]
+        return [future.result() for future in futures]
+
+    def _execute(self, phase: str, func_info, think_time: float, intended_start: float) -> CallResult:
+        ready_at, worker_id, slot = self._idle.get()
+        if slot is not None:
+            # A virtual user's think time is deliberate, not lag: the call could not start
+            # before its slot was ready (a slot waiting to reopen its session still counts)
+            intended_start = max(intended_start, ready_at)
+        with self._count_lock:
+            self.queued -= 1
+            self.in_flight += 1
+        try:
+            wait = ready_at - time.monotonic()
+            if wait > 0:
+                logger.info(f"    [W{worker_id}] Thinking for {wait:.3f} seconds")
+                time.sleep(wait)
+            macro_name = f"{func_info.module_name}.{func_info.function_name}"
+            if slot is None:
+                slot = self._recycle(worker_id)
+                if slot is None:
+                    timing = (intended_start, time.monotonic(), datetime.datetime.now())
+                    return self._result(phase, func_info, worker_id, timing, None, "error", "worker session unavailable")
+            logger.info(f"    [W{worker_id}] [{phase}] {macro_name}( \"{func_info.parameter}\" )")
+            timing = (intended_start, time.monotonic(), datetime.datetime.now())
+            try:
+                value = slot.call(macro_name, func_info.parameter, func_info.timeout_seconds)
+                logger.info(f"    [W{worker_id}] [SUCCESS] {value}")
+                return self._result(phase, func_info, worker_id, timing, value, "ok")
+            except (FutureTimeoutError, TimeoutError):
+                logger.error(f"    [W{worker_id}] [TIMEOUT] {macro_name} timed out after {func_info.timeout_seconds} seconds")
+                result = self._result(phase, func_info, worker_id, timing, None, "timeout")
+                slot = self._replace(slot)
+                return result
+            except WorkerLost as e:
+                logger.error(f"    [W{worker_id}] [ERROR] {macro_name}: {str(e)}")
+                result = self._result(phase, func_info, worker_id, timing, None, "error", str(e))
+                slot = self._replace(slot)
+                return result
+            except Exception as e:
+                logger.error(f"    [W{worker_id}] [ERROR] {macro_name}: {str(e)}")
+                return self._result(phase, func_info, worker_id, timing, None, "error", str(e))
+        finally:
+            with self._count_lock:
+                self.in_flight -= 1
+            if slot is None:
+                # Session could not be reopened; try again once the retry delay has passed
+                self._idle.put((time.monotonic() + RECYCLE_RETRY_SECONDS, worker_id, None))
+            else:
+                self._idle.put((time.monotonic() + think_time, worker_id, slot))
+
+    def _replace(self, slot):
+        """Kill a slot whose call hung or whose process died, and open a fresh session in its place"""
+        try:
+            slot.kill()
+        except Exception as e:
+            logger.warning(f"[EXEC] Worker {slot.worker_id} did not shut down cleanly: {str(e)}")
+        return self._recycle(slot.worker_id)
+
+    def _recycle(self, worker_id: int):
+        """Open a new session for worker_id; None if that fails"""
+        try:
+            slot = self._open_slot(worker_id)
+        except Exception as e:
+            logger.error(f"[EXEC] Worker {worker_id} could not reopen its session: {str(e)}")
+            self._slots[worker_id] = None
+            return None
+        self._slots[worker_id] = slot
+        self.recycled += 1
+        logger.info(f"[EXEC] Worker {worker_id} recycled with a fresh session ({self.recycled} so far)")
+        return slot
+
+    def _result(self, phase: str, func_info, worker_id: int, timing: Tuple[float, float, datetime.datetime],
+                value: Any, status: str, error: str = "") -> CallResult:
+        return CallResult(
+            phase=phase,
+            module_name=func_info.module_name,
+            function_name=func_info.function_name,
+            parameter=func_info.parameter,
+            timestamp=timing[2],
+            value=value,
+            status=status,
+            error=error,
+            worker_id=worker_id,
+            intended_start=timing[0],
+            actual_start=timing[1],
+            elapsed_seconds=time.monotonic() - timing[1]
+        )
+
+    def shutdown(self):
+        """Stop dispatching and close every worker session"""
+        if self._dispatch:
+            self._dispatch.shutdown(wait=True)
+            self._dispatch = None
+        for slot in self._slots:
+            if slot is not None:
+                slot.close()
+        self._slots = []
+        self._idle = queue.PriorityQueue()
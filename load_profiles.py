@@ -0,0 +1,141 @@
+import math
+import random
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class RateSegment:
+    """Linear stretch of the target arrival rate (calls per second) between two elapsed times"""
+    start: float
+    end: float
+    rate_start: float
+    rate_end: float
+
+    @property
+    def slope(self) -> float:
+        if math.isinf(self.end) or self.end <= self.start:
+            return 0.0
+        return (self.rate_end - self.rate_start) / (self.end - self.start)
+
+    def area(self, until: float) -> float:
+        """Expected number of arrivals from the segment start up to until"""
+        x = min(until, self.end) - self.start
+        if x <= 0:
+            return 0.0
+        return self.rate_start * x + self.slope * x * x / 2
+
+    def solve(self, count: float) -> Optional[float]:
+        """Elapsed time at which the segment has produced count arrivals, or None if it never does"""
+        a, b = self.rate_start, self.slope
+        if b == 0:
+            if a <= 0:
+                return None
+            x = count / a
+        else:
+            disc = a * a + 2 * b * count
+            if disc < 0:
+                return None
+            x = (math.sqrt(disc) - a) / b
+        if x < 0:
+            return None
+        return min(self.start + x, self.end)
+
+
+class LoadProfile:
+    """Open-model arrival schedule: a piecewise-linear rate curve plus an arrival process.
+
+    Deterministic profiles place arrival n where the cumulative expected count
+    reaches n. Poisson profiles use the same curve with exponential increments
+    (time rescaling), so any rate shape can also be made Poisson.
+    """
+
+    def __init__(self, spec: str, segments: List[RateSegment], poisson: bool = False):
+        self.spec = spec
+        self.segments = segments
+        self.poisson = poisson
+
+    def __repr__(self) -> str:
+        return f"LoadProfile({self.spec!r})"
+
+    def scaled(self, factor: float) -> "LoadProfile":
+        """Same shape with every rate multiplied by factor, e.g. one agent's share of a cluster-wide rate"""
+        segments = [RateSegment(seg.start, seg.end, seg.rate_start * factor, seg.rate_end * factor) for seg in self.segments]
+        return LoadProfile(f"{self.spec} x{factor:g}", segments, self.poisson)
+
+    def rate_at(self, elapsed: float) -> float:
+        for segment in self.segments:
+            if segment.start <= elapsed < segment.end:
+                return segment.rate_start + segment.slope * (elapsed - segment.start)
+        return self.segments[-1].rate_end if self.segments else 0.0
+
+    def next_arrival(self, elapsed: float, rng: Optional[random.Random] = None) -> Optional[float]:
+        """Elapsed time of the first arrival after elapsed, or None if the rate stays at zero"""
+        remaining = (rng or random).expovariate(1.0) if self.poisson else 1.0
+        for segment in self.segments:
+            if segment.end <= elapsed:
+                continue
+            target = segment.area(max(elapsed, segment.start)) + remaining
+            total = math.inf if math.isinf(segment.end) else segment.area(segment.end)
+            if target <= total:
+                return segment.solve(target)
+            remaining = target - total
+        return None
+
+
+def _parse_rate(text: str) -> float:
+    rate = float(text)
+    if rate < 0:
+        raise ValueError(f"arrival rate cannot be negative: {text}")
+    return rate
+
+
+def parse_load_profile(spec: str) -> LoadProfile:
+    """Parse a TestCase.LoadProfile value.
+
+    constant:5              5 calls/s
+    ramp:1-20/600           linear ramp from 1 to 20 calls/s over 600 s, then hold
+    step:2,4,8/120          2, 4, then 8 calls/s, each step lasting 120 s, then hold
+    poisson:5               Poisson arrivals at 5 calls/s
+    poisson:ramp:1-20/600   Poisson arrivals following any of the shapes above
+    """
+    text = spec.strip()
+    poisson = False
+    kind, _, body = text.partition(":")
+    kind = kind.strip().lower()
+    if kind == "poisson":
+        poisson = True
+        inner_kind, sep, inner_body = body.partition(":")
+        if sep:
+            kind, body = inner_kind.strip().lower(), inner_body
+        else:
+            kind = "constant"
+    body = body.strip()
+
+    if kind == "constant":
+        rate = _parse_rate(body)
+        segments = [RateSegment(0.0, math.inf, rate, rate)]
+    elif kind == "ramp":
+        rates, _, duration = body.partition("/")
+        rate_from, _, rate_to = rates.partition("-")
+        start_rate, end_rate, seconds = _parse_rate(rate_from), _parse_rate(rate_to), float(duration)
+        if seconds <= 0:
+            raise ValueError(f"ramp duration must be positive: {spec}")
+        segments = [
+            RateSegment(0.0, seconds, start_rate, end_rate),
+            RateSegment(seconds, math.inf, end_rate, end_rate),
+        ]
+    elif kind == "step":
+        rates, _, duration = body.partition("/")
+        step_rates = [_parse_rate(r) for r in rates.split(",") if r.strip()]
+        seconds = float(duration)
+        if not step_rates or seconds <= 0:
+            raise ValueError(f"step profile needs rates and a positive step length: {spec}")
+        segments = []
+        for i, rate in enumerate(step_rates):
+            end = math.inf if i == len(step_rates) - 1 else (i + 1) * seconds
+            segments.append(RateSegment(i * seconds, end, rate, rate))
+    else:
+        raise ValueError(f"Unknown load profile: {spec}")
+
+    return LoadProfile(text, segments, poisson)
@@ -0,0 +1,124 @@
+import time
+import heapq
+import logging
+import itertools
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledEvent:
+    """Handle for a pending scheduler callback"""
+
+    __slots__ = ("deadline", "callback", "args", "cancelled")
+
+    def __init__(self, deadline: float, callback: Callable[..., Any], args: Tuple[Any, ...]):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class DeadlineScheduler:
+    """Heap-based event loop keyed on monotonic due times.
+
+    Callbacks run on the thread that calls run_until. Other threads (worker
+    completions) hand work back with call_soon, which wakes the loop instead of
+    it having to poll.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._heap: List[Tuple[float, int, ScheduledEvent]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        # How late the most recent and the worst callback ran behind its due time
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def now(self) -> float:
+        return self.clock()
+
+    def call_at(self, deadline: float, callback: Callable[..., Any], *args: Any) -> ScheduledEvent:
+        """Schedule callback(*args) at a monotonic deadline; safe to call from any thread"""
+        event = ScheduledEvent(deadline, callback, args)
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), event))
+            if self._heap[0][2] is event:
+                self._cond.notify()
+        return event
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> ScheduledEvent:
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def call_soon(self, callback: Callable[..., Any], *args: Any) -> ScheduledEvent:
+        return self.call_at(self.clock(), callback, *args)
+
+    def call_every(self, interval: float, callback: Callable[..., Any], *args: Any, first_at: Optional[float] = None) -> ScheduledEvent:
+        """Schedule callback(*args) repeatedly on a fixed-rate grid; cancel the returned handle to stop it"""
+        handle = ScheduledEvent(first_at if first_at is not None else self.clock() + interval, callback, args)
+
+        def tick(deadline: float):
+            if handle.cancelled:
+                return
+            callback(*args)
+            next_deadline = deadline + interval
+            # Skip missed ticks rather than firing them back to back
+            if next_deadline < self.clock():
+                next_deadline = self.clock() + interval
+            self.call_at(next_deadline, tick, next_deadline)
+
+        self.call_at(handle.deadline, tick, handle.deadline)
+        return handle
+
+    def stop(self):
+        """Make run_until return after the current callback"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for _, _, event in self._heap if not event.cancelled)
+
+    def _pop_due(self, until: float) -> Optional[ScheduledEvent]:
+        """Block until the next event is due or until is reached; returns None on timeout or stop"""
+        with self._cond:
+            while not self._stopped:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                now = self.clock()
+                next_deadline = self._heap[0][0] if self._heap else until
+                if self._heap and next_deadline <= now:
+                    return heapq.heappop(self._heap)[2]
+                if now >= until:
+                    return None
+                self._cond.wait(timeout=min(next_deadline, until) - now)
+            return None
+
+    def run_until(self, until: float, stop_when: Optional[Callable[[], bool]] = None):
+        """Dispatch due callbacks until the monotonic deadline passes, stop() is called or stop_when() is true"""
+        with self._cond:
+            self._stopped = False
+        while True:
+            if stop_when and stop_when():
+                break
+            event = self._pop_due(until)
+            if event is None:
+                break
+            self.last_lag = max(0.0, self.clock() - event.deadline)
+            if self.last_lag > self.max_lag:
+                self.max_lag = self.last_lag
+            try:
+                event.callback(*event.args)
+            except Exception as e:
+                logger.error(f"[SCHED] Callback {getattr(event.callback, '__name__', event.callback)} failed: {str(e)}")
+
+    def run_ready(self):
+        """Run every callback that is already due without waiting for future ones"""
+        self.run_until(self.clock())
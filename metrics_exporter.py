@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from latency_histogram import REPORT_PERCENTILES
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Agent-level gauges: snapshot field -> (metric name, help)
+GAUGES = {
+    "in_flight": ("ltf_calls_in_flight", "Calls currently running on a worker slot"),
+    "queued": ("ltf_calls_queued", "Calls waiting for a free worker slot"),
+    "workers": ("ltf_workers", "Worker slots in the pool"),
+    "scheduler_lag_seconds": ("ltf_scheduler_lag_seconds", "How late the latest scheduler callback ran"),
+    "scheduler_max_lag_seconds": ("ltf_scheduler_max_lag_seconds", "Worst scheduler callback lateness this inner loop"),
+    "writer_queue_depth": ("ltf_result_writer_queue_depth", "Results waiting for the result log writer"),
+}
+COUNTERS = {
+    "sessions_recycled": ("ltf_sessions_recycled_total", "Worker sessions replaced after hung or lost calls"),
+    "writer_rows_written": ("ltf_result_rows_written_total", "Rows written to the result log"),
+    "writer_queue_full_waits": ("ltf_result_writer_queue_full_total", "Times a result had to wait for queue space"),
+}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Prometheus text exposition of a metrics snapshot"""
+    base = snapshot.get("labels", {})
+    lines: List[str] = []
+
+    for table, kind in ((GAUGES, "gauge"), (COUNTERS, "counter")):
+        for field, (name, help_text) in table.items():
+            if snapshot.get(field) is None:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name}{_labels(base)} {snapshot[field]}"]
+
+    functions = snapshot.get("functions", {})
+    lines += ["# HELP ltf_calls_total Completed calls by outcome", "# TYPE ltf_calls_total counter"]
+    for key, row in functions.items():
+        phase, _, function = key.partition("|")
+        for status in ("ok", "error", "timeout"):
+            lines.append(f"ltf_calls_total{_labels({**base, 'phase': phase, 'function': function, 'status': status})} {row[status]}")
+
+    lines += ["# HELP ltf_call_rate Calls per second since the previous snapshot", "# TYPE ltf_call_rate gauge"]
+    for key, row in functions.items():
+        phase, _, function = key.partition("|")
+        lines.append(f"ltf_call_rate{_labels({**base, 'phase': phase, 'function': function})} {row['rate_per_sec']}")
+
+    lines += ["# HELP ltf_call_latency_seconds Call latency since the start of the run", "# TYPE ltf_call_latency_seconds summary"]
+    for key, row in functions.items():
+        phase, _, function = key.partition("|")
+        labels = {**base, 'phase': phase, 'function': function}
+        for percentile in REPORT_PERCENTILES:
+            quantile = {**labels, "quantile": f"{percentile / 100:g}"}
+            lines.append(f"ltf_call_latency_seconds{_labels(quantile)} {row[f'p{percentile:g}_ms'] / 1000:.6f}")
+        lines.append(f"ltf_call_latency_seconds_sum{_labels(labels)} {row['sum_seconds']:.6f}")
+        lines.append(f"ltf_call_latency_seconds_count{_labels(labels)} {row['calls']}")
+
+    lines += ["# HELP ltf_call_corrected_latency_seconds Call latency from the intended start (coordinated-omission corrected)",
+              "# TYPE ltf_call_corrected_latency_seconds summary"]
+    for key, row in functions.items():
+        phase, _, function = key.partition("|")
+        labels = {**base, 'phase': phase, 'function': function}
+        for percentile in REPORT_PERCENTILES:
+            quantile = {**labels, "quantile": f"{percentile / 100:g}"}
+            lines.append(f"ltf_call_corrected_latency_seconds{_labels(quantile)} {row[f'corrected_p{percentile:g}_ms'] / 1000:.6f}")
+
+    lines += ["# HELP ltf_call_start_lag_seconds How far calls started behind their intended start",
+              "# TYPE ltf_call_start_lag_seconds summary"]
+    for key, row in functions.items():
+        phase, _, function = key.partition("|")
+        labels = {**base, 'phase': phase, 'function': function}
+        for percentile in (50, 99):
+            quantile = {**labels, "quantile": f"{percentile / 100:g}"}
+            lines.append(f"ltf_call_start_lag_seconds{_labels(quantile)} {row[f'lag_p{percentile}_ms'] / 1000:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Publishes agent metrics over HTTP (/metrics, /snapshot.json) and to a JSON snapshot file.
+
+    A publisher thread calls collect() every publish_seconds and keeps the
+    result, already rendered, as the current snapshot. Scrapes only return
+    that snapshot, so they never touch the recorder, pool or writer locks.
+    """
+
+    def __init__(self, collect: Callable[[], Dict[str, Any]], port: int = 0, host: str = "127.0.0.1",
+                 snapshot_path: str = "", publish_seconds: float = 5.0):
+        self.collect = collect
+        self.port = port
+        self.host = host
+        self.snapshot_path = snapshot_path
+        self.publish_seconds = publish_seconds
+        self.snapshot: Dict[str, Any] = {}
+        self._rendered = (b"", b"{}")
+        self._previous: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._publisher: Optional[threading.Thread] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._server_thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start publishing; a port that cannot be bound only loses the HTTP endpoint, not the snapshots"""
+        self.publish()
+        if self.snapshot_path:
+            logger.info(f"[METRICS] Writing snapshots to {self.snapshot_path} every {self.publish_seconds} seconds")
+        self._publisher = threading.Thread(target=self._publish_loop, name="ltf-metrics-publish", daemon=True)
+        self._publisher.start()
+        if self.port:
+            try:
+                self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+            except OSError as e:
+                logger.warning(f"[METRICS] Metrics endpoint unavailable on {self.host}:{self.port}: {str(e)}")
+                return
+            self._server.daemon_threads = True
+            self.port = self._server.server_address[1]
+            self._server_thread = threading.Thread(target=self._server.serve_forever, name="ltf-metrics-http", daemon=True)
+            self._server_thread.start()
+            logger.info(f"[METRICS] Serving http://{self.host}:{self.port}/metrics")
+
+    def _publish_loop(self):
+        while not self._stop.wait(self.publish_seconds):
+            self.publish()
+
+    def publish(self):
+        """Collect a new snapshot, derive per-function rates and swap it in"""
+        try:
+            snapshot = self.collect()
+        except Exception as e:
+            logger.warning(f"[METRICS] Cannot collect metrics: {str(e)}")
+            return
+        previous = self._previous
+        elapsed = snapshot["time"] - previous["time"] if previous else 0.0
+        for key, row in snapshot.get("functions", {}).items():
+            before = previous.get("functions", {}).get(key, {}).get("calls", 0) if previous else 0
+            row["rate_per_sec"] = round((row["calls"] - before) / elapsed, 3) if elapsed > 0 else 0.0
+        self._previous = snapshot
+        self.snapshot = snapshot
+        document = json.dumps(snapshot, indent=2)
+        self._rendered = (render_prometheus(snapshot).encode("utf-8"), document.encode("utf-8"))
+        if self.snapshot_path:
+            try:
+                partial = self.snapshot_path + ".tmp"
+                with open(partial, 'w', encoding='utf-8') as f:
+                    f.write(document)
+                os.replace(partial, self.snapshot_path)
+            except OSError as e:
+                logger.warning(f"[METRICS] Cannot write snapshot: {str(e)}")
+
+    def _handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                prometheus, document = exporter._rendered
+                if self.path.split("?")[0] == "/metrics":
+                    body, content_type = prometheus, CONTENT_TYPE
+                elif self.path.split("?")[0] == "/snapshot.json":
+                    body, content_type = document, "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        """Publish a final snapshot and stop serving"""
+        self._stop.set()
+        if self._publisher:
+            self._publisher.join(timeout=10)
+            self._publisher = None
+        self.publish()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,201 @@
+import csv
+import time
+import queue
+import struct
+import logging
+import datetime
+import threading
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CSV_FORMAT = "csv"
+BINARY_FORMAT = "binary"
+CSV_HEADER = ["Timestamp", "Result", "Parameter", "LatencyMs", "Status", "Phase", "StartLagMs"]
+
+# Binary result log: magic, then one record per call:
+#   timestamp (f64 epoch seconds), latency ms (f32), start lag ms (f32), result (i32), status code (u8),
+#   phase length (u8) + UTF-8 phase, parameter length (u16) + UTF-8 parameter
+BINARY_MAGIC = b"LTFRES1\n"
+_RECORD = struct.Struct("<dffiBB")
+_PARAM_LEN = struct.Struct("<H")
+_I32_MIN, _I32_MAX = -2 ** 31, 2 ** 31 - 1
+STATUS_CODES = {"ok": 0, "error": 1, "timeout": 2}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+_FLUSH = object()
+_STOP = object()
+
+
+def format_timestamp(timestamp: datetime.datetime) -> str:
+    """Result log timestamp in 'yyyy/mm/dd hh:mi:ss.mmm' format"""
+    return timestamp.strftime("%Y/%m/%d %H:%M:%S.%f")[:-3]
+
+
+def result_value(result) -> int:
+    """Logged Result column: the call's return value, 0 if it returned nothing numeric, -1 for errors and timeouts"""
+    if result.status != "ok":
+        return -1
+    try:
+        return int(result.value)
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+class ResultWriter:
+    """Background writer for the per-call result log.
+
+    Callers only enqueue results; formatting and disk I/O happen on a
+    writer thread that flushes when flush_rows results are buffered or
+    flush_seconds have passed since the first buffered one. The queue is
+    bounded, so a stalled disk applies backpressure instead of growing memory.
+    """
+
+    def __init__(self, path: str, fmt: str = CSV_FORMAT, max_queue: int = 10000,
+                 flush_rows: int = 500, flush_seconds: float = 1.0):
+        if fmt not in (CSV_FORMAT, BINARY_FORMAT):
+            raise ValueError(f"Unknown result format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.queue_full_waits = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        if fmt == BINARY_FORMAT:
+            self._file = open(path, 'wb')
+            self._file.write(BINARY_MAGIC)
+        else:
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+            self._csv = csv.writer(self._file, lineterminator="\n")
+            self._csv.writerow(CSV_HEADER)
+        self._file.flush()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="ltf-result-writer", daemon=True)
+        self._thread.start()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def write(self, results: List[Any]):
+        """Enqueue results; blocks only when the bounded queue is full"""
+        for result in results:
+            try:
+                self._queue.put_nowait(result)
+            except queue.Full:
+                self.queue_full_waits += 1
+                if self.queue_full_waits == 1 or self.queue_full_waits % 1000 == 0:
+                    logger.warning(f"[LOG] Result writer queue full ({self.queue_full_waits} waits); disk is falling behind")
+                self._queue.put(result)
+
+    def flush(self):
+        """Ask the writer thread to write whatever is buffered"""
+        self._queue.put(_FLUSH)
+
+    def close(self):
+        """Write everything still queued, then close the file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+        logger.info(f"[LOG] Result writer closed: {self.written} rows written to {self.path}")
+
+    def _run(self):
+        batch: List[Any] = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = _FLUSH
+            if item is _STOP or item is _FLUSH:
+                self._write_batch(batch)
+                batch = []
+                if item is _STOP:
+                    return
+                continue
+            if not batch:
+                deadline = time.monotonic() + self.flush_seconds
+            batch.append(item)
+            if len(batch) >= self.flush_rows:
+                self._write_batch(batch)
+                batch = []
+
+    def _write_batch(self, batch: List[Any]):
+        if not batch:
+            return
+        try:
+            if self.fmt == BINARY_FORMAT:
+                self._file.write(b"".join(encode_binary_result(result) for result in batch))
+            else:
+                self._csv.writerows(
+                    [
+                        format_timestamp(result.timestamp),
+                        result_value(result),
+                        result.parameter,
+                        f"{result.elapsed_seconds * 1000:.3f}",
+                        result.status,
+                        result.phase,
+                        f"{result.start_lag * 1000:.3f}",
+                    ]
+                    for result in batch
+                )
+            self._file.flush()
+            self.written += len(batch)
+        except Exception as e:
+            logger.error(f"[LOG] Failed to write {len(batch)} results to {self.path}: {str(e)}")
+
+
+def _utf8_prefix(text: str, limit: int) -> bytes:
+    """At most limit bytes of text as UTF-8, cut on a character boundary"""
+    raw = text.encode('utf-8')
+    if len(raw) <= limit:
+        return raw
+    return raw[:limit].decode('utf-8', 'ignore').encode('utf-8')
+
+
+def encode_binary_result(result) -> bytes:
+    phase = _utf8_prefix(result.phase, 255)
+    parameter = _utf8_prefix(str(result.parameter), 65535)
+    return b"".join((
+        _RECORD.pack(result.timestamp.timestamp(), result.elapsed_seconds * 1000, result.start_lag * 1000,
+                     max(_I32_MIN, min(_I32_MAX, result_value(result))), STATUS_CODES.get(result.status, 1), len(phase)),
+        phase,
+        _PARAM_LEN.pack(len(parameter)),
+        parameter,
+    ))
+
+
+def read_binary_results(path: str, on_truncated: Optional[Callable[[], None]] = None
+                        ) -> Iterator[Tuple[float, int, str, float, str, str, float]]:
+    """Yield (epoch seconds, result, parameter, latency ms, status, phase, start lag ms) from a binary result log.
+
+    A last record cut off by a crash is skipped; on_truncated is called for it.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(BINARY_MAGIC))
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary result log")
+        while True:
+            head = f.read(_RECORD.size)
+            if not head:
+                return
+            if len(head) < _RECORD.size:
+                break
+            timestamp, latency_ms, lag_ms, value, status, phase_len = _RECORD.unpack(head)
+            phase = f.read(phase_len)
+            param_head = f.read(_PARAM_LEN.size)
+            if len(phase) < phase_len or len(param_head) < _PARAM_LEN.size:
+                break
+            (param_len,) = _PARAM_LEN.unpack(param_head)
+            parameter = f.read(param_len)
+            if len(parameter) < param_len:
+                break
+            yield (timestamp, value, parameter.decode('utf-8'), latency_ms, STATUS_NAMES.get(status, "error"),
+                   phase.decode('utf-8'), lag_ms)
+    logger.warning(f"[LOG] Skipped a truncated last record in {path}")
+    if on_truncated:
+        on_truncated()
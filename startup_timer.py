@@ -0,0 +1,42 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Start offset and duration of each agent startup stage; stages may run concurrently"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.stages: List[Tuple[str, float, float]] = []  # (name, start offset, duration)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        began = time.monotonic()
+        try:
+            yield
+        finally:
+            ended = time.monotonic()
+            with self._lock:
+                self.stages.append((name, began - self.started, ended - began))
+
+    def timed(self, name: str, function: Callable[..., Any], *args) -> Any:
+        with self.stage(name):
+            return function(*args)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def report(self):
+        """Log every stage and how much running them concurrently saved"""
+        with self._lock:
+            stages = sorted(self.stages, key=lambda stage: stage[1])
+        for name, offset, duration in stages:
+            logger.info(f"[STARTUP] {name:<10} {duration:8.3f}s  (from +{offset:.3f}s)")
+        serial = sum(duration for _, _, duration in stages)
+        logger.info(f"[STARTUP] Ready after {self.elapsed():.3f}s (stages add up to {serial:.3f}s)")
@@ -0,0 +1,301 @@
+import json
+import shlex
+import logging
+import importlib
+import threading
+import subprocess
+import http.client
+from functools import partial
+from urllib.parse import quote, urlsplit
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COM_TARGET = "com"
+PYTHON_TARGET = "python"
+HTTP_TARGET = "http"
+SUBPROCESS_TARGET = "subprocess"
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+
+class ExcelSession:
+    """Backend session owning a dedicated Excel instance with the test workbook open"""
+
+    def __init__(self, xlsm_file: str, visible: bool = True):
+        # Imported here so the framework itself loads on machines without pywin32
+        import pythoncom
+        import win32com.client
+        self._pythoncom = pythoncom
+        self.xl_app = None
+        self.wb = None
+        pythoncom.CoInitialize()
+        # DispatchEx starts a separate Excel process so worker slots never share a workbook
+        self.xl_app = win32com.client.DispatchEx("Excel.Application")
+        self.xl_app.Visible = visible
+        self.wb = self.xl_app.Workbooks.Open(xlsm_file)
+        self.wb.Activate()
+        logger.info(f"    [OPEN] Excel opened: {self.wb.Name}")
+
+    def run(self, macro_name: str, parameter: str, timeout: Optional[float] = None) -> Any:
+        return self.wb.Application.Run(macro_name, parameter)
+
+    def close(self):
+        if self.wb:
+            try:
+                self.wb.Close(SaveChanges=False)
+                self.wb = None
+            except:
+                logger.warning("Error closing workbook")
+
+        if self.xl_app:
+            try:
+                self.xl_app.Quit()
+                self.xl_app = None
+            except:
+                logger.warning("Error quitting Excel")
+
+        self._pythoncom.CoUninitialize()
+
+
+def resolve_callable(spec: str) -> Callable:
+    """Import 'package.module:function' (or 'package.module.function')"""
+    module_path, sep, attr = spec.partition(":")
+    if not sep:
+        module_path, _, attr = spec.rpartition(".")
+    if not module_path or not attr:
+        raise ValueError(f"Callable must look like 'package.module:function', got {spec!r}")
+    target = importlib.import_module(module_path)
+    for part in attr.split("."):
+        target = getattr(target, part)
+    if not callable(target):
+        raise TypeError(f"{spec} is not callable")
+    return target
+
+
+class PythonSession:
+    """Calls in-process Python functions.
+
+    With a dispatcher (callable='pkg.mod:handler' or 'pkg.mod.handler') every call
+    becomes handler(macro_name, parameter).
+    With a package (package='pkg.loadtests') the macro 'Module.Function' resolves to
+    pkg.loadtests.Module.Function(parameter); resolved functions are cached.
+    """
+
+    def __init__(self, callable_spec: str = "", package: str = ""):
+        if bool(callable_spec) == bool(package):
+            raise ValueError("python target needs exactly one of 'callable' or 'package'")
+        self.package = package
+        self._dispatcher: Optional[Callable[[str, str], Any]] = resolve_callable(callable_spec) if callable_spec else None
+        self._functions: Dict[str, Callable[[str], Any]] = {}
+
+    def run(self, macro_name: str, parameter: str, timeout: Optional[float] = None) -> Any:
+        if self._dispatcher:
+            return self._dispatcher(macro_name, parameter)
+        function = self._functions.get(macro_name)
+        if function is None:
+            module_name, _, function_name = macro_name.rpartition(".")
+            function = self._functions[macro_name] = resolve_callable(f"{self.package}.{module_name}:{function_name}")
+        return function(parameter)
+
+    def close(self):
+        self._functions.clear()
+
+
+def parse_result(body: str, default: float) -> float:
+    """Numeric call result from a response body: a bare number, or JSON with a 'result' field"""
+    text = body.strip()
+    if not text:
+        return default
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return default
+    if isinstance(payload, dict) and isinstance(payload.get("result"), (int, float)):
+        return float(payload["result"])
+    return default
+
+
+class HttpSession:
+    """Keep-alive HTTP client: each call is METHOD {base_url}/{Module}/{Function} with the parameter as body.
+
+    Every worker slot owns one session and therefore one persistent connection,
+    so the worker pool doubles as the connection pool. A failed call closes the
+    connection and the next call reconnects. A kept-alive connection the server
+    dropped is retried once when the request cannot have reached the server
+    (or the method is idempotent); a POST is never sent twice. The result is the numeric response body (or its
+    JSON 'result' field), else the HTTP status code; 4xx/5xx responses raise.
+    """
+
+    def __init__(self, base_url: str, method: str = "POST", headers: Optional[Dict[str, str]] = None,
+                 timeout_seconds: float = 30.0):
+        url = urlsplit(base_url)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"HTTP target needs an http(s) URL, got {base_url!r}")
+        self.scheme = url.scheme
+        self.netloc = url.netloc
+        self.base_path = url.path.rstrip("/")
+        self.method = method.upper()
+        self.headers = {"Content-Type": "text/plain; charset=utf-8", **(headers or {})}
+        self.timeout_seconds = timeout_seconds
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self._conn = connection_class(self.netloc, timeout=self.timeout_seconds)
+        return self._conn
+
+    def run(self, macro_name: str, parameter: str, timeout: Optional[float] = None) -> Any:
+        path = f"{self.base_path}/{'/'.join(quote(part) for part in macro_name.split('.'))}"
+        body = str(parameter).encode("utf-8")
+        for attempt in (1, 2):
+            conn = self._connection()
+            conn.timeout = timeout or self.timeout_seconds
+            reused = conn.sock is not None
+            if reused:
+                conn.sock.settimeout(conn.timeout)
+            sent = False
+            try:
+                conn.request(self.method, path, body=body, headers=self.headers)
+                sent = True
+                response = conn.getresponse()
+                payload = response.read().decode("utf-8", errors="replace")
+                break
+            except Exception as e:
+                # Any failure can leave the connection mid-request; never reuse it
+                self.close()
+                # A kept-alive connection the server has since closed: resend once, but only
+                # if the server cannot have seen the request (or the method is idempotent)
+                dropped = isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError))
+                if attempt == 2 or not reused or not dropped or (sent and self.method not in IDEMPOTENT_METHODS):
+                    raise
+        if response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status} {response.reason}: {payload[:200]}")
+        return parse_result(payload, float(response.status))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class SubprocessSession:
+    """Runs a command per call, or keeps one command running and talks to it line by line.
+
+    Per call (persistent=False): {macro} and {parameter} in the command are
+    substituted; the result is the numeric stdout, else the exit code, and a
+    non-zero exit raises.
+    A call that outlives its timeout kills the command and raises TimeoutError,
+    so no stray process is left behind whichever executor mode runs it.
+    Persistent: the command is started once per worker slot and receives
+    'macro<TAB>parameter' lines on stdin, answering each with one result line
+    ('ERROR: ...' raises).
+    """
+
+    def __init__(self, command: str, persistent: bool = False, cwd: Optional[str] = None):
+        self.command = command
+        self.persistent = persistent
+        self.cwd = cwd
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        if persistent:
+            self._start()
+
+    def _start(self):
+        self._process = subprocess.Popen(
+            shlex.split(self.command), cwd=self.cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding="utf-8", bufsize=1
+        )
+
+    def _argv(self, macro_name: str, parameter: str) -> List[str]:
+        return [arg.replace("{macro}", macro_name).replace("{parameter}", str(parameter)) for arg in shlex.split(self.command)]
+
+    def run(self, macro_name: str, parameter: str, timeout: Optional[float] = None) -> Any:
+        if not self.persistent:
+            try:
+                # subprocess.run kills the command when the timeout expires
+                completed = subprocess.run(self._argv(macro_name, parameter), cwd=self.cwd, capture_output=True,
+                                           text=True, encoding="utf-8", timeout=timeout)
+            except subprocess.TimeoutExpired:
+                raise TimeoutError(f"command killed after {timeout} seconds")
+            if completed.returncode != 0:
+                raise RuntimeError(f"exit code {completed.returncode}: {completed.stderr.strip()[:200]}")
+            return parse_result(completed.stdout, 0.0)
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                logger.warning(f"[TARGET] Restarting exited command: {self.command}")
+                self._start()
+            process = self._process
+            process.stdin.write(f"{macro_name}\t{parameter}\n")
+            process.stdin.flush()
+            expired = threading.Event()
+
+            def expire():
+                expired.set()
+                process.kill()
+            watchdog = threading.Timer(timeout, expire) if timeout else None
+            if watchdog:
+                watchdog.daemon = True
+                watchdog.start()
+            try:
+                line = process.stdout.readline()
+            finally:
+                if watchdog:
+                    watchdog.cancel()
+            if expired.is_set():
+                process.wait()
+                self._process = None
+                raise TimeoutError(f"command killed after {timeout} seconds")
+        if not line:
+            raise RuntimeError(f"command exited without answering (exit code {process.poll()})")
+        if line.startswith("ERROR"):
+            raise RuntimeError(line.partition(":")[2].strip() or line.strip())
+        return parse_result(line, 0.0)
+
+    def close(self):
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+        self._process = None
+
+
+def create_session_factory(target: Dict[str, Any], xlsm_file: str = "") -> Callable[[], Any]:
+    """Picklable session factory for the configured execution.target.
+
+    {"type": "com"}                                         Excel workbook from eVTCS_Program (default)
+    {"type": "python", "callable": "pkg.mod:handler"}       or "package": "pkg.loadtests"
+    {"type": "http", "url": "http://localhost:8080/api", "method": "POST", "headers": {...}}
+    {"type": "subprocess", "command": "tool {macro} {parameter}", "persistent": false}
+    """
+    kind = target.get("type", COM_TARGET)
+    if kind == COM_TARGET:
+        return partial(ExcelSession, xlsm_file, target.get("visible", True))
+    if kind == PYTHON_TARGET:
+        if bool(target.get("callable")) == bool(target.get("package")):
+            raise ValueError("python target needs exactly one of 'callable' or 'package'")
+        return partial(PythonSession, target.get("callable", ""), target.get("package", ""))
+    if kind == HTTP_TARGET:
+        return partial(HttpSession, target["url"], target.get("method", "POST"), target.get("headers"),
+                       target.get("timeout_seconds", 30.0))
+    if kind == SUBPROCESS_TARGET:
+        return partial(SubprocessSession, target["command"], target.get("persistent", False), target.get("cwd"))
+    raise ValueError(f"Unknown target type: {kind}")
+
+
+def describe_target(target: Dict[str, Any], xlsm_file: str = "") -> str:
+    kind = target.get("type", COM_TARGET)
+    detail = {
+        COM_TARGET: xlsm_file,
+        PYTHON_TARGET: target.get("callable") or target.get("package"),
+        HTTP_TARGET: target.get("url"),
+        SUBPROCESS_TARGET: target.get("command"),
+    }.get(kind, "")
+    return f"{kind} ({detail})" if detail else kind
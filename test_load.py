@@ -0,0 +1,401 @@
+"""
+test_load.py
+=============
+Offline checks for the load-test agent modules; no Excel, database or network needed.
+
+    python test_load.py
+"""
+
+import os, sys, json, socket, tempfile, datetime, threading, time
+from types import SimpleNamespace
+from dataclasses import dataclass
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analyze_results
+from analyze_results import SparkSeries, analyze, iter_chunks
+from result_writer   import ResultWriter, BINARY_FORMAT, CSV_FORMAT, read_binary_results
+from load_executor   import CallResult, CallableSession, WorkerPool, PROCESS_MODE
+from load_scheduler  import DeadlineScheduler
+from load_profiles   import parse_load_profile
+from latency_histogram import LatencyRecorder
+from coordinator     import Coordinator, AgentLink, partition_inner_functions
+from target_drivers  import HttpSession, SubprocessSession, create_session_factory
+from http.server     import BaseHTTPRequestHandler, ThreadingHTTPServer
+from metrics_exporter import MetricsExporter
+from control_plane   import ControlPlaneClient, InMemoryControlStore, HEARTBEAT_STATUS
+
+P = "✓"; F = "✗"; errors = 0
+
+def check(label, ok, detail=""):
+    global errors
+    mark = P if ok else F
+    msg = f"  {mark} {label}"
+    if detail: msg += f": {detail}"
+    print(msg)
+    if not ok: errors += 1
+
+tmp = tempfile.mkdtemp(prefix="ltf-test-")
+
+# ── analyze_results: log formats ──────────────────────────────────────────
+print("\n── analyze_results ──")
+# Written by the pre-worker-pool agent: header, then successful calls only
+legacy_path = os.path.join(tmp, "T1-10.0.0.1-jmeter_logfile_20260101-10.log")
+with open(legacy_path, "w", encoding="utf-8") as f:
+    f.write("Timestamp,Result,Parameter\n")
+    f.write("2026/01/01 10:00:00.123,5,abc\n")
+    f.write("2026/01/01 10:00:01.456,7,abc\n")
+    f.write("2026/01/01 10:01:02.000,0,x,y\n")
+headerless_path = os.path.join(tmp, "T1-10.0.0.2-jmeter_logfile_20260101-10.log")
+with open(headerless_path, "w", encoding="utf-8") as f:
+    f.write("2026/01/01 10:00:00.500,1,abc\n")
+
+for use_pandas in (True, False):
+    mode = "pandas" if use_pandas and analyze_results.pd is not None else "pure Python"
+    chunks = list(iter_chunks(legacy_path, use_pandas=use_pandas))
+    params = [p for chunk in chunks for p in chunk[5]]
+    check(f"Baseline log with header reads ({mode})", params == ["abc", "abc", "x,y"], str(params))
+    summary = analyze([legacy_path, headerless_path], use_pandas=use_pandas)
+    overall = [k for k in summary["keys"] if k["phase"] == "*"][0]
+    check(f"Baseline logs: every row counted, no latency ({mode})",
+          summary["rows"] == 4 and overall["calls"] == 4 and overall["ok"] == 4, f"{overall['calls']} calls")
+
+start = datetime.datetime(2026, 1, 1, 10, 0, 0)
+current_path = os.path.join(tmp, "T2-10.0.0.1-jmeter_logfile_20260101-10.log")
+writer = ResultWriter(current_path, CSV_FORMAT)
+for i in range(10):
+    writer.write([CallResult("INNER", "M", "F", "p", start + datetime.timedelta(seconds=i),
+                            None if i % 2 else "text", "ok" if i < 8 else "timeout",
+                            intended_start=0.0, actual_start=0.0, elapsed_seconds=0.010 * (i + 1))])
+writer.close()
+for use_pandas in (True, False):
+    mode = "pandas" if use_pandas and analyze_results.pd is not None else "pure Python"
+    summary = analyze([current_path], use_pandas=use_pandas)
+    inner = [k for k in summary["keys"] if k["phase"] == "INNER"][0]
+    check(f"Current log: latency and status columns read ({mode})",
+          inner["calls"] == 10 and inner["timeout"] == 2 and inner["max_ms"] >= 99,
+          f"{inner['calls']} calls, {inner['timeout']} timeouts, max {inner['max_ms']} ms")
+
+# A crashed agent leaves its last line or record cut off
+binary_path = os.path.join(tmp, "T3-10.0.0.1-jmeter_logfile_20260101-10.bin")
+writer = ResultWriter(binary_path, BINARY_FORMAT)
+for i in range(3):
+    writer.write([CallResult("INNER", "M", "F", "p", start + datetime.timedelta(seconds=i), 1, "ok",
+                            intended_start=0.0, actual_start=0.0, elapsed_seconds=0.010)])
+writer.close()
+with open(binary_path, "rb+") as f:
+    f.truncate(os.path.getsize(binary_path) - 3)
+truncated_path = os.path.join(tmp, "T3-10.0.0.2-jmeter_logfile_20260101-10.log")
+with open(current_path, encoding="utf-8") as f:
+    text = f.read()
+with open(truncated_path, "w", encoding="utf-8") as f:
+    f.write(text + '2026/01/01 10:00:11.000,1,"a,b')
+for use_pandas in (True, False):
+    mode = "pandas" if use_pandas and analyze_results.pd is not None else "pure Python"
+    summary = analyze([binary_path, truncated_path], use_pandas=use_pandas)
+    check(f"Truncated last line and record are skipped and counted ({mode})",
+          summary["rows"] == 12 and summary["skipped_rows"] == 2, f"{summary['rows']} rows, {summary['skipped_rows']} skipped")
+
+long_path = os.path.join(tmp, "T4-10.0.0.1-jmeter_logfile_20260101-10.bin")
+writer = ResultWriter(long_path, BINARY_FORMAT)
+writer.write([CallResult("INNER", "M", "F", "é" * 40000, start, 1, "ok",
+                        intended_start=0.0, actual_start=0.0, elapsed_seconds=0.010)])
+writer.close()
+long_params = [record[2] for record in read_binary_results(long_path)]
+check("Over-long parameter is cut on a UTF-8 character boundary",
+      long_params == ["é" * 32767], f"{len(long_params[0]) if long_params else 0} chars")
+
+spark = SparkSeries(max_points=8)
+for i in range(1000):
+    spark.add({"calls": 1, "throughput_per_sec": float(i % 2), "p99_ms": float(i)})
+check("Sparkline points stay bounded over a long log",
+      len(spark.p99) <= 8 and spark.p99[-1] == 999.0 and spark.calls == 1000 and
+      all(abs(t - 0.5) < 1e-9 for t in spark.throughput[:-1]), f"{len(spark.p99)} points")
+
+# ── DeadlineScheduler ─────────────────────────────────────────────────────
+print("\n── DeadlineScheduler ──")
+class FakeClock:
+    def __init__(self): self.now = 100.0
+    def __call__(self): return self.now
+
+clock = FakeClock()
+sched = DeadlineScheduler(clock=clock)
+fired = []
+sched.call_later(2.0, fired.append, "b")
+sched.call_later(1.0, fired.append, "a")
+sched.call_later(2.0, fired.append, "c")                  # same deadline as "b": FIFO
+sched.call_later(5.0, fired.append, "late")
+cancelled = sched.call_later(1.5, fired.append, "cancelled")
+cancelled.cancel()
+check("pending() ignores cancelled events", sched.pending() == 4, str(sched.pending()))
+sched.run_ready()
+check("Nothing runs before it is due", fired == [])
+clock.now = 102.0
+sched.run_ready()
+check("Due callbacks run in deadline order, ties FIFO", fired == ["a", "b", "c"], str(fired))
+check("Future callbacks stay pending", sched.pending() == 1)
+
+clock = FakeClock()
+sched = DeadlineScheduler(clock=clock)
+ticks = []
+ticker = sched.call_every(1.0, lambda: ticks.append(clock.now))
+for now in (101.3, 102.1, 103.7, 104.2):                 # every tick runs late by a different amount
+    clock.now = now
+    sched.run_ready()
+check("call_every stays on its grid (no drift from late ticks)", ticks == [101.3, 102.1, 103.7, 104.2] and
+      sched._heap[0][0] == 105.0, f"next due {sched._heap[0][0]}")
+clock.now = 108.5                                         # ticks 105..108 missed
+sched.run_ready()
+check("Missed ticks are skipped, not fired back to back", len(ticks) == 5 and sched._heap[0][0] == 109.5,
+      f"{len(ticks)} ticks, next due {sched._heap[0][0]}")
+check("Start lag of the latest and the worst callback is tracked",
+      abs(sched.last_lag - 3.5) < 1e-9 and abs(sched.max_lag - 3.5) < 1e-9, f"last {sched.last_lag}, max {sched.max_lag}")
+ticker.cancel()
+clock.now = 120.0
+sched.run_ready()
+check("Cancelled call_every stops", len(ticks) == 5)
+
+sched = DeadlineScheduler()
+woken = []
+started = time.monotonic()
+threading.Timer(0.05, lambda: sched.call_soon(lambda: (woken.append(time.monotonic() - started), sched.stop()))).start()
+sched.run_until(started + 5.0)
+check("call_soon from another thread wakes the loop", woken and woken[0] < 1.0, f"{woken[0]:.3f}s" if woken else "")
+
+# ── WorkerPool ─────────────────────────────────────────────────────────────
+print("\n── WorkerPool ──")
+def backend(macro_name, parameter):
+    if parameter == "hang":
+        time.sleep(60)
+    if parameter == "fail":
+        raise ValueError("macro failed")
+    return {"none": None, "text": "done"}.get(parameter, len(parameter))
+
+def call(parameter, timeout=2.0):
+    return SimpleNamespace(module_name="Mod", function_name="Func", parameter=parameter, timeout_seconds=timeout)
+
+def backend_session():
+    return CallableSession(backend)
+
+pool = WorkerPool(backend_session, num_workers=3)
+pool.start()
+results = pool.run_all("INNER", [call(p) for p in ("abc", "fail", "none", "text", "xy")])
+check("Results come back in submission order", [r.parameter for r in results] == ["abc", "fail", "none", "text", "xy"])
+check("Return values kept as returned, failures recorded as errors",
+      [(r.status, r.value) for r in results] ==
+      [("ok", 3), ("error", None), ("ok", None), ("ok", "done"), ("ok", 2)], str([(r.status, r.value) for r in results]))
+check("Calls spread over the worker slots", len({r.worker_id for r in results}) > 1)
+started = time.monotonic()
+results = pool.run_all("INNER", [call("hang", timeout=0.2), call("abc")])
+check("Hung call times out and its slot is recycled", results[0].status == "timeout" and pool.recycled == 1,
+      f"{results[0].status}, {pool.recycled} recycled")
+check("Recycled slot keeps serving", pool.run_all("INNER", [call("abcd")] * 3)[0].value == 4)
+started = time.monotonic()
+pool.shutdown()
+check("Thread pool shuts down without waiting for the hung call", time.monotonic() - started < 5.0,
+      f"{time.monotonic() - started:.1f}s")
+
+pool = WorkerPool(backend_session, num_workers=1)
+pool.start()
+results = pool.run_all("INNER", [call("abc")] * 3, think_time=0.3)
+check("Think time is not counted as start lag", max(r.start_lag for r in results) < 0.1 and
+      results[-1].actual_start - results[0].actual_start >= 0.55, str([round(r.start_lag, 3) for r in results]))
+pool.shutdown()
+
+pool = WorkerPool(backend_session, num_workers=2, mode=PROCESS_MODE)
+pool.start()
+started = time.monotonic()
+results = pool.run_all("INNER", [call("hang", timeout=0.3), call("hang", timeout=0.3), call("abc"), call("fail")])
+check("Process mode: both hung workers killed and recycled",
+      [r.status for r in results] == ["timeout", "timeout", "ok", "error"] and pool.recycled == 2,
+      f"{[r.status for r in results]}, {pool.recycled} recycled")
+check("Process mode: recycling does not wait on sibling workers", time.monotonic() - started < 10.0,
+      f"{time.monotonic() - started:.1f}s")
+started = time.monotonic()
+pool.shutdown()
+check("Process mode: shutdown is prompt", time.monotonic() - started < 10.0, f"{time.monotonic() - started:.1f}s")
+
+# ── Target drivers ─────────────────────────────────────────────────────────
+print("\n── Target drivers ──")
+python_target = create_session_factory({"type": "python", "callable": "os.path.join"})()
+check("Python target: dotted callable is a dispatcher", python_target.run("Mod.Func", "p") == os.path.join("Mod.Func", "p"))
+python_target = create_session_factory({"type": "python", "package": "os"})()
+check("Python target: package resolves Module.Function", python_target.run("path.basename", "/a/b.txt") == "b.txt")
+
+sleeper = f'"{sys.executable}" -c "import sys, time; time.sleep(float(sys.argv[1])); print(7)" {{parameter}}'
+command = SubprocessSession(sleeper)
+check("Subprocess target: numeric stdout is the result", command.run("Mod.Func", "0", timeout=30) == 7.0)
+started = time.monotonic()
+try:
+    command.run("Mod.Func", "30", timeout=0.5)
+    check("Subprocess target: command killed at the call timeout", False)
+except TimeoutError:
+    check("Subprocess target: command killed at the call timeout", time.monotonic() - started < 5.0,
+          f"{time.monotonic() - started:.1f}s")
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+    def do_POST(self):
+        parameter = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        EchoHandler.requests.append(parameter)
+        if parameter == "slow":
+            time.sleep(2)
+        body = str(len(parameter)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    def log_message(self, *args):
+        pass
+
+free = socket.socket()
+free.bind(("127.0.0.1", 0))
+http_port = free.getsockname()[1]
+free.close()
+http_target = HttpSession(f"http://127.0.0.1:{http_port}/api")
+try:
+    http_target.run("Mod.Func", "abc")
+except OSError:
+    pass
+server = ThreadingHTTPServer(("127.0.0.1", http_port), EchoHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+check("HTTP target: recovers once the server is back after a refused call", http_target.run("Mod.Func", "abc") == 3.0)
+started = time.monotonic()
+try:
+    http_target.run("Mod.Func", "slow", timeout=0.3)
+    check("HTTP target: call timeout applies to the socket", False)
+except OSError:
+    check("HTTP target: call timeout applies to the socket", time.monotonic() - started < 1.5,
+          f"{time.monotonic() - started:.1f}s")
+check("HTTP target: connection usable after a timeout, POST not resent",
+      http_target.run("Mod.Func", "abcd") == 4.0 and EchoHandler.requests == ["abc", "slow", "abcd"],
+      str(EchoHandler.requests))
+http_target.close()
+server.shutdown()
+
+# ── MetricsExporter ────────────────────────────────────────────────────────
+print("\n── MetricsExporter ──")
+taken = socket.socket()
+taken.bind(("127.0.0.1", 0))
+taken.listen()
+snapshot_path = os.path.join(tmp, "metrics.json")
+collected = []
+exporter = MetricsExporter(lambda: collected.append(1) or {"time": time.time(), "functions": {}},
+                           port=taken.getsockname()[1], snapshot_path=snapshot_path, publish_seconds=0.05)
+exporter.start()
+time.sleep(0.3)
+check("Taken port: snapshots still published", len(collected) > 2 and os.path.exists(snapshot_path),
+      f"{len(collected)} snapshots")
+exporter.close()
+taken.close()
+with open(snapshot_path, encoding="utf-8") as f:
+    check("Snapshot file holds the last snapshot", "time" in json.load(f))
+
+# ── ControlPlaneClient ─────────────────────────────────────────────────────
+print("\n── ControlPlaneClient ──")
+store = InMemoryControlStore(latency_seconds=0.2)
+control = ControlPlaneClient(store, "10.0.0.1", refresh_seconds=0.05)
+control.start()
+started = time.monotonic()
+control.post_status("Running", "Test started")
+control.post_status(*HEARTBEAT_STATUS)
+control.post_status(*HEARTBEAT_STATUS)
+control.post_status("Running", "PSO done")
+check("post_status does not wait for the database", time.monotonic() - started < 0.1,
+      f"{time.monotonic() - started:.3f}s")
+check("flush waits for queued updates", control.flush(timeout=10))
+check("Updates sent in order; a queued heartbeat yields to newer ones",
+      [u[2] for u in store.updates] in (["Test started", "PSO done"], ["Test started", "Heart beat", "PSO done"]),
+      str([u[2] for u in store.updates]))
+stopped = threading.Event()
+control.on_stop = stopped.set
+store.stop = True
+check("Stop signal picked up by the background refresh", stopped.wait(5) and control.stop_signaled)
+control.close()
+
+class FlakyStore(InMemoryControlStore):
+    fail_updates = fail_stop = False
+    def stop_signaled(self):
+        if self.fail_stop: raise ConnectionError("TestControl unreachable")
+        return super().stop_signaled()
+    def update_status(self, *args):
+        if self.fail_updates: raise ConnectionError("proc failed")
+        return super().update_status(*args)
+
+store = FlakyStore(stop=True)
+update_errors, stop_errors = [], []
+control = ControlPlaneClient(store, "10.0.0.1", refresh_seconds=60, on_error=update_errors.append,
+                             on_stop_error=stop_errors.append)
+store.fail_stop = True
+control.post_status("Running", "x")
+control.flush()
+check("Stop-signal read failure reported on its own, update still sent",
+      len(stop_errors) == 1 and not update_errors and len(store.updates) == 1 and not control.stop_signaled,
+      f"{len(stop_errors)} stop / {len(update_errors)} update errors")
+store.fail_stop, store.fail_updates = False, True
+control.post_status("Running", "y")
+control.flush()
+check("Status update failure reported to on_error only, stop still seen",
+      len(update_errors) == 1 and len(stop_errors) == 1 and control.stop_signaled and
+      (control.send_errors, control.stop_check_errors) == (1, 1))
+control.close()
+
+# ── Coordinator ────────────────────────────────────────────────────────────
+print("\n── Coordinator ──")
+@dataclass
+class Function:
+    name: str
+    load_profile: object = None
+
+functions = [Function(f"f{i}") for i in range(5)] + [Function("profiled", parse_load_profile("constant:30"))]
+shares = [partition_inner_functions(functions, i, 2) for i in range(2)]
+check("Interval functions dealt out once across agents",
+      sorted(f.name for share in shares for f in share if f.load_profile is None) == [f"f{i}" for i in range(5)])
+check("Profiled function runs on every agent at half the rate",
+      all(abs(share[-1].load_profile.rate_at(10.0) - 15.0) < 1e-9 for share in shares))
+
+coordinator = Coordinator(2, ("127.0.0.1", 0), authkey="test", start_delay_seconds=0.2, report_seconds=60.0)
+merged = {}
+coordinator_thread = threading.Thread(target=lambda: merged.update(coordinator.run()), daemon=True)
+coordinator_thread.start()
+assignments = []
+try:
+    Client(coordinator.address, authkey=b"wrong").close()
+    intruder_rejected = False
+except AuthenticationError:
+    intruder_rejected = True
+
+def local_agent(name, calls):
+    link = AgentLink(coordinator.address, "test", name)
+    assignment = link.wait_for_assignment()
+    link.wait_for_start(assignment)
+    assignments.append((assignment, time.time()))
+    recorder = LatencyRecorder()
+    link.start_streaming(recorder.cumulative, interval_seconds=0.05)
+    for i in range(calls):
+        recorder.record("INNER", "Mod", "Func", "ok" if i else "error", 0.010)
+    time.sleep(0.1)
+    link.close()
+
+agents = [threading.Thread(target=local_agent, args=(f"agent-{i}", 10 * (i + 1))) for i in range(2)]
+for agent in agents: agent.start()
+for agent in agents: agent.join(timeout=30)
+coordinator_thread.join(timeout=30)
+check("A client with the wrong key is rejected without stopping the coordinator",
+      intruder_rejected and not coordinator_thread.is_alive() and len(assignments) == 2)
+check("Every agent gets its own slot of the same split",
+      sorted(a.index for a, _ in assignments) == [0, 1] and {a.count for a, _ in assignments} == {2})
+check("Agents are released together at the start barrier",
+      len({a.start_at for a, _ in assignments}) == 1 and all(t >= a.start_at for a, t in assignments))
+stats = merged.get(LatencyRecorder.key_for("INNER", "Mod", "Func"))
+check("Coordinator merges every agent's final stats",
+      not coordinator_thread.is_alive() and stats is not None and (stats.ok, stats.error) == (28, 2),
+      f"ok {stats.ok}, error {stats.error}" if stats else "no stats")
+
+# ── Final ──────────────────────────────────────────────────────────────────
+print("\n" + "="*55)
+status = "ALL TESTS PASSED ✓" if errors == 0 else f"{errors} TEST(S) FAILED ✗"
+print(f"  {status}")
+print("="*55 + "\n")
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("PSO", "PSC", "START", "INNER", "END", "SECOND_END")
+
+_SELECT_COLUMNS = """
+    SELECT Phase, ModuleName, FunctionName, Parameter,
+           COALESCE(IntervalSeconds, ?) AS IntervalSeconds,
+           COALESCE(Throughput, 1) AS Throughput,
+           COALESCE(TimeoutSeconds, ?) AS TimeoutSeconds{profile_column}
+    FROM TestCase
+    WHERE UserRole = ? OR UserRole = SUBSTRING(?, 1, 1)
+    ORDER BY Phase, Sequence
+"""
+
+# Changes whenever any TestCase row of the role is added, removed or edited
+_VERSION_QUERY = """
+    SELECT COUNT(*), CHECKSUM_AGG(BINARY_CHECKSUM(Phase, Sequence, ModuleName, FunctionName, Parameter,
+                                                  IntervalSeconds, Throughput, TimeoutSeconds{profile_column}))
+    FROM TestCase
+    WHERE UserRole = ? OR UserRole = SUBSTRING(?, 1, 1)
+"""
+
+
+def _is_missing_column(error: Exception) -> bool:
+    """SQL Server's 'Invalid column name' (SQLSTATE 42S22), as opposed to a connection or timeout error"""
+    text = str(error)
+    return "42S22" in text or "invalid column name" in text.lower()
+
+
+@dataclass
+class TestCaseRow:
+    """One TestCase definition, independent of where it was read from"""
+    phase: str
+    module_name: str
+    function_name: str
+    parameter: str
+    interval_seconds: float
+    throughput: int
+    timeout_seconds: float
+    load_profile: str = ""
+
+
+class SqlTestCaseSource:
+    """TestCase rows of one user role; the version is a checksum over those rows"""
+
+    def __init__(self, engine, user_role: str, default_interval: float, default_timeout: float):
+        self.engine = engine
+        self.user_role = user_role
+        self.default_interval = default_interval
+        self.default_timeout = default_timeout
+        # LoadProfile is an optional column; whether it exists is decided once, on first use,
+        # so the selected columns (and the version checksum) never change while polling
+        self.with_profiles: Optional[bool] = None
+
+    def describe(self) -> str:
+        return "database"
+
+    def _detect_profiles(self) -> bool:
+        if self.with_profiles is None:
+            try:
+                with self.engine.connect() as conn:
+                    conn.execute("SELECT TOP 0 LoadProfile FROM TestCase").fetchall()
+                self.with_profiles = True
+            except Exception as e:
+                if not _is_missing_column(e):
+                    raise
+                logger.warning(f"[SQL] Load profiles unavailable, using interval pacing only: {str(e)}")
+                self.with_profiles = False
+        return self.with_profiles
+
+    def _query(self, template: str, params: tuple):
+        column = ", LoadProfile" if self._detect_profiles() else ""
+        with self.engine.connect() as conn:
+            return conn.execute(template.format(profile_column=column), params).fetchall()
+
+    def version(self) -> str:
+        count, checksum = self._query(_VERSION_QUERY, (self.user_role, self.user_role))[0]
+        return f"{count}:{checksum}"
+
+    def load(self) -> List[TestCaseRow]:
+        rows = self._query(
+            _SELECT_COLUMNS,
+            (self.default_interval, self.default_timeout, self.user_role, self.user_role)
+        )
+        return [
+            TestCaseRow(row[0], row[1], row[2], row[3], float(row[4]), int(row[5]), float(row[6]),
+                        (row[7] or "") if self.with_profiles else "")
+            for row in rows
+        ]
+
+
+class FileTestCaseSource:
+    """Local JSON definition file, for running without the TestCase table or stepping load by hand.
+
+    {"version": 3, "functions": [{"phase": "INNER", "module": "Module1", "function": "Foo",
+      "parameter": "x", "interval_seconds": 3, "throughput": 1, "timeout_seconds": 10,
+      "load_profile": "ramp:1-20/600"}]}
+
+    The version is the file's "version" field, or its modification time if there is none.
+    Functions are kept in file order within each phase.
+    """
+
+    def __init__(self, path: str, default_interval: float, default_timeout: float):
+        self.path = path
+        self.default_interval = default_interval
+        self.default_timeout = default_timeout
+
+    def describe(self) -> str:
+        return self.path
+
+    def _read(self) -> dict:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def version(self) -> str:
+        data = self._read()
+        if "version" in data:
+            return str(data["version"])
+        return str(os.path.getmtime(self.path))
+
+    def load(self) -> List[TestCaseRow]:
+        rows = []
+        for entry in self._read().get("functions", []):
+            rows.append(TestCaseRow(
+                phase=entry["phase"],
+                module_name=entry["module"],
+                function_name=entry["function"],
+                parameter=str(entry.get("parameter", "")),
+                interval_seconds=float(entry.get("interval_seconds", self.default_interval)),
+                throughput=int(entry.get("throughput", 1)),
+                timeout_seconds=float(entry.get("timeout_seconds", self.default_timeout)),
+                load_profile=entry.get("load_profile") or ""
+            ))
+        return rows
+
+
+class TestCaseWatcher:
+    """Polls a TestCase source for a new version and hands new definitions to on_change.
+
+    on_change(version, rows) runs on the watcher thread; the framework only
+    queues the new definition there and swaps it in on its own thread.
+    """
+
+    def __init__(self, source, poll_seconds: float, on_change: Callable[[str, List[TestCaseRow]], None]):
+        self.source = source
+        self.poll_seconds = poll_seconds
+        self.on_change = on_change
+        self.version: Optional[str] = None
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, version: Optional[str]):
+        """Start polling; version is the definition already loaded"""
+        self.version = version
+        if self.poll_seconds > 0 and not self._thread:
+            self._thread = threading.Thread(target=self._run, name="ltf-testcase-watch", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def check(self) -> bool:
+        """Load and hand over the definition if its version changed; True if it did"""
+        try:
+            version = self.source.version()
+            if version == self.version:
+                return False
+            rows = self.source.load()
+        except Exception as e:
+            logger.warning(f"[RELOAD] Cannot check {self.source.describe()} for TestCase changes: {str(e)}")
+            return False
+        logger.info(f"[RELOAD] TestCase version {self.version} -> {version} in {self.source.describe()}")
+        self.version = version
+        self.reloads += 1
+        self.on_change(version, rows)
+        return True
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None